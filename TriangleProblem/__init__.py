@@ -1,20 +1,64 @@
 import os
-from flask import (
-    Flask
-)
+'''
+The Flask application is built by `create_app`. The routes, and the models they
+use, are only imported when an app is created, so that `TriangleProblem.models`
+and the command line tools start without Flask.
 
+`TriangleProblem.app` is the app of the default config, created on first
+access (e.g. by `gunicorn run:app` or `flask --app TriangleProblem`).
+'''
 def create_app(config=None):
     '''
     Create and configure an instance of the Flask application.
+    Parameters
+    ----------
+    config: dict
+        Settings applied after the instance config (instance/config.py),
+        e.g. for the tests.
     '''
+    from flask import Flask
+    from .routes import register_blueprints
+
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
-        SECRET_KEY = 'Knowledge@Representation'
+        SECRET_KEY = 'Knowledge@Representation',
+        # Result cache of /triangle_calculator
+        TRIANGLE_CACHE_BACKEND = 'memory',
+        TRIANGLE_CACHE_PATH = None,
+        TRIANGLE_CACHE_WARM_LOG = None,
+        TRIANGLE_CACHE_SIZE = 1024,
+        TRIANGLE_CACHE_TTL = None,
+        TRIANGLE_CACHE_PRECISION = 12,
+        # GET /triangle_calculator
+        TRIANGLE_GET_MAX_AGE = 31536000,
+        TRIANGLE_GET_VERSION = '1',
+        # Admission control of the solve endpoints, per worker
+        TRIANGLE_MAX_CONCURRENT = None,
+        TRIANGLE_MAX_QUEUE = 0,
+        TRIANGLE_QUEUE_TIMEOUT = 1.0,
+        TRIANGLE_RETRY_AFTER = 1,
+        # /metrics: the directory shared by the workers to aggregate their metrics
+        TRIANGLE_METRICS_DIR = os.environ.get('TRIANGLE_METRICS_DIR'),
+        TRIANGLE_METRICS_FLUSH_INTERVAL = 1.0,
+        # Request log: one JSON line per request (None: stderr)
+        TRIANGLE_LOG_FILE = None,
+        TRIANGLE_LOG_SAMPLE_RATE = 1.0,
+        # Async mode (asgi.py): micro-batching of /triangle_calculator
+        TRIANGLE_BATCH_WINDOW = 0.002,
+        TRIANGLE_BATCH_MAX_SIZE = 256,
+        # The static files built by `flask build-assets` (None: TriangleProblem/assets)
+        TRIANGLE_ASSETS_DIR = None
     )
+    # Deployment overrides, e.g. instance/config.py
+    app.config.from_pyfile('config.py', silent=True)
+    if config:
+        app.config.from_mapping(config)
 
+    register_blueprints(app)
     return app
 
-app = create_app()
-
-from .routes import index
-from .routes import triangle
+def __getattr__(name):
+    if name == 'app':
+        # another thread may have created it meanwhile: keep the first one
+        return globals().setdefault('app', create_app())
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
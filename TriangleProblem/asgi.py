@@ -0,0 +1,223 @@
+import json
+import math
+from time import perf_counter
+from urllib.parse import parse_qs
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+from TriangleProblem import app
+from .models.triangle_semantic import ELEMENTS
+from .routes.admission import get_admission_controller
+from .routes.metrics import (
+    observe_phases,
+    record_request
+)
+from .routes.request_log import get_log_manager
+from .routes.triangle import (
+    FIELDS,
+    PARAMS,
+    PATH_NETWORK,
+    count_path,
+    get_result_cache,
+    is_cache_bypassed,
+    known_values,
+    lookup_result,
+    make_body,
+    parse_fields,
+    solve_closed_form,
+    validate_param
+)
+from .services.admission import ADMITTED
+from .services.micro_batcher import (
+    MicroBatcher,
+    reachable_elements
+)
+'''
+ASGI server
+=====
+Optional async serving mode, with micro-batching of /triangle_calculator:
+
+    pip install asgiref uvicorn
+    uvicorn TriangleProblem.asgi:application --workers 4
+
+The form posts to /triangle_calculator are handled on the event loop: the
+validation, result cache and closed form cases are the same as the Flask
+route, and the triangles left to the semantic network are solved together by
+a MicroBatcher (see services.micro_batcher), which waits up to
+TRIANGLE_BATCH_WINDOW seconds for at most TRIANGLE_BATCH_MAX_SIZE triangles.
+The response is the same as the Flask route's, except that the network always
+completes the whole triangle (even when `fields` are requested), so its results
+are cached apart from those of the Flask route. The posts take
+a slot of the admission controller of the app (see routes.admission), shared
+with the requests served by Flask, and are rejected with 503 when busy.
+
+Every other request is served by the Flask app, in a thread (asgiref).
+'''
+ROUTE = '/triangle_calculator'
+FORM_CONTENT_TYPE = b'application/x-www-form-urlencoded'
+
+def to_float(values: list) -> float:
+    '''
+    The first value of a form param as a float, None if missing or invalid
+    (as `request.form.get(name, None, float)`).
+    '''
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+def network_result(values: dict, data: dict, fields: list = None) -> tuple:
+    '''
+    Convert a row of the batch to the result of `solve_triangle`: the unknown
+    elements are -1, and an element the network should calculate but is not
+    finite raises ValueError, like the math errors of TriangleSemantic.
+    '''
+    needed = [FIELDS[field] for field in fields] if fields else ELEMENTS
+    for name in reachable_elements(values):
+        if name in needed and not math.isfinite(data[name]):
+            raise ValueError('Invalid triangle')
+    return {name: value if math.isfinite(value) else -1.0 for name, value in data.items()}, PATH_NETWORK
+
+class TriangleAsgi:
+    def __init__(self, flask_app=app, batcher: MicroBatcher = None) -> None:
+        if WsgiToAsgi is None:
+            raise ImportError('The async serving mode needs asgiref: pip install asgiref')
+        self.__app = flask_app
+        self.__wsgi = WsgiToAsgi(flask_app)
+        self.__batcher = batcher or MicroBatcher(window=flask_app.config['TRIANGLE_BATCH_WINDOW'],
+                                                 max_batch_size=flask_app.config['TRIANGLE_BATCH_MAX_SIZE'])
+
+    @property
+    def batcher(self) -> MicroBatcher:
+        return self.__batcher
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif (scope['type'] == 'http' and scope['path'] == ROUTE and scope['method'] == 'POST'
+              and dict(scope['headers']).get(b'content-type', b'').split(b';')[0].strip() == FORM_CONTENT_TYPE):
+            await self.triangle_calculator(scope, receive, send)
+        else:
+            await self.__wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.__batcher.flush()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def triangle_calculator(self, scope, receive, send):
+        # the helpers of the Flask routes use the app context (current_app)
+        with self.__app.app_context():
+            start = perf_counter()
+            controller = get_admission_controller()
+            if await controller.acquire_async() != ADMITTED:
+                await self.reject(send, start)
+                return
+            try:
+                await self.solve_request(scope, receive, send)
+            finally:
+                controller.release()
+
+    async def reject(self, send, start: float):
+        '''
+        Answer 503 before reading the body, as routes.admission does.
+        '''
+        content = (json.dumps({'status':503, 'message':'Server busy, retry later', 'data':{}},
+                              sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        await send({'type': 'http.response.start', 'status': 503, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(content)).encode()),
+            (b'retry-after', str(self.__app.config['TRIANGLE_RETRY_AFTER']).encode()),
+            (b'cache-control', b'no-store')]})
+        await send({'type': 'http.response.body', 'body': content})
+        record_request(ROUTE, 'POST', 503, perf_counter() - start)
+        get_log_manager().log({'method': 'POST', 'route': ROUTE, 'status': 503,
+                               'duration_ms': (perf_counter() - start) * 1000}, always=True)
+
+    async def solve_request(self, scope, receive, send):
+        start = perf_counter()
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        headers = dict(scope['headers'])
+        form = parse_qs(body.decode('utf-8', 'replace'), keep_blank_values=True)
+        alpha, beta, delta, a, b, c, s, height_c, p = (to_float(form.get(name)) for name in PARAMS)
+        fields = parse_fields(form.get('fields', []))
+        bypass_cache = is_cache_bypassed((form.get('no_cache') or [None])[0],
+                                         headers.get(b'cache-control', b'').decode('latin-1'))
+        parsed = perf_counter()
+
+        result, exception = await self.calculate(alpha, beta, delta, a, b, c, s, height_c, p,
+                                                 fields=fields, bypass_cache=bypass_cache)
+        response, cache_status = result
+        solved = perf_counter()
+        content = (json.dumps(response, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        response_headers = [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(content)).encode())]
+        if cache_status:
+            response_headers.append((b'x-cache', cache_status.encode()))
+        serialized = perf_counter()
+        response_headers.append((b'server-timing', observe_phases(
+            ROUTE, parse=parsed - start, solve=solved - parsed, serialize=serialized - solved).encode()))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+        record_request(ROUTE, 'POST', 200, perf_counter() - start)
+        params = dict(zip(PARAMS, (alpha, beta, delta, a, b, c, s, height_c, p)))
+        get_log_manager().log({
+            'method': 'POST',
+            'route': ROUTE,
+            'status': 200,
+            'inputs': {name: value for name, value in params.items() if value is not None},
+            'known': list(known_values(a, b, c, alpha, beta, delta, height_c, s, p)),
+            'fields': fields,
+            'path': response.get('path'),
+            'cache': cache_status,
+            'timings_ms': {'parse': (parsed - start) * 1000, 'solve': (solved - parsed) * 1000,
+                           'serialize': (serialized - solved) * 1000},
+            'duration_ms': (perf_counter() - start) * 1000
+        }, exception)
+
+    async def calculate(self, alpha: float=None, beta: float=None, delta: float=None,
+                        a: float=None, b: float=None, c: float=None,
+                        s: float=None, height_c: float=None, p: float=None,
+                        fields: list=None, bypass_cache: bool=False) -> tuple:
+        '''
+        The async version of routes.triangle.calculate, which solves the
+        network cases with the batcher.
+        Returns
+        -------
+        tuple:
+            The body and the cache status, and the exception caught, if any.
+        '''
+        if not validate_param(alpha, beta, delta, a, b, c, s, height_c, p) or fields == []:
+            return ({'status':400, 'message':'Giá trị cung cấp chưa chính xác hoặc lỗi.','data':{}}, None), None
+        try:
+            cache_key, result, cache_status = lookup_result(a, b, c, alpha, beta, delta, height_c, s, p,
+                                                            fields=fields, bypass_cache=bypass_cache,
+                                                            solver='batch')
+            if result is None:
+                values = known_values(a, b, c, alpha, beta, delta, height_c, s, p)
+                result = solve_closed_form(values)
+                if result is None:
+                    result = network_result(values, await self.__batcher.solve(values), fields)
+                get_result_cache().put(cache_key, result)
+            count_path(result[1])
+            return (make_body(result, fields), cache_status), None
+        except Exception as ex:
+            return ({'status':500, 'message':'Server Error!','data':{}}, None), ex
+
+application = TriangleAsgi()
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import json
+import math
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import (
+    chain,
+    islice
+)
+
+from .models import TriangleSemantic
+from .models.triangle_semantic import ELEMENTS
+'''
+Triangle batch solver
+=====
+Complete the triangles of a CSV or NDJSON file (or stdin) with the semantic
+network and write them to stdout, in the same format, as they are solved.
+
+The records are read lazily and solved chunk by chunk, so the memory stays
+bounded whatever the size of the input. With `--workers N` the chunks are
+spread across a process pool; at most 2 * N chunks are in flight and the
+output keeps the order of the input.
+
+Columns / keys: alpha, beta, delta, a, b, c, square (or s), height_c (or h_c), p.
+A missing or empty value is unknown. Every output record has the nine elements
+(empty / null when unknown or not finite) and an `error` message when it can't be solved.
+
+Usage:
+    triangle-solve problems.csv > solutions.csv
+    cat problems.ndjson | triangle-solve --workers 4 > solutions.ndjson
+'''
+ALIASES = {'s': 'square', 'h_c': 'height_c'}
+FORMATS = ('auto', 'csv', 'ndjson')
+
+def solve_record(record: dict) -> dict:
+    '''
+    Solve one record. Never raises: a bad record gets an `error`.
+    '''
+    values = {}
+    try:
+        if isinstance(record, ValueError):
+            raise record
+        if not isinstance(record, dict):
+            raise ValueError('Record must be an object')
+        for key, value in record.items():
+            name = ALIASES.get(key, key)
+            if name not in ELEMENTS or value is None or value == '':
+                continue
+            # JSON true / false are not numbers, though float() takes them
+            if isinstance(value, bool):
+                raise ValueError('Invalid value of {}'.format(key))
+            value = float(value)
+            if not math.isfinite(value) or value <= 0:
+                raise ValueError('Invalid value of {}'.format(key))
+            values[name] = value
+        triangle_semantic = TriangleSemantic.from_known(**values)
+    except (TypeError, ValueError, ZeroDivisionError, OverflowError) as ex:
+        result = {name: values.get(name) for name in ELEMENTS}
+        result['error'] = str(ex) or type(ex).__name__
+        return result
+    result = {}
+    for name in ELEMENTS:
+        value = getattr(triangle_semantic, name)
+        # a result which overflowed is unknown, not written as Infinity
+        result[name] = (value if triangle_semantic.network.is_known(ELEMENTS.index(name) + 1)
+                        and math.isfinite(value) else None)
+    result['error'] = None
+    return result
+
+def solve_chunk(records: list) -> list:
+    return [solve_record(record) for record in records]
+
+def chunks(records, size: int):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def solve_chunks(chunks, workers: int = 1):
+    '''
+    Solve the chunks in order, on a process pool when workers > 1.
+    '''
+    if workers <= 1:
+        yield from map(solve_chunk, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(solve_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def detect_format(path: str, first_line: str) -> str:
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'ndjson' if first_line.lstrip().startswith('{') else 'csv'
+
+def read_records(lines, file_format: str):
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as ex:
+            yield ValueError('Invalid JSON: {}'.format(ex))
+
+def write_records(results, file_format: str, output):
+    if file_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=list(ELEMENTS) + ['error'], lineterminator='\n')
+        writer.writeheader()
+        for chunk in results:
+            writer.writerows(chunk)
+            output.flush()
+        return
+    for chunk in results:
+        for result in chunk:
+            output.write(json.dumps(result) + '\n')
+        output.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='triangle-solve', description='Complete the triangles of a CSV or NDJSON file.')
+    parser.add_argument('input', nargs='?', default='-', help='CSV or NDJSON file, - for stdin')
+    parser.add_argument('--format', choices=FORMATS, default='auto')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error('--chunk-size and --workers must be at least 1')
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    try:
+        first_line = source.readline()
+        file_format = args.format
+        if file_format == 'auto':
+            file_format = detect_format(args.input, first_line)
+        records = read_records(chain([first_line], source), file_format)
+        results = solve_chunks(chunks(records, args.chunk_size), args.workers)
+        write_records(results, file_format, sys.stdout)
+    except BrokenPipeError:
+        pass
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,12 @@
+from importlib import import_module
+
+from .engine import (
+    EngineException,
+    FormulaRegistry,
+    SparseNetwork,
+    generate_network
+)
+
 from .network import (
     Network,
     NetWorkException
@@ -5,5 +14,38 @@ from .network import (
 
 from .triangle_semantic import(
     TriangleSemanticException,
-    TriangleSemantic
-)
\ No newline at end of file
+    TriangleSemantic,
+    TriangleSnapshot
+)
+
+from .solve_plan import (
+    SolvePlan,
+    compile_plan,
+    get_goal_plan,
+    get_plan,
+    is_solvable
+)
+
+from .instrumentation import (
+    Instrumentation,
+    AggregatingCollector,
+    set_instrumentation
+)
+
+'''
+The batch solvers need numpy (and shared_batch, multiprocessing): they are
+imported on first use, so that the web app and the command line start without
+them.
+'''
+LAZY_IMPORTS = {
+    'TriangleBatchException': '.triangle_batch',
+    'TriangleBatch': '.triangle_batch',
+    'solve_shared': '.shared_batch',
+}
+
+def __getattr__(name):
+    module = LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = globals()[name] = getattr(import_module(module, __name__), name)
+    return value
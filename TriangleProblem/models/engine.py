@@ -0,0 +1,334 @@
+import heapq
+import random
+from array import array
+from collections import namedtuple
+'''
+Semantic Network Engine
+=====
+A semantic network of any size, built from a declarative registry of formulas:
+
+    registry = FormulaRegistry(['x', 'y', 'z'])
+    X, Y, Z = range(3)
+    registry.formula('sum', {
+        X: lambda v: v[Z] - v[Y],
+        Y: lambda v: v[Z] - v[X],
+        Z: lambda v: v[X] + v[Y],
+    })
+    network = registry.compile()
+    network.solve({'x': 1.0, 'y': 2.0})     # {'x': 1.0, 'y': 2.0, 'z': 3.0}
+
+A formula relates some variables, and has a solver for each variable it can
+calculate from the others. The solvers receive the values as a sequence indexed
+like the variables of the registry (None when unknown). A formula may also have
+vectorized solvers, which receive a sequence of columns (one problem per row)
+and the numpy module, so that the registry does not import numpy:
+
+    registry.formula('sum', solvers, vectorized={Z: lambda v, np: np.add(v[X], v[Y])})
+
+The compiled network is a sparse incidence structure: the variables of each
+formula, and the formulas of each variable. A propagation keeps, for each
+formula, the number of its unknown variables; activating a variable only
+updates its own formulas, and a formula left with one unknown variable is
+pushed on a heap. The lowest ready formula always fires first, as in
+TriangleSemantic.spreading_activation, so the work grows with the number of
+edges (times log of the formulas for the heap), not with variables x formulas.
+'''
+class EngineException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+'''
+- name: the name of the formula
+- variables: the indexes of its variables
+- solvers: variable index -> function of the values calculating it
+- vectorized: variable index -> function of the columns of the values and of
+  numpy calculating it (optional)
+'''
+Formula = namedtuple('Formula', ['name', 'variables', 'solvers', 'vectorized'])
+
+class FormulaRegistry:
+    def __init__(self, variables: list = ()) -> None:
+        '''
+        - variables: the names of the variables, indexed in this order; more
+          can be added with `variable`
+        '''
+        self.__variables = []
+        self.__indexes = {}
+        self.__formulas = []
+        for name in variables:
+            self.variable(name)
+
+    @property
+    def variables(self) -> tuple:
+        return tuple(self.__variables)
+
+    @property
+    def formulas(self) -> tuple:
+        return tuple(self.__formulas)
+
+    def variable(self, name: str) -> int:
+        '''
+        Add a variable, or get the index of an existing one.
+        '''
+        index = self.__indexes.get(name)
+        if index is None:
+            index = self.__indexes[name] = len(self.__variables)
+            self.__variables.append(name)
+        return index
+
+    def formula(self, name: str, solvers: dict, variables: list = None, vectorized: dict = None) -> Formula:
+        '''
+        Add a formula.
+        Parameters
+        ----------
+        name: str
+            The name of the formula, for the reports.
+        solvers: dict
+            Variable index -> function of the values calculating the variable.
+        variables: list
+            The indexes of the variables of the formula, default the solved
+            ones; a variable without a solver is only an input.
+        vectorized: dict
+            Variable index -> function of the columns and of numpy calculating
+            the variable, for some of the solved variables.
+        Returns
+        -------
+        Formula:
+            The formula added.
+        '''
+        variables = tuple(sorted(set(solvers) if variables is None else set(variables)))
+        vectorized = dict(vectorized or {})
+        if (not variables or any(not 0 <= variable < len(self.__variables) for variable in variables)
+                or any(variable not in variables for variable in solvers)
+                or any(variable not in solvers for variable in vectorized)):
+            EngineException.throw(ValueError('Invalid argument'))
+        formula = Formula(name, variables, dict(solvers), vectorized)
+        self.__formulas.append(formula)
+        return formula
+
+    def compile(self) -> 'SparseNetwork':
+        return SparseNetwork(self.__variables, self.__formulas)
+
+class SparseNetwork:
+    '''
+    The compiled incidence of a registry, shared by its propagations.
+    '''
+    def __init__(self, variables: list, formulas: list) -> None:
+        self.__variables = tuple(variables)
+        self.__indexes = {name: i for i, name in enumerate(self.__variables)}
+        self.__formulas = tuple(formulas)
+        self.__formula_variables = tuple(formula.variables for formula in self.__formulas)
+        variable_formulas = [[] for _ in self.__variables]
+        for index, variables in enumerate(self.__formula_variables):
+            for variable in variables:
+                variable_formulas[variable].append(index)
+        self.__variable_formulas = tuple(tuple(formulas) for formulas in variable_formulas)
+        self.__arities = array('i', (len(variables) for variables in self.__formula_variables))
+
+    @property
+    def variables(self) -> tuple:
+        return self.__variables
+
+    @property
+    def formulas(self) -> tuple:
+        return self.__formulas
+
+    @property
+    def formula_variables(self) -> tuple:
+        '''
+        The indexes of the variables of each formula.
+        '''
+        return self.__formula_variables
+
+    @property
+    def variable_formulas(self) -> tuple:
+        '''
+        The indexes of the formulas of each variable.
+        '''
+        return self.__variable_formulas
+
+    @property
+    def arities(self) -> array:
+        return self.__arities
+
+    @property
+    def edges(self) -> int:
+        return sum(self.__arities)
+
+    def index(self, name: str) -> int:
+        index = self.__indexes.get(name)
+        if index is None:
+            EngineException.throw(ValueError('Unknown variable: {}'.format(name)))
+        return index
+
+    def formula_masks(self) -> tuple:
+        '''
+        The variables of each formula as a bitmask, bit i for variable i.
+        '''
+        return tuple(sum(1 << variable for variable in variables)
+                     for variables in self.__formula_variables)
+
+    def propagation(self) -> 'Propagation':
+        return Propagation(self)
+
+    def solve(self, values: dict) -> dict:
+        '''
+        Calculate every variable reachable from the known ones.
+        Parameters
+        ----------
+        values: dict
+            The known variables by name; None values are skipped.
+        Returns
+        -------
+        dict:
+            The value of each variable by name, None when unknown.
+        '''
+        propagation = self.propagation()
+        for name, value in values.items():
+            if value is not None:
+                propagation.set(self.index(name), value)
+        propagation.run()
+        return dict(zip(self.__variables, propagation.values))
+
+class Propagation:
+    '''
+    The state of a propagation on a SparseNetwork: the values, the known
+    variables and the unknown counters of the formulas.
+    '''
+    __slots__ = ('__network', '__values', '__known', '__counts', '__ready', '__fired')
+
+    def __init__(self, network: SparseNetwork) -> None:
+        self.__network = network
+        self.__values = [None] * len(network.variables)
+        self.__known = bytearray(len(network.variables))
+        self.__counts = array('i', network.arities)
+        self.__ready = []
+        self.__fired = 0
+
+    @property
+    def values(self) -> list:
+        return self.__values
+
+    @property
+    def fired(self) -> int:
+        '''
+        The number of formulas calculated so far.
+        '''
+        return self.__fired
+
+    def is_known(self, variable: int) -> bool:
+        return bool(self.__known[variable])
+
+    def unknown_count(self, formula: int) -> int:
+        return self.__counts[formula]
+
+    def set(self, variable: int, value):
+        '''
+        Give the value of a variable and activate it.
+        '''
+        self.__values[variable] = value
+        self.activate(variable)
+
+    def activate(self, variable: int):
+        '''
+        Activate a variable: update the counters of its formulas only.
+        '''
+        if self.__known[variable]:
+            return
+        self.__known[variable] = 1
+        counts = self.__counts
+        for formula in self.__network.variable_formulas[variable]:
+            counts[formula] -= 1
+            if counts[formula] == 1:
+                heapq.heappush(self.__ready, formula)
+
+    def next_ready(self) -> int:
+        '''
+        Pop the lowest formula with exactly one unknown variable, -1 if none.
+        '''
+        ready = self.__ready
+        while ready:
+            formula = heapq.heappop(ready)
+            if self.__counts[formula] == 1:
+                return formula
+        return -1
+
+    def unknown_variable(self, formula: int) -> int:
+        '''
+        The first unknown variable of a formula, -1 if none.
+        '''
+        for variable in self.__network.formula_variables[formula]:
+            if not self.__known[variable]:
+                return variable
+        return -1
+
+    def run(self) -> int:
+        '''
+        Fire the ready formulas until none is left.
+        Returns
+        -------
+        int:
+            The number of formulas calculated.
+        '''
+        formulas = self.__network.formulas
+        values = self.__values
+        fired = 0
+        formula = self.next_ready()
+        while formula >= 0:
+            variable = self.unknown_variable(formula)
+            solver = formulas[formula].solvers.get(variable)
+            if solver is not None:
+                values[variable] = solver(values)
+                fired += 1
+                self.activate(variable)
+            formula = self.next_ready()
+        self.__fired += fired
+        return fired
+
+def generate_network(variables: int, formulas: int, arity: int = 3, seed: int = None) -> tuple:
+    '''
+    Generate a random network of linear formulas, sum(k_i * x_i) = d, with a
+    known solution, e.g. for the benchmarks. The first formulas chain every
+    variable to earlier ones, the others relate random variables.
+    Parameters
+    ----------
+    variables: int
+        The number of variables, named x0, x1...
+    formulas: int
+        The number of formulas.
+    arity: int
+        The number of variables of each formula.
+    seed: int
+        The seed of the random generator.
+    Returns
+    -------
+    tuple:
+        The FormulaRegistry and the solution (the value of each variable).
+    '''
+    if variables < arity or formulas < 0 or arity < 2:
+        EngineException.throw(ValueError('Invalid argument'))
+    generator = random.Random(seed)
+    registry = FormulaRegistry('x{}'.format(i) for i in range(variables))
+    solution = [generator.uniform(1.0, 10.0) for _ in range(variables)]
+    for index in range(formulas):
+        if index + arity <= variables:
+            # a new variable and earlier ones: the first arity - 1 variables
+            # are enough to calculate all of them
+            last = index + arity - 1
+            members = [last] + generator.sample(range(last), arity - 1)
+        else:
+            members = generator.sample(range(variables), arity)
+        terms = [(member, generator.choice((-1.0, 1.0)) * generator.uniform(0.5, 2.0)) for member in members]
+        total = sum(factor * solution[member] for member, factor in terms)
+        registry.formula('f{}'.format(index),
+                         {member: linear_solver(terms, total, member) for member, _ in terms})
+    return registry, solution
+
+def linear_solver(terms: list, total: float, target: int):
+    '''
+    The solver of `target` in sum(factor * values[variable]) = total.
+    '''
+    others = [(variable, factor) for variable, factor in terms if variable != target]
+    factor = dict(terms)[target]
+    return lambda v: (total - sum(k * v[variable] for variable, k in others)) / factor
@@ -0,0 +1,118 @@
+import json
+from collections import Counter
+from threading import Lock
+'''
+Instrumentation
+=====
+Callbacks of the solver, for profiling:
+
+- on_propagation_start(triangle_semantic, expression): a propagation begins,
+  from an expression (0 when running a precompiled plan)
+- on_formula(expression, element, seconds, error): an expression has been
+  calculated for an element; error is the exception raised, if any
+- on_activation(element): an element has been activated on a network
+- on_propagation_end(triangle_semantic, iterations): the propagation is over
+  after calculating `iterations` expressions
+
+TriangleSemantic and Network only call them when an instrumentation is set,
+so a disabled instrumentation costs one attribute check per event. It is set
+for every solver with `set_instrumentation`, or for one TriangleSemantic (and
+its network) with `TriangleSemantic(instrumentation=...)`.
+'''
+class Instrumentation:
+    '''
+    The interface of the callbacks; every callback does nothing.
+    '''
+    def on_propagation_start(self, triangle_semantic, expression: int):
+        pass
+
+    def on_formula(self, expression: int, element: int, seconds: float, error: Exception = None):
+        pass
+
+    def on_activation(self, element: int):
+        pass
+
+    def on_propagation_end(self, triangle_semantic, iterations: int):
+        pass
+
+def set_instrumentation(instrumentation: Instrumentation = None):
+    '''
+    Set (None to remove) the instrumentation of every TriangleSemantic and Network.
+    '''
+    from .network import Network
+    from .triangle_semantic import TriangleSemantic
+    Network.instrumentation = instrumentation
+    TriangleSemantic.instrumentation = instrumentation
+
+class AggregatingCollector(Instrumentation):
+    '''
+    Count and time the callbacks, across threads.
+    '''
+    def __init__(self) -> None:
+        self.__lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__formulas = {}
+            self.__activations = Counter()
+            self.__propagations = 0
+            self.__iterations = Counter()
+
+    def on_formula(self, expression: int, element: int, seconds: float, error: Exception = None):
+        with self.__lock:
+            stats = self.__formulas.get((expression, element))
+            if stats is None:
+                stats = self.__formulas[(expression, element)] = {
+                    'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'errors': Counter()}
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if error is not None:
+                stats['errors'][type(error).__name__] += 1
+
+    def on_activation(self, element: int):
+        with self.__lock:
+            self.__activations[element] += 1
+
+    def on_propagation_end(self, triangle_semantic, iterations: int):
+        with self.__lock:
+            self.__propagations += 1
+            self.__iterations[iterations] += 1
+
+    def report(self) -> dict:
+        '''
+        The aggregated counters: per formula (expression -> element), per
+        activated element and the distribution of iterations per propagation.
+        '''
+        from .triangle_semantic import ELEMENTS
+        with self.__lock:
+            formulas = {}
+            for (expression, element), stats in sorted(self.__formulas.items()):
+                formulas['({}) -> {}'.format(expression, ELEMENTS[element - 1])] = {
+                    'count': stats['count'],
+                    'errors': dict(stats['errors']),
+                    'total_ms': stats['seconds'] * 1000,
+                    'mean_us': stats['seconds'] / stats['count'] * 1e6,
+                    'max_us': stats['max_seconds'] * 1e6
+                }
+            iterations = sum(count * n for n, count in self.__iterations.items())
+            return {
+                'formulas': formulas,
+                'activations': {ELEMENTS[element - 1]: count
+                                for element, count in sorted(self.__activations.items())},
+                'propagations': {
+                    'count': self.__propagations,
+                    'iterations': {str(n): count for n, count in sorted(self.__iterations.items())},
+                    'mean_iterations': iterations / self.__propagations if self.__propagations else 0.0
+                }
+            }
+
+    def dump(self, file=None, indent: int = 2) -> str:
+        '''
+        The report as JSON, also written to `file` when given.
+        '''
+        text = json.dumps(self.report(), indent=indent)
+        if file is not None:
+            file.write(text + '\n')
+        return text
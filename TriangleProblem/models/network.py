@@ -1,42 +1,115 @@
+from functools import lru_cache
+
+from .triangle_formulas import TRIANGLE_NETWORK
+
 class NetWorkException(Exception):
     @classmethod
     def throw(cls, ex):
         raise ex
-'''
-       | (1) | (2) | (3) | (4) | (5) | (6) 
-alpha  | -1  |  0  |  0  | -1  |  0  |  0 
-beta   | -1  | -1  |  0  | -1  |  0  |  0 
-delta  |  0  | -1  |  0  | -1  |  0  |  0 
-a      | -1  |  0  | -1  |  0  |  0  | -1 
-b      | -1  | -1  | -1  |  0  |  0  | -1 
-c      |  0  | -1  | -1  |  0  | -1  | -1 
-square |  0  |  0  | -1  |  0  | -1  |  0 
-hc     |  0  |  0  |  0  |  0  | -1  |  0 
-p      |  0  |  0  | -1  |  0  |  0  | -1 
-'''
 class Network:
-    def __init__(self, network=None):
+    '''
+    The network of the triangle, built from the formula registry of
+    models.triangle_formulas: the state of a propagation of models.engine,
+    with its elements and expressions indexed from 1. Its size comes from the
+    registry: see `network` for the matrix of the elements and expressions.
+
+    The network is stored as a bitmask of the known elements: bit (i - 1) is
+    set when element i is known. Each expression keeps the precomputed mask of
+    its related elements, so the unknown elements of an expression are
+    `EXPRESSION_MASKS[e] & ~known`.
+
+    For the propagation, `ELEMENT_EXPRESSIONS` is the inverted index from an
+    element to its expressions. Every network keeps the number of unknown
+    elements of each expression, and the bitmask of the expressions left with
+    exactly one unknown element (ready to be calculated), up to date.
+
+    The counters are a bytearray, and the network has no __dict__. The
+    counters of a known-set are computed on its first use (`known_state`).
+
+    `instrumentation` (see models.instrumentation) is told of every activated
+    element; None, the default, disables it. The one on the class is used
+    unless the network is created with its own one.
+    '''
+    ELEMENTS = len(TRIANGLE_NETWORK.variables)
+    EXPRESSIONS = len(TRIANGLE_NETWORK.formulas)
+    EXPRESSION_MASKS = TRIANGLE_NETWORK.formula_masks()
+    ELEMENT_EXPRESSIONS = ((),) + tuple(tuple(formula + 1 for formula in formulas)
+                                        for formulas in TRIANGLE_NETWORK.variable_formulas)
+    ALL_ELEMENTS = (1 << ELEMENTS) - 1
+    __slots__ = ('__known', '__unknown_counts', '__ready', '__instrumentation')
+    instrumentation = None
+
+    def __init__(self, network=None, instrumentation=None):
+        self.__instrumentation = instrumentation
+        known = 0
         if network:
             if Network.is_valid_network(network):
-                self.__network = network
+                known = Network.known_from_matrix(network)
             else :
                 raise NetWorkException("Invalid network!")
-        network = [[0 for i in range(6)] for j in range(9)]
-        network[0][0], network[1][0], network[3][0], network[4][0] = [-1] * 4
-        network[1][1], network[2][1], network[4][1], network[5][1] = [-1] * 4
-        network[3][2], network[4][2], network[5][2], network[6][2], network[8][2] = [-1] * 5
-        network[0][3], network[1][3], network[2][3] = [-1] * 3
-        network[5][4], network[6][4], network[7][4] = [-1] * 3
-        network[3][5], network[4][5], network[5][5], network[8][5] = [-1] * 4
-        self.__network = network
+        self.set_known(known)
+
+    def set_known(self, known: int):
+        '''
+        Replace the known elements by a bitmask, e.g. to deactivate some of
+        them. No element is reported to the instrumentation.
+        '''
+        if not 0 <= known <= Network.ALL_ELEMENTS:
+            NetWorkException.throw(ValueError('Invalid argument'))
+        self.__known = known
+        unknown_counts, self.__ready = known_state(known)
+        self.__unknown_counts = bytearray(unknown_counts)
+
+    def activate_elements(self, elements: int):
+        '''
+        Activate several elements at once, given as a bitmask.
+        '''
+        if not 0 <= elements <= Network.ALL_ELEMENTS:
+            NetWorkException.throw(ValueError('Invalid argument'))
+        new = elements & ~self.__known
+        self.set_known(self.__known | new)
+        instrumentation = self.__instrumentation
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        if instrumentation is not None:
+            while new:
+                bit = new & -new
+                instrumentation.on_activation(bit.bit_length())
+                new ^= bit
     
     @property
-    def network(self):
-        return self.__network
+    def network(self) -> list:
+        '''
+        The matrix view of the network, a line per element and a column per
+        expression: -1 for an unknown element, 1 for a
+        known element and 0 when the element is not related to the expression.
+        '''
+        return [[(1 if self.__known >> i & 1 else -1) if mask >> i & 1 else 0
+                 for mask in Network.EXPRESSION_MASKS]
+                for i in range(Network.ELEMENTS)]
     
     @network.setter
     def network(self, network):
-        self.__network = network.network
+        self.set_known(network.known)
+
+    @property
+    def known(self) -> int:
+        '''
+        The bitmask of the known elements.
+        '''
+        return self.__known
+
+    @classmethod
+    def known_from_matrix(cls, network: list) -> int:
+        '''
+        Get the bitmask of the elements activated in a matrix (see `network`).
+        '''
+        known = 0
+        for i, line in enumerate(network):
+            if 1 in line and -1 not in line:
+                known |= 1 << i
+        return known
+
     @classmethod
     def is_valid_value(cls, value: int, is_element: bool = False) -> bool:
         '''
@@ -64,41 +137,14 @@ class Network:
         if not is_valid:
             return False
         
-        is_valid = (len(network) == 9 and len(network[0]) == 6)
+        is_valid = (len(network) == Network.ELEMENTS and 
+                    all(type(line) == list and len(line) == Network.EXPRESSIONS for line in network))
         if not is_valid:
             return False
-        e_x = [0, 1, 3, 4, 
-               1, 2, 4, 5,
-               3, 4, 5, 6, 8,
-               0, 1, 2,
-               5, 6, 7,
-               3, 4, 5, 8]
-        e_y = [0, 0, 0, 0,
-               1, 1, 1, 1,
-               2, 2, 2, 2, 2,
-               3, 3, 3,
-               4, 4, 4,
-               5, 5, 5, 5]
-        
-        ne_x = [2, 5, 6, 7, 8,
-                0, 3, 6, 7, 8,
-                0, 1, 2, 7,
-                3, 4, 5, 6, 7, 8,
-                0, 1, 2, 3, 4, 8,
-                0, 1, 2, 6, 7]
         
-        ne_y = [0, 0, 0, 0, 0,
-                1, 1, 1, 1, 1,
-                2, 2, 2, 2,
-                3, 3, 3, 3, 3, 3,
-                4, 4, 4, 4, 4, 4,
-                5, 5, 5, 5, 5]
-        e_valid = sum([Network.is_valid_value(network[e_x[i]][e_y[i]], is_element=True) for i in range(23)])
-        ne_valid = sum([Network.is_valid_value(network[ne_x[i]][ne_y[i]]) for i in range(31)])
-        return e_valid == 18 and ne_valid == 22 and is_valid
-    def __active_element(self, row: int, col: list):
-        for i in range(len(col)):
-            self.network[row][col[i]] = 1
+        return all(Network.is_valid_value(network[i][j], is_element=bool(mask >> i & 1))
+                   for j, mask in enumerate(Network.EXPRESSION_MASKS)
+                   for i in range(Network.ELEMENTS))
     def activate_element(self, element: int):
         '''
         Activate element on network.
@@ -115,20 +161,41 @@ class Network:
             8: height from c vertex
             9: p: semi-perimeter of triangle
         '''
-        switcher = {
-            1: lambda: self.__active_element(0, [0, 3]),
-            2: lambda: self.__active_element(1, [0, 1, 3]),
-            3: lambda: self.__active_element(2, [1, 3]),
-            4: lambda: self.__active_element(3, [0, 2, 5]),
-            5: lambda: self.__active_element(4, [0, 1, 2, 5]),
-            6: lambda: self.__active_element(5, [1, 2, 4, 5]),
-            7: lambda: self.__active_element(6, [2, 4]),
-            8: lambda: self.__active_element(7, [4]),
-            9: lambda: self.__active_element(8, [2, 5])
-        }
-        func = switcher.get(element, lambda: NetWorkException.throw(ValueError('Invalid argument')))
-        
-        return func()
+        if not 1 <= element <= Network.ELEMENTS:
+            NetWorkException.throw(ValueError('Invalid argument'))
+        bit = 1 << (element - 1)
+        if self.__known & bit:
+            return
+        self.__known |= bit
+        for expression in Network.ELEMENT_EXPRESSIONS[element]:
+            self.__unknown_counts[expression] -= 1
+            if self.__unknown_counts[expression] == 1:
+                self.__ready |= 1 << (expression - 1)
+            else:
+                self.__ready &= ~(1 << (expression - 1))
+        instrumentation = self.__instrumentation
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.on_activation(element)
+
+    def is_known(self, element: int) -> bool:
+        '''
+        Check if an element (start from 1) is activated.
+        '''
+        return bool(self.__known >> (element - 1) & 1)
+    
+    def unknown_count(self, expression: int) -> int:
+        '''
+        Get the number of unknown elements of an expression (start from 1).
+        '''
+        return self.__unknown_counts[expression]
+
+    def next_ready(self) -> int:
+        '''
+        Get the lowest expression with exactly one unknown element, 0 if none.
+        '''
+        return (self.__ready & -self.__ready).bit_length()
     
     def get_unknown_element(self, expression: int) -> int:
         '''
@@ -144,18 +211,27 @@ class Network:
         int:
             The index of the element (start from 1).
         '''
-        pos = -1
-        expression -= 1
-        for i in range(9):
-            if self.network[i][expression] == -1:
-                if pos == -1:
-                    pos = i
-                else:
-                    return -1
-        
-        return pos + 1
+        if not 1 <= expression <= Network.EXPRESSIONS:
+            NetWorkException.throw(ValueError('Invalid argument'))
+        unknown = Network.EXPRESSION_MASKS[expression - 1] & ~self.__known
+        if unknown & (unknown - 1):
+            return -1
+        return unknown.bit_length()
+
     def __str__(self) -> str:
         s = ''
         for line in self.network:
             s += '\t'.join(map(str, line))
-        return s
\ No newline at end of file
+        return s
+
+@lru_cache(maxsize=4096)
+def known_state(known: int) -> tuple:
+    '''
+    The state of a network of a known-set, so that `set_known` is a lookup once
+    the known-set has been seen: the number of unknown elements of each
+    expression (index 0 unused), and the bitmask of the expressions with
+    exactly one unknown element.
+    '''
+    counts = bytes([0] + [bin(mask & ~known).count('1') for mask in Network.EXPRESSION_MASKS])
+    ready = sum(1 << expression for expression, count in enumerate(counts[1:]) if count == 1)
+    return counts, ready
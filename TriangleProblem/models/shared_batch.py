@@ -0,0 +1,117 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .triangle_batch import (
+    TriangleBatch,
+    TriangleBatchException
+)
+'''
+Shared Batch
+=====
+Complete a large array of triangles on every core without pickling rows.
+
+The (n, 9) input is copied once into a (9, n) float64 array in shared memory.
+Each task only receives the name of the block, its shape and a range of rows:
+the worker attaches the block, solves its rows with TriangleBatch, in place,
+and returns nothing. The result is read back from the block, which is then
+released.
+
+Every row is solved by the same vectorized formulas as a serial
+`TriangleBatch`, so the result is identical to it, whatever the split.
+'''
+'''
+The fewest rows of a task: below, the round trip to a worker costs more
+than solving the rows.
+'''
+MIN_TASK_ROWS = 16384
+
+def attach(name: str) -> SharedMemory:
+    '''
+    Attach a shared memory block without tracking it: the block belongs to the
+    process which created it, while the resource tracker of a worker would
+    unlink it when the worker exits.
+    '''
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def solve_rows(name: str, size: int, start: int, end: int):
+    '''
+    Complete the rows [start, end) of the (9, size) array of a shared memory block.
+    '''
+    block = attach(name)
+    try:
+        values = np.ndarray((9, size), dtype=np.float64, buffer=block.buf)
+        TriangleBatch.from_values(values[:, start:end]).spreading_activation()
+        del values
+    finally:
+        block.close()
+
+def split_rows(size: int, tasks: int) -> list:
+    '''
+    Split `size` rows into at most `tasks` ranges of almost the same length.
+    '''
+    tasks = max(1, min(tasks, size))
+    bounds = np.linspace(0, size, tasks + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def solve_shared(values: np.ndarray, workers: int = None, executor: ProcessPoolExecutor = None,
+                 min_task_rows: int = MIN_TASK_ROWS) -> np.ndarray:
+    '''
+    Complete every row of an array of triangles on a process pool.
+    Parameters
+    ----------
+    values: np.ndarray
+        The (n, 9) triangles, columns in the order of ELEMENTS, NaN where unknown.
+    workers: int
+        The number of processes, default the number of CPUs.
+    executor: ProcessPoolExecutor
+        The pool to run the tasks on, e.g. to reuse it between calls.
+    min_task_rows: int
+        The fewest rows sent to a worker; a smaller input is solved in this process.
+    Returns
+    -------
+    np.ndarray:
+        The completed (n, 9) array, NaN where still unknown.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2 or values.shape[1] != 9:
+        raise TriangleBatchException('Expected an array of shape (n, 9)')
+    size = values.shape[0]
+    workers = workers or os.cpu_count() or 1
+    ranges = split_rows(size, min(workers * 4, size // max(min_task_rows, 1)))
+    if len(ranges) <= 1 or (workers <= 1 and executor is None):
+        result = np.ascontiguousarray(values.T)
+        TriangleBatch.from_values(result).spreading_activation()
+        return np.ascontiguousarray(result.T)
+
+    block = SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        shared = np.ndarray((9, size), dtype=np.float64, buffer=block.buf)
+        shared[:] = values.T
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [executor.submit(solve_rows, block.name, size, start, end) for start, end in ranges]
+            for future in futures:
+                future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+        result = shared.T.copy()
+        del shared
+        return result
+    finally:
+        block.close()
+        block.unlink()
@@ -0,0 +1,114 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from .network import Network
+from .triangle_formulas import TRIANGLE_NETWORK
+'''
+Solve Plan
+=====
+The firing order of the spreading activation only depends on the known-set,
+so it is compiled into a plan the first time the known-set is solved, by a
+propagation of models.engine on the registry (its cost grows with the edges of
+the network, not with its 2^elements known-sets), and cached:
+
+- known: the bitmask of the given elements (bit (i - 1) for element i)
+- steps: the ordered (expression, element) pairs to evaluate
+- reachable: the bitmask of the known elements once every step has run
+
+Like `TriangleSemantic.spreading_activation`, the lowest expression with
+exactly one unknown element always fires first.
+
+When only some elements are needed, `get_goal_plan` chains backward from them
+and keeps the fewest expressions that derive them.
+'''
+SolvePlan = namedtuple('SolvePlan', ['known', 'steps', 'reachable'])
+
+def compile_plan(known: int) -> SolvePlan:
+    '''
+    Compile the plan of a known-set.
+    Parameters
+    ----------
+    known: int
+        The bitmask of the known elements.
+    Returns
+    -------
+    SolvePlan:
+        The steps to run and the elements reachable from the known-set.
+    '''
+    if not 0 <= known <= Network.ALL_ELEMENTS:
+        raise ValueError('Invalid argument')
+    propagation = TRIANGLE_NETWORK.propagation()
+    elements = known
+    while elements:
+        bit = elements & -elements
+        propagation.activate(bit.bit_length() - 1)
+        elements ^= bit
+    steps = []
+    reachable = known
+    formula = propagation.next_ready()
+    while formula >= 0:
+        variable = propagation.unknown_variable(formula)
+        steps.append((formula + 1, variable + 1))
+        reachable |= 1 << variable
+        propagation.activate(variable)
+        formula = propagation.next_ready()
+    return SolvePlan(known, tuple(steps), reachable)
+
+@lru_cache(maxsize=4096)
+def get_plan(known: int) -> SolvePlan:
+    '''
+    Get the plan of a known-set, compiled on its first use.
+    '''
+    return compile_plan(known)
+
+def is_solvable(known: int) -> bool:
+    '''
+    Check if every element can be derived from a known-set.
+    '''
+    return get_plan(known).reachable == Network.ALL_ELEMENTS
+
+@lru_cache(maxsize=4096)
+def get_goal_plan(known: int, targets: int) -> SolvePlan:
+    '''
+    Compile the shortest plan deriving the targets from a known-set.
+    Backward chaining, level by level: each step picks a pending element, to be
+    derived after the steps still to come, and one of its expressions, whose other
+    elements become pending unless they are known. An element derived by a later
+    step can't be used by an earlier one, and every expression is used at most
+    once. The first level with no pending element holds a minimal plan.
+    Parameters
+    ----------
+    known: int
+        The bitmask of the known elements.
+    targets: int
+        The bitmask of the needed elements. Those which can't be reached from
+        the known-set are left out.
+    Returns
+    -------
+    SolvePlan:
+        The steps, in firing order, and the elements known once they have run.
+    '''
+    if not 0 <= targets <= Network.ALL_ELEMENTS:
+        raise ValueError('Invalid argument')
+    targets &= get_plan(known).reachable
+    # pending, derived later, used expressions, steps in backward order
+    frontier = {(targets & ~known, 0, 0): ()}
+    while frontier:
+        next_frontier = {}
+        for (pending, derived, used), steps in frontier.items():
+            if not pending:
+                return SolvePlan(known, steps[::-1], known | derived)
+            goals = pending
+            while goals:
+                goal = goals & -goals
+                goals &= ~goal
+                element = goal.bit_length()
+                for expression in Network.ELEMENT_EXPRESSIONS[element]:
+                    bit = 1 << (expression - 1)
+                    others = Network.EXPRESSION_MASKS[expression - 1] & ~goal
+                    if used & bit or others & derived:
+                        continue
+                    state = ((pending & ~goal) | (others & ~known), derived | goal, used | bit)
+                    next_frontier.setdefault(state, steps + ((expression, element),))
+        frontier = next_frontier
+    raise ValueError('Invalid argument')
\ No newline at end of file
@@ -0,0 +1,125 @@
+import numpy as np
+
+from .solve_plan import get_plan
+from .triangle_formulas import (
+    ELEMENTS,
+    TRIANGLE_NETWORK
+)
+'''
+Triangle Batch
+=====
+Vectorized solver for many partially specified triangles at once.
+
+The columns follow the element order of the semantic network:
+
+- alpha, beta, delta: Degrees of each vertex
+- a, b, c: Length of edges
+- square: The square of triangle
+- height_c: The altitude from vertex C
+- p: The semi-perimeter of the triangle
+
+Unknown values are NaN. Rows are grouped by their set of known elements and
+each group fires the same formulas, in the same order, as
+`TriangleSemantic.spreading_activation` does for a single triangle.
+'''
+
+class TriangleBatchException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+'''
+(expression, element) -> the vectorized solver of the element in the
+expression, declared next to the scalar one in the registry of
+models.triangle_formulas. Elements are indexed from 1.
+'''
+FORMULAS = {(expression + 1, element + 1): formula.vectorized.get(element)
+            for expression, formula in enumerate(TRIANGLE_NETWORK.formulas)
+            for element in formula.solvers}
+if None in FORMULAS.values():
+    raise TriangleBatchException('Every solver of TRIANGLE_NETWORK needs a vectorized version')
+
+class TriangleBatch:
+    def __init__(self, alpha=None, beta=None, delta=None, a=None, b=None, c=None,
+                 square=None, height_c=None, p=None) -> None:
+        '''
+        Columns of the triangles to complete. Every given column must have the
+        same length; a missing column is fully unknown. NaN marks an unknown value.
+        '''
+        columns = [alpha, beta, delta, a, b, c, square, height_c, p]
+        columns = [None if column is None else np.atleast_1d(column).astype(float)
+                   for column in columns]
+        sizes = {len(column) for column in columns if column is not None}
+        if len(sizes) > 1:
+            raise TriangleBatchException('Columns must have the same length')
+        values = np.full((len(ELEMENTS), sizes.pop() if sizes else 0), np.nan)
+        for i, column in enumerate(columns):
+            if column is not None:
+                values[i] = column
+        self.__values = values
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> 'TriangleBatch':
+        '''
+        Build a batch from a (n, 9) array whose columns follow `ELEMENTS`.
+        '''
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 2 or values.shape[1] != len(ELEMENTS):
+            raise TriangleBatchException('Expected an array of shape (n, {})'.format(len(ELEMENTS)))
+        return cls(*values.T)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> 'TriangleBatch':
+        '''
+        Use a (9, n) float array (e.g. a view of shared memory) as the batch,
+        without a copy: the batch is completed in place.
+        '''
+        if values.ndim != 2 or values.shape[0] != len(ELEMENTS) or values.dtype != np.float64:
+            raise TriangleBatchException('Expected a float64 array of shape ({}, n)'.format(len(ELEMENTS)))
+        triangle_batch = cls.__new__(cls)
+        triangle_batch.__values = values
+        return triangle_batch
+
+    @property
+    def values(self) -> np.ndarray:
+        '''
+        The (9, n) array of element values, NaN where still unknown.
+        '''
+        return self.__values
+
+    @property
+    def known_masks(self) -> np.ndarray:
+        '''
+        The known-set of each row as a bitmask, bit (i - 1) for element i.
+        '''
+        known = ~np.isnan(self.__values)
+        return (known * (1 << np.arange(len(ELEMENTS)))[:, None]).sum(axis=0)
+
+    def spreading_activation(self) -> 'TriangleBatch':
+        '''
+        Complete every row in place. Rows sharing a known-set are solved
+        together with one vectorized evaluation per fired formula.
+        Invalid inputs (e.g. an `asin` outside its domain) yield NaN.
+        '''
+        groups, inverse, counts = np.unique(self.known_masks, return_inverse=True,
+                                            return_counts=True)
+        order = np.argsort(inverse, kind='stable')
+        ends = np.cumsum(counts)
+        with np.errstate(all='ignore'):
+            for known_mask, end, count in zip(groups, ends, counts):
+                steps = get_plan(int(known_mask)).steps
+                if not steps:
+                    continue
+                rows = order[end - count:end]
+                values = self.__values[:, rows]
+                for expression, element in steps:
+                    values[element - 1] = FORMULAS[(expression, element)](values, np)
+                self.__values[:, rows] = values
+        return self
+
+    def solve(self) -> dict:
+        '''
+        Complete every row and return the columns by element name.
+        '''
+        self.spreading_activation()
+        return dict(zip(ELEMENTS, self.__values))
@@ -0,0 +1,95 @@
+from math import (
+    asin,
+    sin,
+    sqrt,
+    radians,
+    degrees
+)
+
+from .engine import FormulaRegistry
+'''
+Triangle Formulas
+=====
+The declarative registry of the triangle problem (see models.engine). The
+elements are the variables, the expressions are the formulas, both indexed
+from 1 in the order they are declared. Network and TriangleSemantic are built
+from the compiled TRIANGLE_NETWORK.
+
+The solvers receive the values in the order of ELEMENTS; angles are in degrees.
+Each formula also declares its vectorized solvers, next to the scalar ones,
+for models.triangle_batch: they receive the columns of the elements and numpy,
+and give NaN where the scalar solver would raise.
+'''
+ANGLE = 180.0
+'''
+The name of each element, in the order of its index (start from 1).
+'''
+ELEMENTS = ('alpha', 'beta', 'delta', 'a', 'b', 'c', 'square', 'height_c', 'p')
+ALPHA, BETA, DELTA, A, B, C, SQUARE, HEIGHT_C, P = range(len(ELEMENTS))
+
+TRIANGLE = FormulaRegistry(ELEMENTS)
+TRIANGLE.formula('a/sin(alpha) = b/sin(beta)', {
+    ALPHA: lambda v: degrees(asin((v[A] * sin(radians(v[BETA]))) / v[B])),
+    BETA: lambda v: degrees(asin((v[B] * sin(radians(v[ALPHA]))) / v[A])),
+    A: lambda v: (v[B] * sin(radians(v[ALPHA]))) / sin(radians(v[BETA])),
+    B: lambda v: (v[A] * sin(radians(v[BETA]))) / sin(radians(v[ALPHA])),
+}, vectorized={
+    ALPHA: lambda v, np: np.degrees(np.arcsin((v[A] * np.sin(np.radians(v[BETA]))) / v[B])),
+    BETA: lambda v, np: np.degrees(np.arcsin((v[B] * np.sin(np.radians(v[ALPHA]))) / v[A])),
+    A: lambda v, np: (v[B] * np.sin(np.radians(v[ALPHA]))) / np.sin(np.radians(v[BETA])),
+    B: lambda v, np: (v[A] * np.sin(np.radians(v[BETA]))) / np.sin(np.radians(v[ALPHA])),
+})
+TRIANGLE.formula('c/sin(delta) = b/sin(beta)', {
+    BETA: lambda v: degrees(asin((v[B] * sin(radians(v[DELTA]))) / v[C])),
+    DELTA: lambda v: degrees(asin((v[C] * sin(radians(v[BETA]))) / v[B])),
+    B: lambda v: (v[C] * sin(radians(v[BETA]))) / sin(radians(v[DELTA])),
+    C: lambda v: (v[B] * sin(radians(v[DELTA]))) / sin(radians(v[BETA])),
+}, vectorized={
+    BETA: lambda v, np: np.degrees(np.arcsin((v[B] * np.sin(np.radians(v[DELTA]))) / v[C])),
+    DELTA: lambda v, np: np.degrees(np.arcsin((v[C] * np.sin(np.radians(v[BETA]))) / v[B])),
+    B: lambda v, np: (v[C] * np.sin(np.radians(v[BETA]))) / np.sin(np.radians(v[DELTA])),
+    C: lambda v, np: (v[B] * np.sin(np.radians(v[DELTA]))) / np.sin(np.radians(v[BETA])),
+})
+TRIANGLE.formula('square = sqrt(p(p-a)(p-b)(p-c))', {
+    A: lambda v: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[B]) * (v[P]-v[C]))),
+    B: lambda v: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[A]) * (v[P]-v[C]))),
+    C: lambda v: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[A]) * (v[P]-v[B]))),
+    SQUARE: lambda v: sqrt(v[P] * (v[P]-v[A]) * (v[P]-v[B]) * (v[P]-v[C])),
+    P: lambda v: (v[A]+v[B]+v[C]) / 2,
+}, vectorized={
+    A: lambda v, np: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[B]) * (v[P]-v[C]))),
+    B: lambda v, np: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[A]) * (v[P]-v[C]))),
+    C: lambda v, np: v[P] - (v[SQUARE]**2 / (v[P] * (v[P]-v[A]) * (v[P]-v[B]))),
+    SQUARE: lambda v, np: np.sqrt(v[P] * (v[P]-v[A]) * (v[P]-v[B]) * (v[P]-v[C])),
+    P: lambda v, np: (v[A]+v[B]+v[C]) / 2,
+})
+TRIANGLE.formula('alpha + beta + delta = pi', {
+    ALPHA: lambda v: ANGLE - v[BETA] - v[DELTA],
+    BETA: lambda v: ANGLE - v[ALPHA] - v[DELTA],
+    DELTA: lambda v: ANGLE - v[ALPHA] - v[BETA],
+}, vectorized={
+    ALPHA: lambda v, np: ANGLE - v[BETA] - v[DELTA],
+    BETA: lambda v, np: ANGLE - v[ALPHA] - v[DELTA],
+    DELTA: lambda v, np: ANGLE - v[ALPHA] - v[BETA],
+})
+TRIANGLE.formula('square = 1/2(hc * c)', {
+    C: lambda v: (2*v[SQUARE]) / v[HEIGHT_C],
+    SQUARE: lambda v: 0.5 * (v[HEIGHT_C]*v[C]),
+    HEIGHT_C: lambda v: (2*v[SQUARE]) / v[C],
+}, vectorized={
+    C: lambda v, np: (2*v[SQUARE]) / v[HEIGHT_C],
+    SQUARE: lambda v, np: 0.5 * (v[HEIGHT_C]*v[C]),
+    HEIGHT_C: lambda v, np: (2*v[SQUARE]) / v[C],
+})
+TRIANGLE.formula('p = (a+b+c)/2', {
+    A: lambda v: 2*v[P] - v[B] - v[C],
+    B: lambda v: 2*v[P] - v[A] - v[C],
+    C: lambda v: 2*v[P] - v[A] - v[B],
+    P: lambda v: 0.5 * (v[A]+v[B]+v[C]),
+}, vectorized={
+    A: lambda v, np: 2*v[P] - v[B] - v[C],
+    B: lambda v, np: 2*v[P] - v[A] - v[C],
+    C: lambda v, np: 2*v[P] - v[A] - v[B],
+    P: lambda v, np: 0.5 * (v[A]+v[B]+v[C]),
+})
+TRIANGLE_NETWORK = TRIANGLE.compile()
@@ -1,12 +1,16 @@
-from math import (
-    asin, 
-    sin, 
-    sqrt, 
-    pi, 
-    radians, 
-    degrees
-)
+from array import array
+from collections import namedtuple
+from time import perf_counter
+from .instrumentation import Instrumentation
 from .network import Network
+from .triangle_formulas import (
+    ELEMENTS,
+    TRIANGLE_NETWORK
+)
+from .solve_plan import (
+    get_goal_plan,
+    get_plan
+)
 '''
 Triangle Semantic Network
 =====
@@ -33,17 +37,8 @@ p = (a + b + c)/2
 
 Semantic Network:
 -----
-Optimized:
-       | (1) | (2) | (3) | (4) | (5) | (6) 
-alpha  | -1  |  0  |  0  | -1  |  0  |  0 
-beta   | -1  | -1  |  0  | -1  |  0  |  0 
-delta  |  0  | -1  |  0  | -1  |  0  |  0 
-a      | -1  |  0  | -1  |  0  |  0  | -1 
-b      | -1  | -1  | -1  |  0  |  0  | -1 
-c      |  0  | -1  | -1  |  0  | -1  | -1 
-square |  0  |  0  | -1  |  0  | -1  |  0 
-hc     |  0  |  0  |  0  |  0  | -1  |  0 
-p      |  0  |  0  | -1  |  0  |  0  | -1 
+The elements and the recipes are declared in the registry of
+models.triangle_formulas; `Network().network` is the matrix of the network.
 
 Pre-conditions:
 -----
@@ -53,148 +48,321 @@ class TriangleSemanticException(Exception):
     @classmethod
     def throw(cls, ex):
         raise ex
-ANGLE = 180.0
+'''
+The immutable state of a triangle (see TriangleSemantic.snapshot):
+- values: the value of each element, in the order of ELEMENTS (-1 if unknown)
+- known: the bitmask of the known elements of the network
+- sources: the bitmask of the elements each element was calculated from, in
+  the order of ELEMENTS (0 if given or unknown)
+'''
+TriangleSnapshot = namedtuple('TriangleSnapshot', ['values', 'known', 'sources'])
+ELEMENT_INDEXES = {name: i + 1 for i, name in enumerate(ELEMENTS)}
+UNKNOWN_VALUES = array('d', [-1.0] * len(ELEMENTS))
+# the smallest unsigned type holding a bitmask of the elements, None beyond 64
+SOURCES_TYPECODE = next((code for code in 'BHILQ' if array(code).itemsize * 8 >= len(ELEMENTS)), None)
+
+def new_sources(sources) -> array:
+    '''
+    A copy of the sources of the elements, in an array of SOURCES_TYPECODE
+    (a list of ints when the bitmasks don't fit in 64 bits).
+    '''
+    return list(sources) if SOURCES_TYPECODE is None else array(SOURCES_TYPECODE, sources)
+
+NO_SOURCES = new_sources([0] * len(ELEMENTS))
 class TriangleSemantic:
-    def __init__(self) -> None:
+    '''
+    The values are stored in an array of doubles, in the order of ELEMENTS,
+    and the formulas are looked up in the class table FORMULAS, built from the
+    formula registry of the triangle (see models.triangle_formulas).
+
+    `instrumentation` on the class is the instrumentation of every triangle
+    (see set_instrumentation); a triangle created with its own one uses it
+    instead.
+    '''
+    __slots__ = ('__values', '__network', '__evaluations', '__sources', '__instrumentation')
+    instrumentation = None
+
+    '''
+    (expression, element) -> the solver of the element in the expression, from
+    the registry of models.triangle_formulas. Its argument is the values, in
+    the order of ELEMENTS.
+    '''
+    FORMULAS = {(expression + 1, element + 1): solver
+                for expression, formula in enumerate(TRIANGLE_NETWORK.formulas)
+                for element, solver in formula.solvers.items()}
+
+    def __init__(self, instrumentation: Instrumentation = None) -> None:
         '''
         - a, b, c: length of sides
         - alpha, beta, delta
         - height_c: altitude from vertex C
         - square
         - p: semi-perimeter 
+        - instrumentation: callbacks of this triangle and its network (see
+          models.instrumentation), None for the one set on the class
+        '''
+        self.__instrumentation = instrumentation
+        self.__values = array('d', UNKNOWN_VALUES)
+        self.__network = Network(instrumentation=instrumentation)
+        self.__evaluations = 0
+        # the bitmask of the elements each element was calculated from (0 if
+        # given or unknown)
+        self.__sources = new_sources(NO_SOURCES)
+
+    @classmethod
+    def from_known(cls, solve: bool = True, instrumentation: Instrumentation = None, **values) -> 'TriangleSemantic':
         '''
-        self.__a, self.__b, self.__c, self.__alpha, self.__beta, self.__delta, self.__height_c, self.__square, self.__p = [-1.0] * 9
-        self.__network = Network()
+        Create a triangle from all its known elements at once.
+        Every value is assigned and activated first, then the plan of the
+        known-set (see models.solve_plan) is executed, so no expression is
+        calculated from a partial input and no expression is scanned.
+        Parameters
+        ----------
+        solve: bool
+            False to only assign the values, e.g. before `solve(targets)`.
+        instrumentation: Instrumentation
+            The callbacks of this triangle, None for the one set on the class.
+        values: float
+            The known elements by name (see ELEMENTS); None values are skipped.
+        Returns
+        -------
+        TriangleSemantic:
+            The completed triangle.
+        '''
+        return cls(instrumentation).reset(solve=solve, **values)
+
+    def reset(self, solve: bool = True, **values) -> 'TriangleSemantic':
+        '''
+        Forget every element, then assign the known ones as `from_known`, so
+        that one triangle (e.g. per thread) is reused for many problems.
+        Returns
+        -------
+        TriangleSemantic:
+            The triangle itself.
+        '''
+        element_values = self.__values
+        element_values[:] = UNKNOWN_VALUES
+        self.__network.set_known(0)
+        self.__evaluations = 0
+        self.__sources[:] = NO_SOURCES
+        known = 0
+        for name, value in values.items():
+            element = ELEMENT_INDEXES.get(name)
+            if element is None:
+                TriangleSemanticException.throw(ValueError('Invalid argument'))
+            if value is None:
+                continue
+            element_values[element - 1] = value
+            known |= 1 << (element - 1)
+        if known:
+            self.__network.activate_elements(known)
+        if solve:
+            # table lookup of the firing order, then straight-line evaluation
+            plan = get_plan(known)
+            if plan.steps:
+                self.execute_plan(plan)
+        return self
+
+    @property
+    def evaluations(self) -> int:
+        '''
+        The number of expressions calculated so far.
+        '''
+        return self.__evaluations
+
+    @property
+    def inputs(self) -> list:
+        '''
+        The names of the known elements which were given, not calculated.
+        '''
+        return [name for i, name in enumerate(ELEMENTS)
+                if self.network.is_known(i + 1) and not self.__sources[i]]
+
+    def update(self, **changes) -> dict:
+        '''
+        Change some given elements and re-calculate only the elements which
+        depend on them.
+        Every calculated element remembers the elements of its expression: the
+        elements calculated from a changed element, directly or not, are
+        invalidated (back to -1), the others keep their value, then the
+        spreading activation completes the triangle from there.
+        Parameters
+        ----------
+        changes: float
+            The new given elements by name (see ELEMENTS); None to forget an
+            element. An unchanged value is ignored.
+        Returns
+        -------
+        dict:
+            The elements whose value has changed, by name, with their new value
+            (-1 when it became unknown).
+        '''
+        changed = 0
+        for name, value in changes.items():
+            if name not in ELEMENTS:
+                TriangleSemanticException.throw(ValueError('Invalid argument'))
+            element = ELEMENT_INDEXES[name]
+            given = self.network.is_known(element) and not self.__sources[element - 1]
+            if value is None and not given:
+                continue
+            if value is not None and given and value == self.get_element_by_index(element):
+                continue
+            changed |= 1 << (element - 1)
+        if not changed:
+            return {}
+
+        before = self.__values.tolist()
+        invalid = grown = changed
+        while grown:
+            grown = 0
+            for i, sources in enumerate(self.__sources):
+                if sources & invalid and not invalid >> i & 1:
+                    grown |= 1 << i
+            invalid |= grown
+        for i in range(Network.ELEMENTS):
+            if invalid >> i & 1:
+                self.__values[i] = -1.0
+                self.__sources[i] = 0
+        self.network.set_known(self.network.known & ~invalid)
+        for name, value in changes.items():
+            if value is not None:
+                self.__values[ELEMENT_INDEXES[name] - 1] = value
+                self.network.activate_element(ELEMENT_INDEXES[name])
+        self.spreading_activation(self.network.next_ready())
+
+        return {name: self.__values[i] for i, name in enumerate(ELEMENTS)
+                if self.__values[i] != before[i]}
+
     @property
     def a(self) -> float:
-        return self.__a
+        return self.__values[3]
     
     @a.setter
     def a(self, value: float):
-        self.__a = value
+        self.__values[3] = value
         self.network.activate_element(4)
         self.spreading_activation(1)
     
     def set_a(self, value: float):
-        self.__a = value
+        self.__values[3] = value
     @property
     def b(self) -> float:
-        return self.__b
+        return self.__values[4]
     
     @b.setter
     def b(self, value: float):
-        self.__b = value
+        self.__values[4] = value
         self.network.activate_element(5)
         self.spreading_activation(1)
     
     def set_b(self, value: float):
-        self.__b = value
+        self.__values[4] = value
     @property
     def c(self) -> float:
-        return self.__c
+        return self.__values[5]
     
     @c.setter
     def c(self, value: float):
-        self.__c = value
+        self.__values[5] = value
         self.network.activate_element(6)
         self.spreading_activation(2)
     def set_c(self, value: float):
-        self.__c = value
+        self.__values[5] = value
     @property
     def alpha(self) -> float:
         '''
         The value of 'alpha' angle in DEGREE
         '''
-        return self.__alpha
+        return self.__values[0]
     
     @alpha.setter
     def alpha(self, value: float):
-        self.__alpha = value
+        self.__values[0] = value
         self.network.activate_element(1)
         self.spreading_activation(1)
     
     def set_alpha(self, value: float):
-        self.__alpha = value
+        self.__values[0] = value
     
     @property
     def beta(self) -> float:
         '''
         The value of 'beta' angle in DEGREE
         '''
-        return self.__beta
+        return self.__values[1]
     
     @beta.setter
     def beta(self, value: float):
-        self.__beta = value
+        self.__values[1] = value
         self.network.activate_element(2)
         self.spreading_activation(1)
     
     def set_beta(self, value: float):
-        self.__beta = value
+        self.__values[1] = value
     
     @property
     def delta(self) -> float:
         '''
         The value of 'delta' angle in DEGREE
         '''
-        return self.__delta
+        return self.__values[2]
     
     @delta.setter
     def delta(self, value: float):
-        self.__delta = value
+        self.__values[2] = value
         self.network.activate_element(3)
         self.spreading_activation(2)
     
     def set_delta(self, value: float):
-        self.__delta = value
+        self.__values[2] = value
     
     @property
     def height_c(self) -> float:
         '''
         The altitude from vertex C
         '''
-        return self.__height_c
+        return self.__values[7]
     
     @height_c.setter
-    def height__c(self, value: float):
-        self.__height_c = value
+    def height_c(self, value: float):
+        self.__values[7] = value
         self.network.activate_element(8)
         self.spreading_activation(5)
     
     def set_height_c(self, value: float):
-        self.__height_c = value
+        self.__values[7] = value
     
     @property
     def square(self) -> float:
         '''
         The square of the triangle
         '''
-        return self.__square
+        return self.__values[6]
     
     @square.setter
     def square(self, value: float):
-        self.__square = value
-        self.network.activate_element(6)
+        self.__values[6] = value
+        self.network.activate_element(7)
         self.spreading_activation(3)
     
     def set_square(self, value: float):
-        self.__square = value
+        self.__values[6] = value
     
     @property
     def p(self) -> float:
         '''
         The semi-perimeter of the triangle
         '''
-        return self.__p
+        return self.__values[8]
     
     @p.setter
     def p(self, value: float):
-        self.__p = value
+        self.__values[8] = value
         self.network.activate_element(9)
         self.spreading_activation(3)
     
     def set_p(self, value: float):
-        self.__p = value
+        self.__values[8] = value
     
     @property
     def network(self) -> Network:
@@ -207,12 +375,53 @@ class TriangleSemantic:
     
     @network.setter
     def network(self, network: Network):
-        _network = Network(network)
-        self._network = _network
+        self.set_network(network)
     
     def set_network(self, network: Network):
-        _network = Network(network)
-        self._network = _network
+        '''
+        Copy the known elements of a Network, or of a 9x6 matrix, to the
+        network of the triangle. The values are not changed.
+        '''
+        if not isinstance(network, Network):
+            network = Network(network)
+        self.network.set_known(network.known)
+        for i in range(Network.ELEMENTS):
+            if not network.is_known(i + 1):
+                self.__sources[i] = 0
+
+    def snapshot(self) -> TriangleSnapshot:
+        '''
+        Capture the values and the network of the triangle.
+        '''
+        return TriangleSnapshot(
+            tuple(self.__values),
+            self.network.known,
+            tuple(self.__sources))
+
+    def restore(self, snapshot: TriangleSnapshot):
+        '''
+        Go back to a snapshot of a triangle.
+        '''
+        self.__values = array('d', snapshot.values)
+        self.network.set_known(snapshot.known)
+        self.__sources = new_sources(snapshot.sources)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: TriangleSnapshot, instrumentation: Instrumentation = None) -> 'TriangleSemantic':
+        '''
+        Create a triangle from a snapshot, e.g. to branch several times from
+        the same partial state without solving it again.
+        '''
+        triangle_semantic = cls(instrumentation)
+        triangle_semantic.restore(snapshot)
+        return triangle_semantic
+
+    def fork(self) -> 'TriangleSemantic':
+        '''
+        Copy the triangle, with its instrumentation; the copy and the triangle
+        are then independent.
+        '''
+        return self.from_snapshot(self.snapshot(), self.__instrumentation)
     # For testing
     def __str__(self) -> str:
         network = ''
@@ -231,200 +440,6 @@ The semantic network:
 '''.format(a=self.a, b=self.b, c=self.c, alpha=self.alpha, beta=self.beta, 
 delta=self.delta, hc=self.height_c, s=self.square, p=self.p, network=network)
     
-    def __calculate_1(self, e_not_know: int) -> float:
-        '''
-        (1) a/sin(alpha) = b/sin(beta)
-        Calculate:
-            - a: (b*sin(alpha))/sin(beta)
-            - b: (a*sin(beta))/sin(alpha)
-            - alpha: (asin((a*sin(beta))/b)*180)/pi
-            - beta: (asin((b*sin(alpha)/a)*180)/pi
-        
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            1: Calculate alpha (in degree)
-            2: Calculate beta (in degree)
-            4: Calculate a
-            5: Calculate b
-        
-        Returns
-        -------
-        float: 
-            Value of a, b, alpha or beta
-        '''
-        switcher = {
-            1: lambda: degrees(asin((self.a * sin(radians(self.beta))) / self.b)),
-            2: lambda: degrees(asin((self.b * sin(radians(self.alpha))) / self.a)),
-            4: lambda: (self.b * sin(radians(self.alpha))) / sin(radians(self.beta)),
-            5: lambda: (self.a * sin(radians(self.beta))) / sin(radians(self.alpha))
-        }
-        func = switcher.get(e_not_know, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
-    
-    def __calculate_2(self, e_unknown: int) -> float:
-        '''
-        (2) c/sin(delta) = b/sin(beta)
-        Calculate:
-            - beta: (asin((b*sin(delta)/c)*180)/pi
-            - delta: (asin((c*sin(beta))/b)*180)/pi
-            - b: (c*sin(beta))/sin(delta)
-            - c: (b*sin(delta))/sin(beta)
-            
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            2: Calculate beta (in degree)
-            3: Calculate delta (in degree)
-            5: Calculate b
-            6: Calculate c
-        
-        Returns
-        -------
-        float: 
-            Value of c, b delta or beta
-        '''
-        switcher = {
-            2: lambda: degrees(asin((self.b * sin(radians(self.delta))) / self.c)),
-            3: lambda: degrees(asin((self.c * sin(radians(self.beta))) / self.b)),
-            5: lambda: (self.c * sin(radians(self.beta))) / sin(radians(self.delta)),
-            6: lambda: (self.b * sin(radians(self.delta))) / sin(radians(self.beta))
-        }
-        func = switcher.get(e_unknown, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
-    
-    def __calculate_3(self, e_not_know: int) -> float:
-        '''
-        (3) square = sqrt(p(p-a)(p-b)(p-c))
-        Calculate:
-            - square: sqrt(p(p-a)(p-b)(p-c))
-            - p = (a+b+c)/s
-            - a = p - (s^2/(p(p-b)(p-c)))
-            - b = p - (s^2/(p(p-a)(p-c)))
-            - c = p - (s^2/(p(p-a)(p-b)))
-        
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            4: Calculate a
-            5: Calculate b
-            6: Calculate c
-            7: Calculate square
-            9: Calculate p
-        
-        Returns
-        -------
-        float: 
-            Value of a, b, c or square
-        '''
-        switcher = {
-            1: lambda: self.p - (self.s**2 / (self.p * (self.p-self.b) * (self.p-self.c))),
-            2: lambda: self.p - (self.s**2 / (self.p * (self.p-self.a) * (self.p-self.c))),
-            3: lambda: self.p - (self.s**2 / (self.p * (self.p-self.a) * (self.p-self.b))),
-            7: lambda: sqrt(self.p * (self.p-self.a) * (self.p-self.b) * (self.p-self.__c)) / 2,
-            9: lambda: (self.a+self.b+self.c) / 2
-        }
-        func = switcher.get(e_not_know, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        
-        return func()
-    
-    def __calculate_4(self, e_not_know: int) -> float:
-        '''
-        (4) alpha + beta + delta = pi
-        Calculate:
-            - alpha: 180 - beta - delta
-            - beta: 180 - alpha - delta
-            - delta: 180 - alpha - beta
-        
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            1: Calculate alpha (in degree)
-            2: Calculate beta (in degree)
-            3: Calculate delta (in degree)
-        
-        Returns
-        -------
-        float: 
-            Value of alpha, beta or delta
-        '''
-        switcher = {
-            1: lambda: ANGLE - self.beta - self.delta,
-            2: lambda: ANGLE - self.alpha - self.delta,
-            3: lambda: ANGLE - self.alpha - self.beta
-        }
-        func = switcher.get(e_not_know, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
-    def __calculate_5(self, e_not_know: int) -> float:
-        '''
-        (5) square = 1/2(hc * c)
-        Calculate:
-            - square: 0.5*(height_c * c)
-            - height_c: (2 * square)/c
-            - c: (2 * square)/height_c
-        
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            6: Calculate c
-            7: Calculate square
-            8: Calculate height_c
-                   
-        Returns
-        -------
-        float: 
-            Value of square, height or c
-        '''
-        switcher = {
-            6: lambda: (2*self.square) / self.height_c,
-            7: lambda: 0.5 * (self.height_c*self.c),
-            8: lambda: (2*self.square) / self.c
-        }
-        func = switcher.get(e_not_know, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
-    
-    def __calculate_6(self, e_not_know: int) -> float:
-        '''
-        (6) p = (a+b+c)/2
-        Calculate:
-            - p = (a+b+c)/2
-            - a = 2p - b - c
-            - b = 2p - a - c
-            - c = 2p - a - b
-        
-        Parameters
-        ----------
-        e_unknow: int
-            Element not known and need to be calculated
-            Input should within:
-            4: Calculate a
-            5: Calculate b
-            6: Calculate c
-            9: Calculate p
-        
-        Returns
-        -------
-        float: 
-            Value of p, a, b or c
-        '''
-        switcher = {
-            4: lambda: 2*self.p - self.b - self.c,
-            5: lambda: 2*self.p - self.a - self.c,
-            6: lambda: 2*self.p - self.b - self.b,
-            9: lambda: 0.5 * (self.a+self.b+self.c),
-        }
-        func = switcher.get(e_not_know, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
     def get_element_by_index(self, index: int) -> float:
         '''
         Get the value of an element throught index.
@@ -446,19 +461,9 @@ delta=self.delta, hc=self.height_c, s=self.square, p=self.p, network=network)
         float:
             The value of each element.
         '''
-        switcher = {
-            1: lambda: self.alpha,
-            2: lambda: self.beta,
-            3: lambda: self.delta,
-            4: lambda: self.a,
-            5: lambda: self.b,
-            6: lambda: self.c,
-            7: lambda: self.square,
-            8: lambda: self.height_c,
-            9: lambda: self.p
-        }
-        func = switcher.get(index, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
+        if not 1 <= index <= Network.ELEMENTS:
+            TriangleSemanticException.throw(ValueError('Invalid argument'))
+        return self.__values[index - 1]
     def set_e_value_by_index(self, index: int, value: float):
         '''
         Set the value of an element throught index.
@@ -478,19 +483,9 @@ delta=self.delta, hc=self.height_c, s=self.square, p=self.p, network=network)
         value: float
             Value of the element
         '''
-        switcher = {
-            1: lambda: self.set_alpha(value),
-            2: lambda: self.set_beta(value),
-            3: lambda: self.set_delta(value),
-            4: lambda: self.set_a(value),
-            5: lambda: self.set_b(value),
-            6: lambda: self.set_c(value),
-            7: lambda: self.set_square(value),
-            8: lambda: self.set_height_c(value),
-            9: lambda: self.set_p(value)
-        }
-        func = switcher.get(index, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
+        if not 1 <= index <= Network.ELEMENTS:
+            TriangleSemanticException.throw(ValueError('Invalid argument'))
+        self.__values[index - 1] = value
     
     def calculate_expression_controller(self, expression: int, element_unknown: int):
         '''
@@ -513,25 +508,35 @@ delta=self.delta, hc=self.height_c, s=self.square, p=self.p, network=network)
         element_unknown: int
             The element need to be calculated.
         '''
-        switcher = {
-            1: lambda: self.__calculate_1(element_unknown),
-            2: lambda: self.__calculate_2(element_unknown),
-            3: lambda: self.__calculate_3(element_unknown),
-            4: lambda: self.__calculate_4(element_unknown),
-            5: lambda: self.__calculate_5(element_unknown),
-            6: lambda: self.__calculate_6(element_unknown)
-        }
-        func = switcher.get(expression, lambda: TriangleSemanticException.throw(ValueError('Invalid argument')))
-        return func()
+        formula = self.FORMULAS.get((expression, element_unknown))
+        if formula is None:
+            TriangleSemanticException.throw(ValueError('Invalid argument'))
+        self.__evaluations += 1
+        instrumentation = self.__instrumentation
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+            if instrumentation is None:
+                return formula(self.__values)
+        start = perf_counter()
+        try:
+            value = formula(self.__values)
+        except Exception as ex:
+            instrumentation.on_formula(expression, element_unknown, perf_counter() - start, ex)
+            raise
+        instrumentation.on_formula(expression, element_unknown, perf_counter() - start)
+        return value
     
     def spreading_activation(self, expression: int):
         '''
-        Calculate an expression and update an unknown element.
-        Loop:
-            1> Begin from 1.
-            2> Find unknown element.
-            3> If has, calculate the expression. Go back 1.
-            4> Can't calculate the expression (or it is calculated). Go to next expression.
+        Calculate an expression and propagate the new element through the network.
+        Worklist:
+            1> Calculate the expression if it has exactly one unknown element.
+            2> Activating the new element only updates the unknown counters of
+               its related expressions (see Network.ELEMENT_EXPRESSIONS).
+            3> Take the lowest expression left with one unknown element and
+               calculate it. Go back 2.
+        The lowest ready expression always fires first, so the fixed point is the
+        same as rescanning every expression from 1 after each new element.
         Parameters
         ----------
         expression: int
@@ -543,20 +548,79 @@ delta=self.delta, hc=self.height_c, s=self.square, p=self.p, network=network)
             5: square = 1/2(hc * c)
             6: p = (a+b+c)/2
         '''
-        unknown_element = self.network.get_unknown_element(expression)
-        if unknown_element == -1 or unknown_element == 0:
+        if self.network.unknown_count(expression) != 1:
             return
-        
-        value = self.calculate_expression_controller(expression, unknown_element)
-        self.set_e_value_by_index(unknown_element, value)
-        self.network.activate_element(unknown_element)
-        index = 1
-        while index <= 6:
-            unknown_element = self.network.get_unknown_element(index)
-            if unknown_element == -1 or unknown_element == 0:
-                index += 1
-                continue
-            value = self.calculate_expression_controller(index, unknown_element)
-            self.set_e_value_by_index(unknown_element, value)
-            self.network.activate_element(unknown_element)
-            index = 1
\ No newline at end of file
+        instrumentation = self.__instrumentation
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.on_propagation_start(self, expression)
+        iterations = 0
+        try:
+            while expression:
+                self.__fire(expression)
+                iterations += 1
+                expression = self.network.next_ready()
+        finally:
+            if instrumentation is not None:
+                instrumentation.on_propagation_end(self, iterations)
+
+    def __fire(self, expression: int) -> int:
+        unknown_element = self.network.get_unknown_element(expression)
+        self.__derive(expression, unknown_element)
+        return unknown_element
+
+    def __derive(self, expression: int, element: int):
+        value = self.calculate_expression_controller(expression, element)
+        self.set_e_value_by_index(element, value)
+        self.__sources[element - 1] = Network.EXPRESSION_MASKS[expression - 1] & ~(1 << (element - 1))
+        self.network.activate_element(element)
+
+    def execute_plan(self, plan=None):
+        '''
+        Complete the triangle from a plan, by default the plan of its known
+        elements. The steps are evaluated in order, which gives the same
+        result as the spreading activation.
+        Returns
+        -------
+        SolvePlan:
+            The plan that has been executed.
+        '''
+        if plan is None:
+            plan = get_plan(self.network.known)
+        instrumentation = self.__instrumentation
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.on_propagation_start(self, 0)
+        iterations = 0
+        try:
+            for expression, element in plan.steps:
+                self.__derive(expression, element)
+                iterations += 1
+        finally:
+            if instrumentation is not None:
+                instrumentation.on_propagation_end(self, iterations)
+        return plan
+
+    def solve(self, targets: list = None):
+        '''
+        Calculate the requested elements only, through the shortest backward chain
+        of expressions from the known elements. Other elements may stay unknown.
+        Parameters
+        ----------
+        targets: list
+            The names of the needed elements (see ELEMENTS). None for all of them.
+        Returns
+        -------
+        SolvePlan:
+            The plan that has been executed.
+        '''
+        if targets is None:
+            return self.execute_plan()
+        mask = 0
+        for name in targets:
+            if name not in ELEMENTS:
+                TriangleSemanticException.throw(ValueError('Invalid argument'))
+            mask |= 1 << ELEMENTS.index(name)
+        return self.execute_plan(get_goal_plan(self.network.known, mask))
\ No newline at end of file
@@ -1,4 +1,15 @@
-from os import name
-from flask import Blueprint
+'''
+The blueprints of the app, in the order they are registered: the hooks of a
+request run in this order (the timer of /metrics and the request log start
+before the admission control, so that a rejected request is counted and
+logged).
+'''
+BLUEPRINTS = ('index', 'assets', 'triangle', 'metrics', 'request_log', 'admission')
 
-from . import index
\ No newline at end of file
+def register_blueprints(app):
+    '''
+    Import the route modules and register their blueprints on an app.
+    '''
+    from importlib import import_module
+    for name in BLUEPRINTS:
+        app.register_blueprint(import_module('.' + name, __name__).bp)
@@ -0,0 +1,76 @@
+from flask import (
+    Blueprint,
+    current_app,
+    g,
+    jsonify,
+    request
+)
+
+from ..services.admission import (
+    ADMITTED,
+    AdmissionController
+)
+from .metrics import metrics_collector
+'''
+Admission control of the solve endpoints: at most TRIANGLE_MAX_CONCURRENT
+requests are solved at once by a worker, TRIANGLE_MAX_QUEUE more wait for a
+slot up to TRIANGLE_QUEUE_TIMEOUT seconds, and the others are answered at once
+with 503 and a `Retry-After` header, before their body is read.
+
+A slot is released when the request is torn down, so a streamed batch holds
+its slot until its body has been sent.
+
+Config:
+    - TRIANGLE_MAX_CONCURRENT: the solve requests running at once in a worker
+      (None: no limit)
+    - TRIANGLE_MAX_QUEUE: the solve requests waiting for a slot in a worker
+    - TRIANGLE_QUEUE_TIMEOUT: the seconds a request waits for a slot
+    - TRIANGLE_RETRY_AFTER: the `Retry-After` of the rejected requests, in
+      seconds
+'''
+ENDPOINTS = ('triangle.triangle_calculator', 'triangle.triangle_calculator_get',
+             'triangle.triangle_calculator_batch')
+
+bp = Blueprint('admission', __name__)
+
+def get_admission_controller() -> AdmissionController:
+    '''
+    The admission controller of the app, created from its config on first use.
+    '''
+    controller = current_app.extensions.get('triangle_admission')
+    if controller is None:
+        controller = current_app.extensions.setdefault('triangle_admission', AdmissionController(
+            max_concurrent=current_app.config['TRIANGLE_MAX_CONCURRENT'],
+            max_queue=current_app.config['TRIANGLE_MAX_QUEUE'],
+            queue_timeout=current_app.config['TRIANGLE_QUEUE_TIMEOUT']))
+    return controller
+
+@bp.before_app_request
+def admit_request():
+    if request.endpoint not in ENDPOINTS:
+        return None
+    result = get_admission_controller().acquire()
+    if result == ADMITTED:
+        g.admitted = True
+        return None
+    response = jsonify({'status':503, 'message':'Server busy, retry later', 'data':{}})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(current_app.config['TRIANGLE_RETRY_AFTER'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.teardown_app_request
+def release_request(exception=None):
+    if g.pop('admitted', False):
+        get_admission_controller().release()
+
+@metrics_collector
+def collect_metrics(metrics):
+    '''
+    Export the outcomes of the admissions, and the requests running and waiting.
+    '''
+    stats = get_admission_controller().stats()
+    for result in ('admitted', 'queued', 'shed', 'timeout'):
+        metrics.set('triangle_admission_total', stats[result], result=result)
+    metrics.set('triangle_admission_active', stats['active'])
+    metrics.set('triangle_admission_waiting', stats['waiting'])
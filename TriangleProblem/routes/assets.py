@@ -0,0 +1,96 @@
+import mimetypes
+import os
+
+import click
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    request,
+    send_from_directory,
+    url_for
+)
+
+from ..services.static_assets import (
+    ENCODINGS,
+    build_assets,
+    load_manifest,
+    negotiate_encoding
+)
+'''
+Static assets built for long-lived caching (see services.static_assets):
+
+    flask --app TriangleProblem build-assets
+
+`asset_url('css/style.css')` in a template gives the URL of the hashed file on
+/assets, or the plain static URL when the file has not been built. /assets
+serves the brotli or gzip variant accepted by the client, with
+`Cache-Control: public, max-age=31536000, immutable`.
+
+Config:
+    - TRIANGLE_ASSETS_DIR: the folder of the built files (None: assets/ in
+      the package)
+'''
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# cli_group=None: `flask build-assets`, not `flask assets build-assets`
+bp = Blueprint('assets', __name__, cli_group=None)
+
+def get_assets_dir() -> str:
+    return current_app.config['TRIANGLE_ASSETS_DIR'] or os.path.join(current_app.root_path, 'assets')
+
+def get_manifest() -> dict:
+    '''
+    The manifest of the built assets, loaded on first use.
+    '''
+    manifest = current_app.extensions.get('triangle_assets_manifest')
+    if manifest is None:
+        manifest = current_app.extensions.setdefault('triangle_assets_manifest', load_manifest(get_assets_dir()))
+    return manifest
+
+def get_built_assets() -> dict:
+    '''
+    The assets of the manifest by hashed path.
+    '''
+    assets = current_app.extensions.get('triangle_assets')
+    if assets is None:
+        assets = current_app.extensions.setdefault('triangle_assets', {
+            asset['path']: asset for asset in get_manifest().values()})
+    return assets
+
+@bp.app_template_global()
+def asset_url(filename: str) -> str:
+    '''
+    The URL of a static file: its hashed copy when built.
+    '''
+    asset = get_manifest().get(filename)
+    if asset is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', filename=asset['path'])
+
+@bp.route('/assets/<path:filename>', endpoint='asset')
+def serve_asset(filename: str):
+    asset = get_built_assets().get(filename)
+    if asset is None:
+        abort(404)
+    encoding = negotiate_encoding(request.accept_encodings, asset['encodings'])
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_from_directory(get_assets_dir(), filename + ENCODINGS[encoding] if encoding else filename,
+                                   mimetype=mimetype, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset['encodings']:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    '''
+    Build the hashed and compressed static files.
+    '''
+    manifest = build_assets(current_app.static_folder, get_assets_dir())
+    current_app.extensions.pop('triangle_assets_manifest', None)
+    current_app.extensions.pop('triangle_assets', None)
+    for source, asset in sorted(manifest.items()):
+        click.echo('{} -> {} {}'.format(source, asset['path'], ' '.join(asset['encodings'])))
@@ -1,9 +1,10 @@
 from flask import (
-    Flask,
+    Blueprint,
     render_template
 )
-from TriangleProblem import app
 
-@app.route('/', endpoint='index')
+bp = Blueprint('index', __name__)
+
+@bp.route('/', endpoint='index')
 def index():
-    return render_template("index.html")
\ No newline at end of file
+    return render_template("index.html")
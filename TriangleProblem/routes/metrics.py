@@ -0,0 +1,107 @@
+from functools import partial
+from time import perf_counter
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    g,
+    request
+)
+
+from ..services.metrics import (
+    CONTENT_TYPE,
+    Metrics
+)
+'''
+Metrics of the app, served on /metrics in the Prometheus text format.
+
+Every request is counted by route, method and status code, and timed from
+`before_request` to `after_request` (for a streamed response, until its body
+starts). A route times its own phases with `record_phases`.
+
+Config:
+    - TRIANGLE_METRICS_DIR: the directory shared by the workers of a server to
+      aggregate their metrics (None: the metrics of the serving worker only)
+    - TRIANGLE_METRICS_FLUSH_INTERVAL: the seconds between two writes of the
+      metrics of a worker to the directory
+'''
+'''
+The functions called with the Metrics before a report, to set the samples
+counted elsewhere (e.g. the counters of the result cache).
+'''
+collectors = []
+
+bp = Blueprint('metrics', __name__)
+
+def metrics_collector(func):
+    collectors.append(func)
+    return func
+
+def get_metrics() -> Metrics:
+    '''
+    The metrics of the app, created from its config on first use.
+    '''
+    metrics = current_app.extensions.get('triangle_metrics')
+    if metrics is None:
+        metrics = current_app.extensions.setdefault('triangle_metrics', Metrics(
+            directory=current_app.config['TRIANGLE_METRICS_DIR'],
+            flush_interval=current_app.config['TRIANGLE_METRICS_FLUSH_INTERVAL'],
+            on_flush=partial(collect, current_app._get_current_object())))
+    return metrics
+
+def collect(app, metrics: Metrics):
+    '''
+    Call the collectors in the context of the app: the flusher thread has none.
+    '''
+    with app.app_context():
+        for func in collectors:
+            func(metrics)
+
+def route_name() -> str:
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def observe_phases(route: str, **phases) -> str:
+    '''
+    Observe the duration (seconds) of each phase of a request to a route.
+    Returns
+    -------
+    str:
+        The phases as a `Server-Timing` header, in milliseconds.
+    '''
+    metrics = get_metrics()
+    for phase, seconds in phases.items():
+        metrics.observe('triangle_request_phase_duration_seconds', seconds, route=route, phase=phase)
+    return ', '.join('{};dur={:.3f}'.format(phase, seconds * 1000) for phase, seconds in phases.items())
+
+def record_phases(response: Response, **phases) -> Response:
+    '''
+    Observe the phases of the current request and add them to the
+    `Server-Timing` header of its response.
+    '''
+    response.headers['Server-Timing'] = observe_phases(route_name(), **phases)
+    return response
+
+def record_request(route: str, method: str, status: int, seconds: float):
+    '''
+    Count a request and observe its duration.
+    '''
+    metrics = get_metrics()
+    metrics.inc('triangle_http_requests_total', route=route, method=method, status=status)
+    metrics.observe('triangle_http_request_duration_seconds', seconds, route=route)
+    metrics.start()
+
+@bp.before_app_request
+def start_timer():
+    g.request_start = perf_counter()
+
+@bp.after_app_request
+def stop_timer(response: Response) -> Response:
+    start = g.pop('request_start', None)
+    if start is not None:
+        record_request(route_name(), request.method, response.status_code, perf_counter() - start)
+    return response
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(get_metrics().render(), content_type=CONTENT_TYPE)
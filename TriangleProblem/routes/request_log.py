@@ -0,0 +1,81 @@
+from time import perf_counter
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    g,
+    has_app_context,
+    request
+)
+
+from ..utils.log_manager import LogManager
+'''
+Request log: one JSON line per request (see utils.log_manager), written when
+the response is closed, so a streamed response is logged once its body has
+been sent.
+
+Every line has the method, route, status and duration; a route adds its own
+fields (inputs, known elements, solve path, phase timings...) with
+`log_fields`, and an exception caught by a route with `log_exception`.
+
+Config:
+    - TRIANGLE_LOG_FILE: the file the lines are appended to (None: stderr)
+    - TRIANGLE_LOG_SAMPLE_RATE: the fraction of the requests logged; the
+      requests with an exception or a 5xx status are always logged
+'''
+bp = Blueprint('request_log', __name__)
+
+def get_log_manager() -> LogManager:
+    '''
+    The log manager of the app, created from its config on first use.
+    '''
+    log_manager = current_app.extensions.get('triangle_log_manager')
+    if log_manager is None:
+        log_manager = current_app.extensions.setdefault('triangle_log_manager', LogManager(
+            path=current_app.config['TRIANGLE_LOG_FILE'],
+            sample_rate=current_app.config['TRIANGLE_LOG_SAMPLE_RATE']))
+    return log_manager
+
+def log_fields(**fields):
+    '''
+    Add fields to the log line of the current request.
+    '''
+    if has_app_context() and 'request_log' in g:
+        g.request_log.update(fields)
+
+def log_exception(ex: BaseException):
+    '''
+    Attach an exception to the log line of the current request (the first
+    one only, e.g. for a batch).
+    '''
+    if has_app_context() and 'request_log' in g:
+        g.request_log.setdefault('exception', ex)
+
+@bp.before_app_request
+def start_request_log():
+    g.request_log = {}
+    g.request_log_start = perf_counter()
+
+@bp.after_app_request
+def write_request_log(response: Response) -> Response:
+    if 'request_log' not in g:
+        return response
+    log_manager = get_log_manager()
+    start = g.request_log_start
+    event = {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule is not None else request.path,
+        'status': response.status_code
+    }
+    fields = g.request_log
+
+    def write():
+        # a streamed response adds its fields while its body is sent
+        event.update(fields)
+        exception = event.pop('exception', None)
+        event['duration_ms'] = (perf_counter() - start) * 1000
+        log_manager.log(event, exception, always=event['status'] >= 500)
+
+    response.call_on_close(write)
+    return response
@@ -1,14 +1,83 @@
-from flask.wrappers import Response
-from TriangleProblem.models import triangle_semantic
+import hashlib
+import json
+import math
+import os
+from collections import (
+    Counter,
+    OrderedDict
+)
+from threading import (
+    Lock,
+    local
+)
+from time import perf_counter
+
+from flask import Blueprint
+from flask import Response
+from flask import current_app
 from flask import jsonify
+from flask import redirect
 from flask import request
+from flask import stream_with_context
+from urllib.parse import urlencode
 
 from ..utils.response_status import STATUS, get_status
-from TriangleProblem import app
 from ..models import TriangleSemantic
+from ..models.triangle_semantic import ELEMENTS
+from ..services import closed_form
+from ..services.result_cache import (
+    ResultCache,
+    canonical
+)
+from ..services.sqlite_cache import SqliteCache
+from ..utils.json_stream import iter_items
+from .metrics import (
+    metrics_collector,
+    record_phases
+)
+from .request_log import (
+    log_exception,
+    log_fields
+)
+
+bp = Blueprint('triangle', __name__)
+
+'''
+The fields of the response and the element of each field.
+'''
+FIELDS = {
+    'alpha': 'alpha',
+    'beta': 'beta',
+    'delta': 'delta',
+    'a': 'a',
+    'b': 'b',
+    'c': 'c',
+    's': 'square',
+    'height_c': 'height_c',
+    'p': 'p'
+}
+
+'''
+The params of /triangle_calculator, in the order of `validate_param`.
+'''
+PARAMS = ('alpha', 'beta', 'delta', 'a', 'b', 'c', 's', 'h_c', 'p')
+
+'''
+The number of triangles answered by each path, from the result cache or not:
+a closed form case or 'network'.
+'''
+PATH_NETWORK = 'network'
+path_counts = Counter()
+path_counts_lock = Lock()
 
-@app.route("/triangle_calculator", methods=['POST'])
+'''
+The TriangleSemantic of each thread, reset for every network solve.
+'''
+solvers = local()
+
+@bp.route("/triangle_calculator", methods=['POST'])
 def triangle_calculator():
+    start = perf_counter()
     alpha = request.form.get('alpha', None, float)
     beta = request.form.get('beta', None, float)
     delta = request.form.get('delta', None, float)
@@ -18,43 +87,368 @@ def triangle_calculator():
     s = request.form.get('s', None, float)
     height_c = request.form.get('h_c', None, float)
     p = request.form.get('p', None, float)
+    fields = parse_fields(request.form.getlist('fields'))
+    bypass_cache = is_cache_bypassed(request.form.get('no_cache'))
+    parsed = perf_counter()
+
+    body, cache_status = calculate(alpha, beta, delta, a, b, c, s, height_c, p,
+                                   fields=fields, bypass_cache=bypass_cache)
+    solved = perf_counter()
+    response = jsonify(body)
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    serialized = perf_counter()
+    return log_calculation(response, body, cache_status, start, parsed, solved, serialized,
+                           alpha, beta, delta, a, b, c, s, height_c, p, fields=fields)
+
+@bp.route("/triangle_calculator", methods=['GET'])
+def triangle_calculator_get():
+    '''
+    The cacheable form of /triangle_calculator: the params are in the query
+    string, and the response only depends on them. A query which is not
+    canonical (see `canonical_query`) is redirected to the canonical one, so
+    that every triangle has a single URL. The ETag is derived from the
+    canonical query, so a matching If-None-Match is answered with 304 without
+    solving the triangle.
+
+    Config:
+        - TRIANGLE_GET_MAX_AGE: the max-age of the responses, in seconds
+        - TRIANGLE_GET_VERSION: part of the ETags; change it when the
+          results of the same inputs change (e.g. a new formula)
+    '''
+    start = perf_counter()
+    params = [request.args.get(name, None, float) for name in PARAMS]
+    fields = parse_fields(request.args.getlist('fields'))
+    # invalid fields are answered with an error, which is not cached
+    cacheable = fields != []
+    query = canonical_query(params, fields) if cacheable else None
+    if cacheable and request.query_string.decode('latin-1') != query:
+        response = redirect('{}?{}'.format(request.path, query) if query else request.path, 301)
+        response.headers['Cache-Control'] = get_cache_control()
+        return response
+    etag = get_etag(query) if cacheable else None
+    if cacheable and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = get_cache_control()
+        return response
+    if fields is not None:
+        fields = [field for field in FIELDS if field in fields]
+    parsed = perf_counter()
+
+    alpha, beta, delta, a, b, c, s, height_c, p = params
+    body, cache_status = calculate(alpha, beta, delta, a, b, c, s, height_c, p,
+                                   fields=fields, bypass_cache=is_cache_bypassed())
+    solved = perf_counter()
+    response = jsonify(body)
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    # an error (invalid params, server error) is sent with HTTP 200 too: never cached
+    if cacheable and body['status'] == 200:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = get_cache_control()
+    else:
+        response.headers['Cache-Control'] = 'no-store'
+    serialized = perf_counter()
+    return log_calculation(response, body, cache_status, start, parsed, solved, serialized,
+                           alpha, beta, delta, a, b, c, s, height_c, p, fields=fields)
+
+def canonical_query(params: list, fields: list=None) -> str:
+    '''
+    The canonical query string of a GET: the given params sorted by name, each
+    with the significant digits of the result cache, then the fields, in the
+    order of FIELDS.
+    Parameters
+    ----------
+    params: list
+        The values of PARAMS, None when missing.
+    fields: list
+        The requested fields, None for all of them.
+    '''
+    precision = current_app.config['TRIANGLE_CACHE_PRECISION']
+    query = sorted((name, '{:.{}g}'.format(canonical(value, precision), precision))
+                   for name, value in zip(PARAMS, params) if value is not None)
+    if fields:
+        query.append(('fields', ','.join(field for field in FIELDS if field in fields)))
+    return urlencode(query, safe=',')
 
+def get_etag(query: str) -> str:
+    '''
+    The strong ETag of a canonical query.
+    '''
+    text = '{}\n{}'.format(current_app.config['TRIANGLE_GET_VERSION'], query)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+def get_cache_control() -> str:
+    return 'public, max-age={}, immutable'.format(current_app.config['TRIANGLE_GET_MAX_AGE'])
+
+def log_calculation(response: Response, body: dict, cache_status: str,
+                    start: float, parsed: float, solved: float, serialized: float,
+                    alpha: float=None, beta: float=None, delta: float=None,
+                    a: float=None, b: float=None, c: float=None,
+                    s: float=None, height_c: float=None, p: float=None,
+                    fields: list=None) -> Response:
+    '''
+    Add a calculation to the request log and its phases to the metrics.
+    '''
+    params = dict(zip(PARAMS, (alpha, beta, delta, a, b, c, s, height_c, p)))
+    log_fields(inputs={name: value for name, value in params.items() if value is not None},
+               known=list(known_values(a, b, c, alpha, beta, delta, height_c, s, p)),
+               fields=fields, path=body.get('path'), cache=cache_status,
+               timings_ms={'parse': (parsed - start) * 1000, 'solve': (solved - parsed) * 1000,
+                           'serialize': (serialized - solved) * 1000})
+    return record_phases(response, parse=parsed - start, solve=solved - parsed,
+                         serialize=serialized - solved)
+
+@bp.route("/triangle_calculator/batch", methods=['POST'])
+def triangle_calculator_batch():
+    '''
+    Solve many triangles in one request. The body is a JSON array, or NDJSON,
+    of objects with the params of /triangle_calculator. The response streams one
+    JSON line per item, as soon as it is solved, with its own status and the
+    index of the item. A bad item only fails its own line.
+    '''
+    bypass_cache = is_cache_bypassed()
+
+    def generate():
+        # the number of items by status, for the request log
+        statuses = Counter()
+        log_fields(statuses=statuses)
+        for index, (item, error) in enumerate(iter_items(request.stream)):
+            body = calculate_item(item, error, bypass_cache)
+            statuses[body['status']] += 1
+            yield json.dumps(dict(index=index, **body)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def calculate_item(item, error: str = None, bypass_cache: bool = False) -> dict:
+    '''
+    Calculate one item of a batch.
+    '''
+    if error is not None:
+        return {'status':400, 'message':error, 'data':{}}
+    if not isinstance(item, dict):
+        return {'status':400, 'message':'Item must be an object', 'data':{}}
+    params = []
+    for name in PARAMS:
+        value = item.get(name)
+        if value is None or value == '':
+            params.append(None)
+            continue
+        try:
+            if isinstance(value, bool):
+                raise ValueError(value)
+            params.append(float(value))
+        except (TypeError, ValueError):
+            return {'status':400, 'message':'Invalid value of {}'.format(name), 'data':{}}
+    fields = item.get('fields')
+    if not isinstance(fields, list):
+        fields = [] if fields is None else [fields]
+    fields = parse_fields([str(field) for field in fields])
+    body, _ = calculate(*params, fields=fields,
+                        bypass_cache=bypass_cache or is_cache_bypassed(item.get('no_cache')))
+    return body
+
+def calculate(alpha: float=None, beta: float=None, delta: float=None,
+              a: float=None, b: float=None, c: float=None,
+              s: float=None, height_c: float=None, p: float=None,
+              fields: list=None, bypass_cache: bool=False) -> tuple:
+    '''
+    Validate the params and solve the triangle through the result cache.
+    Returns
+    -------
+    tuple:
+        The body of the response and the cache status (HIT, MISS, BYPASS or
+        None when the triangle has not been solved).
+    '''
     # Validate params
     is_valid = validate_param(alpha, beta, delta, a, b, c, s, height_c, p)
-    if not is_valid:
-        return jsonify({'status':400, 'message':'Giá trị cung cấp chưa chính xác hoặc lỗi.','data':{}})
+    if not is_valid or fields == []:
+        return {'status':400, 'message':'Giá trị cung cấp chưa chính xác hoặc lỗi.','data':{}}, None
     try:
-        triangle_semantic = create_triangle_semantic(a, b, c, alpha, beta, delta, height_c, s, p)
-        response_data = {
-            'alpha': triangle_semantic.alpha,
-            'beta': triangle_semantic.beta,
-            'delta': triangle_semantic.delta,
-            'a': triangle_semantic.a,
-            'b': triangle_semantic.b,
-            'c': triangle_semantic.c,
-            's': triangle_semantic.square,
-            'height_c': triangle_semantic.height_c,
-            'p': triangle_semantic.p
-        }
-
-        for key, value in response_data.items():
-            if value < 0:
-                response_data[key] = 0
-
-        return jsonify({'status':200, 'message':'OK','data':response_data})
+        cache_key, result, cache_status = lookup_result(a, b, c, alpha, beta, delta, height_c, s, p,
+                                                        fields=fields, bypass_cache=bypass_cache)
+        if result is None:
+            result = solve_triangle(a, b, c, alpha, beta, delta, height_c, s, p, fields=fields)
+            get_result_cache().put(cache_key, result)
+        # the path of a cached result too, so that the split covers every response
+        count_path(result[1])
+        return make_body(result, fields), cache_status
     
-    except Exception:
-        return jsonify({'status':500, 'message':'Server Error!','data':{}})
+    except Exception as ex:
+        log_exception(ex)
+        return {'status':500, 'message':'Server Error!','data':{}}, None
+
+def lookup_result(a: float=None, b: float=None, c: float=None,
+                  alpha: float=None, beta: float=None, delta: float=None,
+                  height_c: float=None, square: float=None, p: float=None,
+                  fields: list=None, bypass_cache: bool=False, solver: str=None) -> tuple:
+    '''
+    Look the triangle up in the result cache.
+    Parameters
+    ----------
+    solver: str
+        The solver of the result when it is not `solve_triangle`, e.g. 'batch'
+        for the async mode, whose results always complete the whole triangle:
+        its results are cached under their own keys.
+    Returns
+    -------
+    tuple:
+        The cache key, the result (None on a miss) and the cache status.
+    '''
+    cache = get_result_cache()
+    cache_key = get_cache_key(cache, a, b, c, alpha, beta, delta, height_c, square, p,
+                              fields=fields, solver=solver)
+    if bypass_cache:
+        return cache_key, None, 'BYPASS'
+    result = cache.get(cache_key)
+    return cache_key, result, 'HIT' if result is not None else 'MISS'
+
+def get_cache_key(cache, a: float=None, b: float=None, c: float=None,
+                  alpha: float=None, beta: float=None, delta: float=None,
+                  height_c: float=None, square: float=None, p: float=None,
+                  fields: list=None, solver: str=None) -> tuple:
+    values = known_values(a, b, c, alpha, beta, delta, height_c, square, p)
+    extra = (tuple(fields or ()),) if solver is None else (tuple(fields or ()), solver)
+    return cache.key([values.get(name) for name in ELEMENTS], extra)
+
+def make_body(result: tuple, fields: list=None) -> dict:
+    '''
+    Build the body of a solved triangle; unknown (negative) values are 0.
+    '''
+    data, path = result
+    response_data = {field: data[FIELDS[field]] for field in (fields or FIELDS)}
+
+    for key, value in response_data.items():
+        if value < 0:
+            response_data[key] = 0
+
+    return {'status':200, 'message':'OK','path':path,'data':response_data}
+
+def get_result_cache() -> ResultCache:
+    '''
+    The result cache of the app, created from its config on first use:
+        - TRIANGLE_CACHE_BACKEND: 'memory' (per worker) or 'sqlite' (on disk,
+          shared by the workers and kept across restarts)
+        - TRIANGLE_CACHE_PATH: the database of the sqlite backend (None:
+          triangle_cache.sqlite3 in the instance folder)
+        - TRIANGLE_CACHE_SIZE: the number of results kept (0 disables the cache)
+        - TRIANGLE_CACHE_TTL: the lifetime of a result in seconds (None: no expiry)
+        - TRIANGLE_CACHE_PRECISION: the significant digits of the inputs in the key
+    '''
+    cache = current_app.extensions.get('triangle_result_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('triangle_result_cache', create_result_cache())
+    return cache
+
+def create_result_cache():
+    backend = current_app.config['TRIANGLE_CACHE_BACKEND']
+    if backend == 'memory':
+        return ResultCache(
+            max_size=current_app.config['TRIANGLE_CACHE_SIZE'],
+            ttl=current_app.config['TRIANGLE_CACHE_TTL'],
+            precision=current_app.config['TRIANGLE_CACHE_PRECISION'])
+    if backend == 'sqlite':
+        return SqliteCache(
+            current_app.config['TRIANGLE_CACHE_PATH'] or os.path.join(current_app.instance_path, 'triangle_cache.sqlite3'),
+            max_size=current_app.config['TRIANGLE_CACHE_SIZE'],
+            ttl=current_app.config['TRIANGLE_CACHE_TTL'],
+            precision=current_app.config['TRIANGLE_CACHE_PRECISION'])
+    raise ValueError('Invalid TRIANGLE_CACHE_BACKEND: {}'.format(backend))
+
+def warm_result_cache(path: str, limit: int=None) -> int:
+    '''
+    Solve the requests of a request log (see routes.request_log) into the
+    result cache, from the most recent one, skipping the cached ones.
+    Parameters
+    ----------
+    path: str
+        The JSONL request log.
+    limit: int
+        The number of distinct requests warmed, default the size of the cache.
+    Returns
+    -------
+    int:
+        The number of results added to the cache.
+    '''
+    cache = get_result_cache()
+    limit = cache.max_size if limit is None else limit
+    requests = OrderedDict()
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                event = json.loads(line)
+                if (event.get('route') != '/triangle_calculator' or event.get('path') is None
+                        or 'exception' in event):
+                    continue
+                params = [event['inputs'].get(name) for name in PARAMS]
+                fields = event.get('fields')
+                params = [None if value is None else float(value) for value in params]
+            except (ValueError, TypeError, AttributeError, KeyError):
+                continue
+            if not validate_param(*params) or fields == []:
+                continue
+            alpha, beta, delta, a, b, c, s, height_c, p = params
+            key = get_cache_key(cache, a, b, c, alpha, beta, delta, height_c, s, p, fields=fields)
+            requests[key] = (params, fields)
+            requests.move_to_end(key)
+            if len(requests) > limit:
+                requests.popitem(last=False)
+    added = 0
+    for key, (params, fields) in reversed(requests.items()):
+        if cache.contains(key):
+            continue
+        alpha, beta, delta, a, b, c, s, height_c, p = params
+        try:
+            result = solve_triangle(a, b, c, alpha, beta, delta, height_c, s, p, fields=fields)
+        except Exception:
+            continue
+        cache.put(key, result)
+        added += 1
+    return added
+
+@metrics_collector
+def collect_metrics(metrics):
+    '''
+    Export the solve paths and the counters of the result cache.
+    '''
+    with path_counts_lock:
+        counts = dict(path_counts)
+    for path, count in counts.items():
+        metrics.set('triangle_solve_path_total', count, path=path)
+    cache = get_result_cache()
+    stats = cache.stats()
+    for event in ('hits', 'misses', 'evictions', 'expirations'):
+        metrics.set('triangle_result_cache_total', stats[event], event=event)
+    # the size of a shared cache is not summed over the workers
+    metrics.set('triangle_result_cache_shared_size' if cache.shared else 'triangle_result_cache_size',
+                stats['size'])
+
+def is_cache_bypassed(no_cache=None, cache_control: str=None) -> bool:
+    '''
+    A request skips the cache lookup with a `no_cache` param or a
+    `Cache-Control: no-cache` header (by default, of the current request).
+    Its result still refreshes the cache.
+    '''
+    if str(no_cache).lower() in ('1', 'true', 'yes'):
+        return True
+    if cache_control is None:
+        cache_control = request.headers.get('Cache-Control', '')
+    return 'no-cache' in cache_control.lower()
 
 def validate_param(alpha:int=None, beta:int=None, delta:int=None,
                     a:int=None, b:int=None, c:int=None,
                     s:int=None, h_c:int=None, p:int=None) -> bool:
     '''
     Validate params
-        - All param if exist need greater than 0
+        - All param if exist need to be finite and greater than 0
         - update later
         ...
     '''
+    if any(value is not None and not math.isfinite(value)
+           for value in (alpha, beta, delta, a, b, c, s, h_c, p)):
+        return False
+
     if alpha and alpha <= 0:
         return False
     
@@ -84,36 +478,108 @@ def validate_param(alpha:int=None, beta:int=None, delta:int=None,
 
     return True
 
-def create_triangle_semantic(a: int=None, b: int=None, c: int=None, 
-                            alpha: int=None, beta: int=None, delta: int=None, 
-                            height_c: int=None, square: int=None, p: int=None):
-    triangle_semantic = TriangleSemantic()
-
-    if alpha and alpha > 0:
-        triangle_semantic.alpha = alpha
-
-    if beta and beta > 0:
-        triangle_semantic.beta = beta
-
-    if delta and delta > 0:
-        triangle_semantic.delta = delta
+def parse_fields(values: list):
+    '''
+    Parse the requested fields, given as repeated and/or comma separated values.
+    Returns None when no field is requested (all of them), and an empty list
+    when a field is unknown.
+    '''
+    fields = [field.strip() for value in values for field in value.split(',') if field.strip()]
+    if not fields:
+        return None
+    if any(field not in FIELDS for field in fields):
+        return []
+    return list(dict.fromkeys(fields))
 
-    if a and a > 0:
-        triangle_semantic.a = a
+def solve_triangle(a: int=None, b: int=None, c: int=None, 
+                   alpha: int=None, beta: int=None, delta: int=None, 
+                   height_c: int=None, square: int=None, p: int=None,
+                   fields: list=None) -> tuple:
+    '''
+    Solve the triangle directly when the known params are a textbook case
+    (see services.closed_form), otherwise through the semantic network.
+    Returns
+    -------
+    tuple:
+        The value of each element by name (-1 when unknown) and the path taken:
+        the closed form case or 'network'.
+    '''
+    values = known_values(a, b, c, alpha, beta, delta, height_c, square, p)
+    result = solve_closed_form(values)
+    if result is None:
+        triangle_semantic = create_triangle_semantic(a, b, c, alpha, beta, delta,
+                                                     height_c, square, p, fields=fields,
+                                                     triangle_semantic=get_thread_solver())
+        result = {name: getattr(triangle_semantic, name) for name in ELEMENTS}, PATH_NETWORK
+    return result
 
-    if b and b > 0:
-        triangle_semantic.b = b
+def solve_closed_form(values: dict) -> tuple:
+    '''
+    Solve the triangle directly if its known elements are a textbook case.
+    Returns
+    -------
+    tuple:
+        The value of each element by name and the case, None otherwise.
+    '''
+    path = closed_form.classify(values)
+    data = closed_form.solve(path, values) if path else None
+    return (data, path) if data is not None else None
 
-    if c and c > 0:
-        triangle_semantic.c = c
+def count_path(path: str):
+    with path_counts_lock:
+        path_counts[path] += 1
 
-    if square and square > 0:
-        triangle_semantic.square = square
+def known_values(a: int=None, b: int=None, c: int=None, 
+                 alpha: int=None, beta: int=None, delta: int=None, 
+                 height_c: int=None, square: int=None, p: int=None) -> dict:
+    '''
+    Get the known params by element name.
+    Params which are missing or not greater than 0 are unknown.
+    '''
+    values = {
+        'alpha': alpha,
+        'beta': beta,
+        'delta': delta,
+        'a': a,
+        'b': b,
+        'c': c,
+        'square': square,
+        'height_c': height_c,
+        'p': p
+    }
+    return {name: value for name, value in values.items() if value and value > 0}
 
-    if height_c and height_c > 0:
-        triangle_semantic.height_c = height_c
+def get_thread_solver() -> TriangleSemantic:
+    triangle_semantic = getattr(solvers, 'triangle_semantic', None)
+    if triangle_semantic is None:
+        triangle_semantic = solvers.triangle_semantic = TriangleSemantic()
+    return triangle_semantic
 
-    if p and p > 0:
-        triangle_semantic.p = p
-    
+def create_triangle_semantic(a: int=None, b: int=None, c: int=None, 
+                            alpha: int=None, beta: int=None, delta: int=None, 
+                            height_c: int=None, square: int=None, p: int=None,
+                            fields: list=None, triangle_semantic: TriangleSemantic=None):
+    '''
+    Create the triangle from the known params, or reset `triangle_semantic`
+    with them.
+    Without fields, every element is calculated in a single propagation;
+    otherwise only the expressions needed for the fields are calculated.
+    '''
+    values = known_values(a, b, c, alpha, beta, delta, height_c, square, p)
+    if triangle_semantic is None:
+        triangle_semantic = TriangleSemantic()
+    triangle_semantic.reset(solve=fields is None, **values)
+    if fields is not None:
+        triangle_semantic.solve([FIELDS[field] for field in fields])
     return triangle_semantic
+
+@bp.record_once
+def warm_on_register(state):
+    '''
+    Warm the result cache from TRIANGLE_CACHE_WARM_LOG when the app is created:
+    with `preload_app`, in the gunicorn master, before the workers are forked.
+    '''
+    path = state.app.config['TRIANGLE_CACHE_WARM_LOG']
+    if path and os.path.exists(path):
+        with state.app.app_context():
+            warm_result_cache(path)
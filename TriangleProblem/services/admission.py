@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from collections import deque
+'''
+Admission Control
+=====
+Limit the requests solved at once by a worker, and shed the overflow early
+instead of letting every request slow down:
+
+- max_concurrent: the requests running at once (None: no limit)
+- max_queue: the requests allowed to wait for a free slot; beyond, a request
+  is rejected at once
+- queue_timeout: the seconds a request waits for a slot before it is rejected
+
+A released slot is handed over to the first waiting request, so the queue is
+served in order of arrival and a new request cannot take a slot ahead of it.
+
+The limits hold per process: with gunicorn, a server admits at most
+workers x max_concurrent requests at once. The threads of the Flask app
+`acquire` a slot, the coroutines of the async mode (asgi.py) `acquire_async`
+one from the same controller.
+'''
+ADMITTED = 'admitted'
+QUEUED = 'queued'
+SHED = 'shed'
+TIMEOUT = 'timeout'
+
+class AdmissionException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = None, max_queue: int = 0, queue_timeout: float = 1.0) -> None:
+        if ((max_concurrent is not None and max_concurrent < 1) or max_queue < 0
+                or queue_timeout < 0):
+            AdmissionException.throw(ValueError('Invalid argument'))
+        self.__max_concurrent = max_concurrent
+        self.__max_queue = max_queue
+        self.__queue_timeout = queue_timeout
+        self.__lock = threading.Lock()
+        self.__active = 0
+        # the wake-up callbacks of the waiting requests, in order of arrival
+        self.__queue = deque()
+        self.__counts = {ADMITTED: 0, QUEUED: 0, SHED: 0, TIMEOUT: 0}
+
+    @property
+    def max_concurrent(self) -> int:
+        return self.__max_concurrent
+
+    @property
+    def max_queue(self) -> int:
+        return self.__max_queue
+
+    @property
+    def queue_timeout(self) -> float:
+        return self.__queue_timeout
+
+    def acquire(self) -> str:
+        '''
+        Take a slot, waiting in the queue if it has room.
+        Returns
+        -------
+        str:
+            ADMITTED (possibly after waiting, also counted as QUEUED), SHED when
+            the queue is full, or TIMEOUT when no slot was freed in time. Only
+            an admitted request must `release` its slot.
+        '''
+        event = threading.Event()
+        wake = event.set
+        result = self.__enter(wake)
+        if result != QUEUED:
+            return result
+        event.wait(self.__queue_timeout)
+        return self.__leave(wake)
+
+    async def acquire_async(self) -> str:
+        '''
+        The coroutine version of `acquire`, for the event loop: a queued request
+        awaits its slot instead of blocking the loop. It shares the queue of
+        `acquire`, in order of arrival.
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+        result = self.__enter(wake)
+        if result != QUEUED:
+            return result
+        try:
+            await asyncio.wait_for(future, self.__queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self.__leave(wake) == ADMITTED:
+                self.release()
+            raise
+        return self.__leave(wake)
+
+    def __enter(self, wake) -> str:
+        '''
+        Admit or shed a request at once, or put its wake-up callback in the
+        queue (QUEUED).
+        '''
+        with self.__lock:
+            if self.__max_concurrent is None or self.__active < self.__max_concurrent:
+                self.__active += 1
+                self.__counts[ADMITTED] += 1
+                return ADMITTED
+            if len(self.__queue) >= self.__max_queue:
+                self.__counts[SHED] += 1
+                return SHED
+            self.__counts[QUEUED] += 1
+            self.__queue.append(wake)
+            return QUEUED
+
+    def __leave(self, wake) -> str:
+        '''
+        The outcome of a queued request once woken up or timed out: ADMITTED if
+        `release` handed it a slot (and removed it from the queue), else TIMEOUT.
+        '''
+        with self.__lock:
+            if wake not in self.__queue:
+                return ADMITTED
+            self.__queue.remove(wake)
+            self.__counts[TIMEOUT] += 1
+            return TIMEOUT
+
+    def release(self):
+        '''
+        Free a slot, or hand it over to the first request of the queue.
+        '''
+        with self.__lock:
+            if self.__active <= 0:
+                AdmissionException.throw(RuntimeError('Released more than acquired'))
+            if not self.__queue:
+                self.__active -= 1
+                return
+            wake = self.__queue.popleft()
+            self.__counts[ADMITTED] += 1
+        wake()
+
+    def stats(self) -> dict:
+        '''
+        The requests running and waiting now, and the number of requests of
+        each outcome so far.
+        '''
+        with self.__lock:
+            return dict(self.__counts, active=self.__active, waiting=len(self.__queue))
@@ -0,0 +1,116 @@
+from math import (
+    acos,
+    asin,
+    cos,
+    degrees,
+    radians,
+    sin,
+    sqrt
+)
+'''
+Closed Form
+=====
+Direct solver for the textbook cases, in front of the semantic network.
+Side a is opposite alpha, b opposite beta and c opposite delta.
+
+- SSS: the three sides (law of cosines)
+- SAS: two sides and the angle between them (law of cosines)
+- ASA: two angles and the side between them (law of sines)
+- AAS: two angles and a side which is not between them (law of sines)
+- SSA: two sides and an angle which is not between them (law of sines,
+  the acute solution as given by `asin`, like the semantic network)
+
+The case is found from the exact set of given elements: any other set, or
+an invalid triangle, is left to the semantic network.
+'''
+ANGLE = 180.0
+ANGLES = ('alpha', 'beta', 'delta')
+SIDES = ('a', 'b', 'c')
+
+def classify(names) -> str:
+    '''
+    Get the case of a set of given elements.
+    Parameters
+    ----------
+    names: iterable
+        The names of the given elements.
+    Returns
+    -------
+    str:
+        'SSS', 'SAS', 'ASA', 'AAS', 'SSA' or None.
+    '''
+    names = set(names)
+    angles = [i for i, name in enumerate(ANGLES) if name in names]
+    sides = [i for i, name in enumerate(SIDES) if name in names]
+    if len(angles) + len(sides) != len(names) or len(names) != 3:
+        return None
+    if len(sides) == 3:
+        return 'SSS'
+    if len(sides) == 2 and len(angles) == 1:
+        # the angle between two sides is opposite the third one
+        return 'SAS' if angles[0] not in sides else 'SSA'
+    if len(sides) == 1 and len(angles) == 2:
+        # the side between two angles is opposite the third one
+        return 'ASA' if sides[0] not in angles else 'AAS'
+    return None
+
+def solve(case: str, values: dict) -> dict:
+    '''
+    Calculate the nine elements of a triangle of a given case.
+    Parameters
+    ----------
+    case: str
+        The case returned by `classify`.
+    values: dict
+        The given elements by name.
+    Returns
+    -------
+    dict:
+        The value of every element by name, or None if the values don't make a
+        triangle.
+    '''
+    angles = [values.get(name) for name in ANGLES]
+    sides = [values.get(name) for name in SIDES]
+    try:
+        if case == 'SAS':
+            i = angles.index(next(angle for angle in angles if angle is not None))
+            j, k = [n for n in range(3) if n != i]
+            sides[i] = sqrt(sides[j]**2 + sides[k]**2 - 2*sides[j]*sides[k]*cos(radians(angles[i])))
+        if case in ('SSS', 'SAS'):
+            angles = [_law_of_cosines(sides[i], sides[(i+1) % 3], sides[(i+2) % 3]) for i in range(3)]
+        if case == 'SSA':
+            i = next(n for n in range(3) if angles[n] is not None)
+            j = next(n for n in range(3) if n != i and sides[n] is not None)
+            angles[j] = degrees(asin(sides[j] * sin(radians(angles[i])) / sides[i]))
+        if case in ('ASA', 'AAS', 'SSA'):
+            missing = angles.index(None)
+            angles[missing] = ANGLE - sum(angle for angle in angles if angle is not None)
+            i = next(n for n in range(3) if sides[n] is not None)
+            ratio = sides[i] / sin(radians(angles[i]))
+            sides = [side if side is not None else ratio * sin(radians(angle))
+                     for side, angle in zip(sides, angles)]
+        if case not in ('SSS', 'SAS', 'ASA', 'AAS', 'SSA'):
+            return None
+    except (ValueError, ZeroDivisionError):
+        return None
+    if min(angles) <= 0 or min(sides) <= 0:
+        return None
+    a, b, c = sides
+    square = 0.5 * a * b * sin(radians(angles[2]))
+    return {
+        'alpha': angles[0],
+        'beta': angles[1],
+        'delta': angles[2],
+        'a': a,
+        'b': b,
+        'c': c,
+        'square': square,
+        'height_c': 2 * square / c,
+        'p': (a + b + c) / 2
+    }
+
+def _law_of_cosines(opposite: float, side_1: float, side_2: float) -> float:
+    cosine = (side_1**2 + side_2**2 - opposite**2) / (2 * side_1 * side_2)
+    if not -1.0 < cosine < 1.0:
+        raise ValueError('Invalid triangle')
+    return degrees(acos(cosine))
@@ -0,0 +1,324 @@
+import json
+import os
+from bisect import bisect_left
+from threading import (
+    Lock,
+    Thread
+)
+from time import (
+    sleep,
+    time
+)
+'''
+Metrics
+=====
+Counters, gauges and latency histograms of the app, rendered in the
+Prometheus text format.
+
+A sample is identified by its name and labels. Every worker keeps its own
+samples in memory; with a `directory`, a background thread of the worker
+also writes them to `<directory>/metrics_<pid>.json` every `flush_interval`
+seconds (and before each report), and the report merges the files of every
+worker, so the numbers of a gunicorn server don't depend on the worker
+serving /metrics. The counters and histograms of the workers are summed; each
+gauge is merged by its own rule (GAUGE_MERGE).
+
+A worker which exits leaves its file behind: `mark_process_dead`, called by the
+gunicorn master (see gunicorn.conf.py), folds its counters and histograms into
+`metrics_archive.json` and deletes the file, so its gauges are dropped. The
+gauges of a pid which is no longer alive are skipped anyway.
+'''
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+'''
+The upper bounds of the histogram buckets, in seconds.
+'''
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+'''
+name -> (type, help) of the metrics of the app.
+'''
+METRICS = {
+    'triangle_http_requests_total': ('counter', 'HTTP requests by route, method and status code.'),
+    'triangle_http_request_duration_seconds': ('histogram', 'HTTP request latency by route.'),
+    'triangle_request_phase_duration_seconds': ('histogram', 'Latency of the parse, solve and serialize phases by route.'),
+    'triangle_solve_path_total': ('counter', 'Triangles answered by solve path (a closed form case or the network), cache hits included.'),
+    'triangle_result_cache_total': ('counter', 'Lookups, evictions and expirations of the result cache.'),
+    'triangle_result_cache_size': ('gauge', 'Results held by the result caches of the workers (memory backend).'),
+    'triangle_result_cache_shared_size': ('gauge', 'Results held by the result cache shared by the workers (sqlite backend).'),
+    'triangle_admission_total': ('counter', 'Solve requests admitted, queued, shed or timed out in the queue.'),
+    'triangle_admission_active': ('gauge', 'Solve requests running.'),
+    'triangle_admission_waiting': ('gauge', 'Solve requests waiting for a slot.'),
+}
+
+'''
+name -> how the gauge of several workers is merged: 'sum' (default), 'max', or
+'latest' (the value of the last written snapshot). Only the live workers count.
+'''
+GAUGE_MERGE = {
+    # every worker reports the size of the same database
+    'triangle_result_cache_shared_size': 'max',
+}
+
+ARCHIVE = 'metrics_archive.json'
+
+class MetricsException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+class Metrics:
+    def __init__(self, directory: str = None, flush_interval: float = 1.0, buckets: tuple = BUCKETS,
+                 on_flush=None) -> None:
+        '''
+        Parameters
+        ----------
+        directory: str
+            The directory shared by the workers, None to keep the samples in memory.
+        flush_interval: float
+            The seconds between two writes to the directory.
+        buckets: tuple
+            The upper bounds of the histogram buckets, in seconds.
+        on_flush: callable
+            Called with the Metrics before each write and report, e.g. to set
+            the samples counted elsewhere.
+        '''
+        if flush_interval <= 0 or list(buckets) != sorted(buckets):
+            MetricsException.throw(ValueError('Invalid argument'))
+        self.__directory = directory
+        self.__flush_interval = flush_interval
+        self.__buckets = tuple(buckets)
+        self.__lock = Lock()
+        self.__counters = {}
+        self.__gauges = {}
+        self.__histograms = {}
+        self.__on_flush = on_flush
+        self.__flusher = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def buckets(self) -> tuple:
+        return self.__buckets
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        '''
+        Set a gauge, or the total of a counter counted elsewhere.
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            if METRICS.get(name, ('gauge',))[0] == 'counter':
+                self.__counters[key] = value
+            else:
+                self.__gauges[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        '''
+        Add a duration to a histogram.
+        '''
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect_left(self.__buckets, seconds)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = [0] * (len(self.__buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self) -> dict:
+        '''
+        The samples of this worker, as JSON serializable lists.
+        '''
+        with self.__lock:
+            return {
+                'time': time(),
+                'buckets': list(self.__buckets),
+                'counters': [[name, list(labels), value] for (name, labels), value in self.__counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self.__gauges.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.__histograms.items()]
+            }
+
+    def start(self):
+        '''
+        Start the thread writing to the directory, once per process: a thread
+        started before a fork doesn't run in the child.
+        '''
+        if not self.__directory or self.__flusher == os.getpid():
+            return
+        self.__flusher = os.getpid()
+        Thread(target=self.__run_flusher, name='metrics-flusher', daemon=True).start()
+
+    def __run_flusher(self):
+        while True:
+            sleep(self.__flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self):
+        '''
+        Write the snapshot of this worker to the directory, if there is one.
+        '''
+        if not self.__directory:
+            return
+        if self.__on_flush is not None:
+            self.__on_flush(self)
+        write_snapshot(os.path.join(self.__directory, 'metrics_{}.json'.format(os.getpid())),
+                       self.snapshot())
+
+    def collect(self) -> dict:
+        '''
+        The samples of every worker (of this worker only without a directory).
+        '''
+        if not self.__directory:
+            if self.__on_flush is not None:
+                self.__on_flush(self)
+            return self.snapshot()
+        self.flush()
+        snapshots = []
+        for name in sorted(os.listdir(self.__directory)):
+            if not (name.startswith('metrics_') and name.endswith('.json')):
+                continue
+            snapshot = load_snapshot(os.path.join(self.__directory, name))
+            if snapshot is None:
+                # being replaced, or a worker died while writing
+                continue
+            pid = name[len('metrics_'):-len('.json')]
+            if pid.isdigit() and not is_alive(int(pid)):
+                # not archived yet: keep its counters, not its gauges
+                snapshot['gauges'] = []
+            snapshots.append(snapshot)
+        return merge(snapshots)
+
+    def render(self) -> str:
+        return render(self.collect())
+
+def write_snapshot(path: str, snapshot: dict):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+def load_snapshot(path: str) -> dict:
+    '''
+    The snapshot of a file, None if it is missing or being written.
+    '''
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def is_alive(pid: int) -> bool:
+    if os.name != 'posix':
+        # os.kill would terminate the process
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def mark_process_dead(directory: str, pid: int):
+    '''
+    Fold the counters and histograms of an exited worker into the archive of
+    the directory, and delete its file, so that its gauges are dropped. Call it
+    from a single process, the one reaping the workers (gunicorn `child_exit`).
+    '''
+    path = os.path.join(directory, 'metrics_{}.json'.format(pid))
+    snapshot = load_snapshot(path)
+    if snapshot is not None:
+        snapshot['gauges'] = []
+        archive_path = os.path.join(directory, ARCHIVE)
+        archive = load_snapshot(archive_path)
+        write_snapshot(archive_path, merge([archive, snapshot] if archive else [snapshot]))
+    for name in (path, path + '.tmp'):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+def merge(snapshots: list) -> dict:
+    '''
+    Merge the samples of several snapshots with the same buckets: the counters
+    and histograms are summed, the gauges merged by their GAUGE_MERGE rule.
+    '''
+    merged = {'buckets': [], 'counters': {}, 'gauges': {}, 'histograms': {}}
+    # the time of the snapshot of each latest gauge
+    times = {}
+    for snapshot in snapshots:
+        if merged['buckets'] and snapshot['buckets'] != merged['buckets']:
+            MetricsException.throw(ValueError('Snapshots have different buckets'))
+        merged['buckets'] = snapshot['buckets']
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+        for name, labels, value in snapshot['gauges']:
+            key = (name, tuple(map(tuple, labels)))
+            rule = GAUGE_MERGE.get(name, 'sum')
+            if key not in merged['gauges']:
+                merged['gauges'][key] = value
+            elif rule == 'sum':
+                merged['gauges'][key] += value
+            elif rule == 'max':
+                merged['gauges'][key] = max(merged['gauges'][key], value)
+            elif snapshot.get('time', 0) >= times[key]:
+                merged['gauges'][key] = value
+            times[key] = max(times.get(key, 0), snapshot.get('time', 0))
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = merged['histograms'].get(key)
+            merged['histograms'][key] = values if total is None else [x + y for x, y in zip(total, values)]
+    for kind in ('counters', 'gauges', 'histograms'):
+        merged[kind] = [[name, list(labels), value] for (name, labels), value in merged[kind].items()]
+    return merged
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                          for key, value in labels) + '}'
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(snapshot: dict) -> str:
+    '''
+    Render a snapshot in the Prometheus text format.
+    '''
+    samples = {}
+    for kind in ('counters', 'gauges', 'histograms'):
+        for name, labels, value in snapshot[kind]:
+            samples.setdefault(name, []).append((tuple(map(tuple, labels)), value))
+    lines = []
+    for name in sorted(samples):
+        kind, description = METRICS.get(name, ('untyped', ''))
+        if description:
+            lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for labels, value in sorted(samples[name]):
+            if kind != 'histogram':
+                lines.append('{}{} {}'.format(name, format_labels(labels), format_value(value)))
+                continue
+            cumulative = 0
+            for bound, count in zip(list(snapshot['buckets']) + [float('inf')], value[:-1]):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, format_labels(labels + (('le', format_value(float(bound))),)), cumulative))
+            lines.append('{}_sum{} {}'.format(name, format_labels(labels), format_value(value[-1])))
+            lines.append('{}_count{} {}'.format(name, format_labels(labels), cumulative))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,126 @@
+import asyncio
+
+import numpy as np
+
+from ..models import TriangleBatch
+from ..models.solve_plan import get_plan
+from ..models.triangle_semantic import ELEMENTS
+'''
+Micro Batcher
+=====
+Solve the triangles of concurrent requests together: the triangles submitted
+within `window` seconds of the first one (or until `max_batch_size` of them
+are waiting) are completed by one TriangleBatch, then each waiting request
+gets its own row back.
+
+A request waits at most `window` seconds more than when solved alone (plus
+the batch itself). The batch is solved in the default executor of the loop,
+not on the loop itself. The batcher belongs to the event loop it is first
+used on.
+'''
+class MicroBatcherException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+class MicroBatcher:
+    def __init__(self, window: float = 0.002, max_batch_size: int = 256) -> None:
+        if window < 0 or max_batch_size < 1:
+            MicroBatcherException.throw(ValueError('Invalid argument'))
+        self.__window = window
+        self.__max_batch_size = max_batch_size
+        self.__pending = []
+        self.__timer = None
+        self.__batches = self.__items = self.__largest = 0
+
+    @property
+    def window(self) -> float:
+        return self.__window
+
+    @property
+    def max_batch_size(self) -> int:
+        return self.__max_batch_size
+
+    async def solve(self, values: dict) -> dict:
+        '''
+        Complete a triangle with the next batch.
+        Parameters
+        ----------
+        values: dict
+            The known elements by name (see ELEMENTS).
+        Returns
+        -------
+        dict:
+            The value of each element by name, NaN when it can't be calculated
+            (unknown, or an invalid input such as an `asin` outside its domain).
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.append((values, future))
+        if len(self.__pending) >= self.__max_batch_size:
+            self.flush()
+        elif self.__timer is None:
+            self.__timer = loop.call_later(self.__window, self.flush)
+        return await future
+
+    def flush(self):
+        '''
+        Solve the waiting triangles now, in the default executor of the loop:
+        the event loop keeps serving the other requests meanwhile.
+        '''
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        pending, self.__pending = self.__pending, []
+        if not pending:
+            return
+        self.__batches += 1
+        self.__items += len(pending)
+        self.__largest = max(self.__largest, len(pending))
+        rows = np.full((len(pending), len(ELEMENTS)), np.nan)
+        for row, (values, _) in zip(rows, pending):
+            for name, value in values.items():
+                row[ELEMENTS.index(name)] = value
+        solving = asyncio.get_running_loop().run_in_executor(None, solve_rows, rows)
+        solving.add_done_callback(lambda solving: self.__resolve(pending, solving))
+
+    def __resolve(self, pending: list, solving: asyncio.Future):
+        '''
+        Give each waiting request its row of the solved batch.
+        '''
+        if solving.cancelled():
+            for _, future in pending:
+                future.cancel()
+            return
+        if solving.exception() is not None:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(solving.exception())
+            return
+        for row, (_, future) in zip(solving.result(), pending):
+            if not future.done():
+                future.set_result(dict(zip(ELEMENTS, row.tolist())))
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.__batches,
+            'items': self.__items,
+            'largest_batch': self.__largest,
+            'pending': len(self.__pending)
+        }
+
+def solve_rows(rows: np.ndarray) -> np.ndarray:
+    '''
+    Complete a (n, 9) array of triangles, in a thread of the executor.
+    '''
+    return TriangleBatch.from_array(rows).spreading_activation().values.T
+
+def reachable_elements(values: dict) -> list:
+    '''
+    The names of the elements which the network calculates from the known ones.
+    '''
+    known = 0
+    for name in values:
+        known |= 1 << ELEMENTS.index(name)
+    reachable = get_plan(known).reachable
+    return [name for i, name in enumerate(ELEMENTS) if reachable >> i & 1]
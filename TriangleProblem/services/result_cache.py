@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+'''
+Result Cache
+=====
+Bounded LRU cache of solved triangles, keyed by the canonicalized inputs.
+
+- max_size: the number of results kept, the least recently used is evicted
+- ttl: the lifetime of a result in seconds, None to keep it until evicted
+- precision: the significant digits kept of each input in the key, so that
+  e.g. 3 and 3.0000000000001 share a result
+
+The cache is safe to share between the threads of a worker.
+'''
+def canonical(value: float, precision: int) -> float:
+    '''
+    Round a value to `precision` significant digits. None stays None.
+    '''
+    if value is None:
+        return None
+    return float('{:.{}g}'.format(value, precision))
+
+class ResultCacheException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+class ResultCache:
+    # the results are held by this process only
+    shared = False
+
+    def __init__(self, max_size: int = 1024, ttl: float = None, precision: int = 12) -> None:
+        if max_size < 0 or precision < 1 or (ttl is not None and ttl <= 0):
+            ResultCacheException.throw(ValueError('Invalid argument'))
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__precision = precision
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = self.__misses = self.__evictions = self.__expirations = 0
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def precision(self) -> int:
+        return self.__precision
+
+    def canonical(self, value: float) -> float:
+        '''
+        Round a value to the significant digits of the cache. None stays None.
+        '''
+        return canonical(value, self.__precision)
+
+    def key(self, values: list, extra: tuple = ()) -> tuple:
+        '''
+        Build the key of the inputs.
+        Parameters
+        ----------
+        values: list
+            The inputs, in a fixed order, None when missing.
+        extra: tuple
+            Anything else the result depends on.
+        '''
+        return tuple(self.canonical(value) for value in values) + tuple(extra)
+
+    def get(self, key: tuple):
+        '''
+        Get a result and mark it as recently used. None on a miss.
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.__ttl is not None and entry[0] <= monotonic():
+                del self.__entries[key]
+                self.__expirations += 1
+                entry = None
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value):
+        '''
+        Store a result, evicting the least recently used ones beyond max_size.
+        '''
+        if self.__max_size == 0:
+            return
+        expires = monotonic() + self.__ttl if self.__ttl is not None else None
+        with self.__lock:
+            self.__entries[key] = (expires, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def contains(self, key: tuple) -> bool:
+        '''
+        Check if a result is stored, without counting a hit or a miss.
+        '''
+        with self.__lock:
+            entry = self.__entries.get(key)
+            return entry is not None and (self.__ttl is None or entry[0] > monotonic())
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> dict:
+        '''
+        The counters of the cache.
+        '''
+        with self.__lock:
+            return {
+                'size': len(self.__entries),
+                'max_size': self.__max_size,
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'evictions': self.__evictions,
+                'expirations': self.__expirations
+            }
+
+    def __len__(self) -> int:
+        return len(self.__entries)
@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+from time import time
+
+from .result_cache import (
+    ResultCacheException,
+    canonical
+)
+'''
+SQLite Cache
+=====
+Result cache on disk, with the interface of ResultCache, shared by every
+worker process of a server and kept across restarts.
+
+- path: the SQLite database (created with its directory)
+- max_size: the number of results kept; beyond it, the least recently used
+  results are evicted (the size is checked every `check_interval` writes of a
+  process, so it may be exceeded by a few results in between)
+- ttl: the lifetime of a result in seconds, None to keep it until evicted
+- precision: the significant digits kept of each input in the key
+- touch_interval: a hit updates the last access of a result only if it is
+  older than that many seconds, so that hot results don't write on each read
+
+The database is in WAL mode: readers don't block the writer, and each
+thread of each process has its own connection. The keys and the results are
+stored as JSON, so they must be JSON serializable.
+'''
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+'''
+
+class SqliteCache:
+    # the results are shared by every process using the database
+    shared = True
+
+    def __init__(self, path: str, max_size: int = 100000, ttl: float = None, precision: int = 12,
+                 touch_interval: float = 1.0, check_interval: int = 64, timeout: float = 5.0) -> None:
+        if max_size < 0 or precision < 1 or (ttl is not None and ttl <= 0) or check_interval < 1:
+            ResultCacheException.throw(ValueError('Invalid argument'))
+        self.__path = path
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__precision = precision
+        self.__touch_interval = touch_interval
+        self.__check_interval = check_interval
+        self.__timeout = timeout
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__hits = self.__misses = self.__evictions = self.__expirations = 0
+        self.__writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.__connection() as connection:
+            connection.executescript(SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def precision(self) -> int:
+        return self.__precision
+
+    def __connection(self) -> sqlite3.Connection:
+        '''
+        The connection of this thread; a forked process opens its own.
+        '''
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None or self.__local.pid != os.getpid():
+            connection = sqlite3.connect(self.__path, timeout=self.__timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+        return connection
+
+    def canonical(self, value: float) -> float:
+        '''
+        Round a value to the significant digits of the cache. None stays None.
+        '''
+        return canonical(value, self.__precision)
+
+    def key(self, values: list, extra: tuple = ()) -> tuple:
+        '''
+        Build the key of the inputs.
+        Parameters
+        ----------
+        values: list
+            The inputs, in a fixed order, None when missing.
+        extra: tuple
+            Anything else the result depends on.
+        '''
+        return tuple(self.canonical(value) for value in values) + tuple(extra)
+
+    def get(self, key: tuple):
+        '''
+        Get a result and mark it as recently used. None on a miss.
+        '''
+        text = json.dumps(key)
+        now = time()
+        connection = self.__connection()
+        row = connection.execute('SELECT value, expires, accessed FROM results WHERE key = ?',
+                                 (text,)).fetchone()
+        if row is not None and row[1] is not None and row[1] <= now:
+            connection.execute('DELETE FROM results WHERE key = ?', (text,))
+            with self.__lock:
+                self.__expirations += 1
+            row = None
+        if row is None:
+            with self.__lock:
+                self.__misses += 1
+            return None
+        if now - row[2] >= self.__touch_interval:
+            connection.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, text))
+        with self.__lock:
+            self.__hits += 1
+        return decode(json.loads(row[0]))
+
+    def put(self, key: tuple, value):
+        '''
+        Store a result, evicting the least recently used ones beyond max_size.
+        '''
+        if self.__max_size == 0:
+            return
+        now = time()
+        expires = now + self.__ttl if self.__ttl is not None else None
+        connection = self.__connection()
+        connection.execute('INSERT OR REPLACE INTO results (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                           (json.dumps(key), json.dumps(value), expires, now))
+        with self.__lock:
+            self.__writes += 1
+            check = self.__writes % self.__check_interval == 0
+        if check:
+            self.evict()
+
+    def contains(self, key: tuple) -> bool:
+        '''
+        Check if a result is stored, without counting a hit or a miss.
+        '''
+        row = self.__connection().execute('SELECT expires FROM results WHERE key = ?',
+                                          (json.dumps(key),)).fetchone()
+        return row is not None and (row[0] is None or row[0] > time())
+
+    def evict(self) -> int:
+        '''
+        Remove the expired results, then the least recently used ones beyond max_size.
+        Returns
+        -------
+        int:
+            The number of results evicted beyond max_size.
+        '''
+        connection = self.__connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            expired = connection.execute('DELETE FROM results WHERE expires <= ?', (time(),)).rowcount
+            excess = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.__max_size
+            evicted = 0
+            if excess > 0:
+                evicted = connection.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)',
+                    (excess,)).rowcount
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        with self.__lock:
+            self.__expirations += expired
+            self.__evictions += evicted
+        return evicted
+
+    def clear(self):
+        self.__connection().execute('DELETE FROM results')
+
+    def stats(self) -> dict:
+        '''
+        The counters of the cache: the size is the one of the database, the
+        other counters are the ones of this process.
+        '''
+        size = len(self)
+        with self.__lock:
+            return {
+                'size': size,
+                'max_size': self.__max_size,
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'evictions': self.__evictions,
+                'expirations': self.__expirations
+            }
+
+    def __len__(self) -> int:
+        return self.__connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+def decode(value):
+    '''
+    Convert the JSON arrays of a result back to tuples, as it was stored.
+    '''
+    if isinstance(value, list):
+        return tuple(decode(item) for item in value)
+    return value
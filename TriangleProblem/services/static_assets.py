@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+'''
+Static Assets
+=====
+Build the static files for long-lived caching: every file of the static
+folder is copied to the output folder under a name with the hash of its
+content (css/style.css -> css/style.0123456789.css), so a new version of a file
+has a new URL and the old one can be cached forever.
+
+The compressible files also get a gzip (.gz) and, when the `brotli` package is
+installed, a brotli (.br) variant, kept only when smaller than the file.
+`manifest.json` maps each source path to its hashed path and encodings:
+
+    {"css/style.css": {"path": "css/style.0123456789.css", "encodings": ["br", "gzip"]}}
+
+The build is reproducible: the same files give the same output.
+'''
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.html', '.json', '.txt')
+'''
+Content-Encoding -> suffix of the variant, in order of preference.
+'''
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+class StaticAssetsException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+def hashed_path(path: str, content: bytes) -> str:
+    '''
+    Insert the hash of the content before the extension of a path.
+    '''
+    root, ext = os.path.splitext(path)
+    return '{}.{}{}'.format(root, hashlib.sha256(content).hexdigest()[:HASH_LENGTH], ext)
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(content, quality=11)
+    StaticAssetsException.throw(ValueError('Unknown encoding: {}'.format(encoding)))
+
+def available_encodings() -> list:
+    return [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+
+def write_file(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp, 'wb') as file:
+        file.write(content)
+    os.replace(temp, path)
+
+def build_assets(source: str, output: str) -> dict:
+    '''
+    Build the hashed and compressed copies of the files of a folder.
+    Parameters
+    ----------
+    source: str
+        The static folder.
+    output: str
+        The folder of the built files; it must not be inside `source`.
+    Returns
+    -------
+    dict:
+        The manifest, also written to `output`/manifest.json.
+    '''
+    source, output = os.path.abspath(source), os.path.abspath(output)
+    if os.path.commonpath([source, output]) == source:
+        StaticAssetsException.throw(ValueError('The output must not be inside the source folder'))
+    manifest = {}
+    for directory, _, names in sorted(os.walk(source)):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, source).replace(os.sep, '/')
+            with open(path, 'rb') as file:
+                content = file.read()
+            target = hashed_path(relative, content)
+            write_file(os.path.join(output, target), content)
+            encodings = []
+            if relative.lower().endswith(COMPRESSIBLE):
+                for encoding in available_encodings():
+                    compressed = compress(content, encoding)
+                    if len(compressed) < len(content):
+                        write_file(os.path.join(output, target + ENCODINGS[encoding]), compressed)
+                        encodings.append(encoding)
+            manifest[relative] = {'path': target, 'encodings': encodings}
+    write_file(os.path.join(output, MANIFEST),
+               (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+    return manifest
+
+def load_manifest(output: str) -> dict:
+    '''
+    The manifest of a build, empty if there is none.
+    '''
+    try:
+        with open(os.path.join(output, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def negotiate_encoding(accept_encoding, encodings: list) -> str:
+    '''
+    The preferred encoding of the variants accepted by the client, None for
+    the file itself.
+    Parameters
+    ----------
+    accept_encoding:
+        The Accept-Encoding of the request, a werkzeug Accept
+        (`accept_encoding[encoding]` is the quality of an encoding).
+    encodings: list
+        The encodings of the variants of the file.
+    '''
+    for encoding in ENCODINGS:
+        if encoding in encodings and accept_encoding[encoding] > 0:
+            return encoding
+    return None
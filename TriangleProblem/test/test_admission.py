@@ -0,0 +1,171 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import pytest
+from werkzeug.serving import make_server
+
+from TriangleProblem import (
+    app,
+    create_app
+)
+from TriangleProblem.routes import triangle
+from TriangleProblem.routes.admission import get_admission_controller
+from TriangleProblem.services.admission import (
+    ADMITTED,
+    SHED,
+    TIMEOUT,
+    AdmissionController
+)
+
+def test_shed_when_queue_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=0)
+    assert controller.acquire() == ADMITTED
+    assert controller.acquire() == SHED
+    controller.release()
+    assert controller.acquire() == ADMITTED
+    assert controller.stats() == {'admitted': 2, 'queued': 0, 'shed': 1, 'timeout': 0,
+                                  'active': 1, 'waiting': 0}
+
+def test_queue_timeout():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+    assert controller.acquire() == ADMITTED
+    assert controller.acquire() == TIMEOUT
+    stats = controller.stats()
+    assert stats['queued'] == 1 and stats['timeout'] == 1 and stats['waiting'] == 0
+
+def test_queued_request_admitted_on_release():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5.0)
+    assert controller.acquire() == ADMITTED
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()['waiting'] == 0:
+        threading.Event().wait(0.001)
+    # the queue is full
+    assert controller.acquire() == SHED
+    controller.release()
+    waiter.join()
+    assert results == [ADMITTED]
+    assert controller.stats()['active'] == 1
+
+def test_acquire_async():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5.0)
+
+    async def main():
+        assert await controller.acquire_async() == ADMITTED
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        while controller.stats()['waiting'] == 0:
+            await asyncio.sleep(0.001)
+        # the queue is full
+        assert await controller.acquire_async() == SHED
+        controller.release()
+        return await waiter
+
+    assert asyncio.run(main()) == ADMITTED
+    assert controller.stats() == {'admitted': 2, 'queued': 1, 'shed': 1, 'timeout': 0,
+                                  'active': 1, 'waiting': 0}
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+    controller.acquire()
+    assert asyncio.run(controller.acquire_async()) == TIMEOUT
+    assert controller.stats()['waiting'] == 0
+
+def test_queue_in_order_of_arrival():
+    controller = AdmissionController(max_concurrent=1, max_queue=3, queue_timeout=5.0)
+    admitted = []
+
+    async def request(name):
+        assert await controller.acquire_async() == ADMITTED
+        admitted.append(name)
+
+    async def main():
+        await request('first')
+        waiters = []
+        for name in ('second', 'third'):
+            waiters.append(asyncio.ensure_future(request(name)))
+            await asyncio.sleep(0)
+        controller.release()
+        # a new request does not take the slot handed over to 'second'
+        waiters.append(asyncio.ensure_future(request('fourth')))
+        await asyncio.sleep(0.01)
+        assert admitted == ['first', 'second']
+        controller.release()
+        controller.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(main())
+    assert admitted == ['first', 'second', 'third', 'fourth']
+    assert controller.stats()['queued'] == 3
+
+def test_cancelled_waiter():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5.0)
+
+    async def main():
+        await controller.acquire_async()
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        controller.release()
+
+    asyncio.run(main())
+    assert controller.stats()['active'] == 0 and controller.stats()['waiting'] == 0
+
+def test_invalid_argument():
+    with pytest.raises(ValueError):
+        AdmissionController(max_concurrent=0)
+    with pytest.raises(RuntimeError):
+        AdmissionController().release()
+
+def test_triangle_calculator_busy(monkeypatch):
+    controller = AdmissionController(max_concurrent=1)
+    monkeypatch.setitem(app.extensions, 'triangle_admission', controller)
+    client = app.test_client()
+    assert client.post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5'}).status_code == 200
+    assert controller.stats()['active'] == 0
+    controller.acquire()
+    response = client.post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['status'] == 503
+    # the other routes are not limited
+    assert client.get('/').status_code == 200
+    assert 'triangle_admission_total{result="shed"} 1' in client.get('/metrics').get_data(as_text=True)
+
+def test_threaded_server_sheds_overload(monkeypatch):
+    server_app = create_app({'TRIANGLE_MAX_CONCURRENT': 2, 'TRIANGLE_MAX_QUEUE': 1,
+                             'TRIANGLE_QUEUE_TIMEOUT': 5.0, 'TRIANGLE_LOG_SAMPLE_RATE': 0.0})
+    with server_app.app_context():
+        controller = get_admission_controller()
+    unblock = threading.Event()
+    solve_triangle = triangle.solve_triangle
+    def slow_solve(*args, **kwargs):
+        unblock.wait(5)
+        return solve_triangle(*args, **kwargs)
+    monkeypatch.setattr(triangle, 'solve_triangle', slow_solve)
+    server = make_server('127.0.0.1', 0, server_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def post(i):
+        body = urlencode({'a': 3 + i, 'b': 4 + i, 'c': 5 + i, 'no_cache': 1}).encode()
+        try:
+            return urlopen('http://127.0.0.1:{}/triangle_calculator'.format(server.port), body).status
+        except HTTPError as ex:
+            return ex.code
+    try:
+        with ThreadPoolExecutor(6) as pool:
+            statuses = [pool.submit(post, i) for i in range(6)]
+            # 2 requests solving, 1 waiting, 3 shed at once
+            while controller.stats()['shed'] < 3:
+                threading.Event().wait(0.001)
+            unblock.set()
+            statuses = sorted(status.result() for status in statuses)
+    finally:
+        unblock.set()
+        server.shutdown()
+    assert statuses == [200, 200, 200, 503, 503, 503]
+    assert controller.stats()['queued'] == 1
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+from TriangleProblem import create_app
+
+def test_create_app_config():
+    app = create_app({'TRIANGLE_CACHE_SIZE': 0, 'TRIANGLE_GET_VERSION': '2'})
+    other = create_app()
+    assert app.config['TRIANGLE_CACHE_SIZE'] == 0
+    assert other.config['TRIANGLE_CACHE_SIZE'] == 1024
+    response = app.test_client().post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5'})
+    assert response.get_json()['status'] == 200
+    assert 'triangle_result_cache' in app.extensions
+    assert 'triangle_result_cache' not in other.extensions
+
+def test_deferred_imports():
+    # the models and the package itself are imported without Flask or numpy
+    code = ('import sys, TriangleProblem.models; '
+            'print(sorted(name for name in ("flask", "numpy", "TriangleProblem.routes") if name in sys.modules))')
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip('asgiref')
+
+from TriangleProblem import app
+from TriangleProblem.asgi import TriangleAsgi
+from TriangleProblem.services.admission import AdmissionController
+from TriangleProblem.services.micro_batcher import MicroBatcher
+from TriangleProblem.services.result_cache import ResultCache
+
+async def post(application, data: dict, headers: list = ()):
+    messages = [{'type': 'http.request', 'body': urlencode(data).encode(), 'more_body': False}]
+    scope = {'type': 'http', 'path': '/triangle_calculator', 'method': 'POST', 'query_string': b'',
+             'headers': [(b'content-type', b'application/x-www-form-urlencoded')] + list(headers)}
+    sent = []
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+    async def send(message):
+        sent.append(message)
+    await application(scope, receive, send)
+    return dict(sent[0]['headers']), json.loads(sent[1]['body'])
+
+def test_responses_match_the_flask_route():
+    application = TriangleAsgi(batcher=MicroBatcher(window=0.01))
+    requests = [
+        {'c': '5', 'h_c': '2.4', 'a': '3', 'no_cache': '1'},
+        {'c': '5', 'h_c': '2.4', 'b': '4', 'fields': 's,p', 'no_cache': '1'},
+        {'a': '3', 'b': '4', 'c': '5', 'no_cache': '1'},
+        {'alpha': '30', 'a': '1', 'b': '5', 'no_cache': '1'},
+        {'a': '-3'},
+    ]
+
+    async def main():
+        return await asyncio.gather(*(post(application, data) for data in requests))
+
+    responses = asyncio.run(main())
+    assert application.batcher.stats()['batches'] == 1
+    client = app.test_client()
+    for data, (headers, body) in zip(requests, responses):
+        expected = client.post('/triangle_calculator', data=data).get_json()
+        assert body['status'] == expected['status']
+        assert body.get('path') == expected.get('path')
+        assert body['data'] == pytest.approx(expected['data'])
+    assert responses[0][0][b'x-cache'] == b'BYPASS'
+    assert b'solve;dur=' in responses[0][0][b'server-timing']
+
+def test_busy(monkeypatch):
+    controller = AdmissionController(max_concurrent=1)
+    monkeypatch.setitem(app.extensions, 'triangle_admission', controller)
+    application = TriangleAsgi(batcher=MicroBatcher(window=0.001))
+    headers, body = asyncio.run(post(application, {'a': '3', 'b': '4', 'c': '5'}))
+    assert body['status'] == 200
+    assert controller.stats()['active'] == 0
+    # the slot is shared with the requests served by Flask
+    controller.acquire()
+    headers, body = asyncio.run(post(application, {'a': '3', 'b': '4', 'c': '5'}))
+    assert body == {'status': 503, 'message': 'Server busy, retry later', 'data': {}}
+    assert headers[b'retry-after'] == b'1'
+    assert controller.stats()['shed'] == 1
+
+def test_cached_apart_from_the_flask_route(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setitem(app.extensions, 'triangle_result_cache', cache)
+    application = TriangleAsgi(batcher=MicroBatcher(window=0.001))
+    data = {'c': '5', 'h_c': '2.4', 'a': '3', 'fields': 's'}
+    headers, body = asyncio.run(post(application, data))
+    assert headers[b'x-cache'] == b'MISS'
+    # the batch completed the whole triangle: not the result of the goal-directed route
+    response = app.test_client().post('/triangle_calculator', data=data)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['data'] == pytest.approx(body['data'])
+    headers, _ = asyncio.run(post(application, data))
+    assert headers[b'x-cache'] == b'HIT'
+    assert cache.stats()['size'] == 2
@@ -0,0 +1,52 @@
+import gzip
+import os
+
+import pytest
+
+from TriangleProblem import app
+from TriangleProblem.services.static_assets import (
+    build_assets,
+    load_manifest
+)
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    output = str(tmp_path / 'assets')
+    monkeypatch.setitem(app.config, 'TRIANGLE_ASSETS_DIR', output)
+    monkeypatch.delitem(app.extensions, 'triangle_assets_manifest', raising=False)
+    monkeypatch.delitem(app.extensions, 'triangle_assets', raising=False)
+    result = app.test_cli_runner().invoke(args=['build-assets'])
+    assert result.exit_code == 0, result.output
+    yield load_manifest(output)
+    app.extensions.pop('triangle_assets_manifest', None)
+    app.extensions.pop('triangle_assets', None)
+
+def test_build_is_reproducible(tmp_path):
+    first = build_assets(app.static_folder, str(tmp_path / 'first'))
+    second = build_assets(app.static_folder, str(tmp_path / 'second'))
+    assert first == second
+    style = first['css/style.css']
+    assert style['path'].startswith('css/style.') and 'gzip' in style['encodings']
+    assert first['images/formular.png']['encodings'] == []
+    with pytest.raises(ValueError):
+        build_assets(app.static_folder, os.path.join(app.static_folder, 'dist'))
+
+def test_serve_assets(built):
+    client = app.test_client()
+    style = built['css/style.css']['path']
+    assert '/assets/' + style in client.get('/').get_data(as_text=True)
+
+    with open(os.path.join(app.static_folder, 'css', 'style.css'), 'rb') as file:
+        content = file.read()
+    compressed = client.get('/assets/' + style, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert compressed.mimetype == 'text/css'
+    assert gzip.decompress(compressed.get_data()) == content
+    compressed.close()
+
+    plain = client.get('/assets/' + style, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers and plain.get_data() == content
+    plain.close()
+    assert client.get('/assets/css/style.css').status_code == 404
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+import pytest
+
+from TriangleProblem import cli
+
+def test_csv(tmp_path, capsys):
+    path = tmp_path / 'problems.csv'
+    path.write_text('a,b,c,s\n3,4,5,\n1,1,3,\nx,1,1,\nnan,4,5,\ninf,4,5,\n')
+    assert cli.main([str(path), '--chunk-size', '2']) == 0
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert len(rows) == 5
+    assert float(rows[0]['square']) == pytest.approx(6.0)
+    assert rows[0]['alpha'] == '' and rows[0]['error'] == ''
+    assert rows[1]['error'] and rows[2]['error']
+    # not finite: rejected, not written as NaN / Infinity
+    assert rows[3]['error'] == 'Invalid value of a' and rows[4]['error'] == 'Invalid value of a'
+
+def test_ndjson_workers(tmp_path, capsys):
+    problems = [{'alpha': 30, 'beta': 60, 'a': i} for i in range(1, 8)]
+    path = tmp_path / 'problems.ndjson'
+    path.write_text('\n'.join(json.dumps(problem) for problem in problems) + '\n{oops}\n')
+    assert cli.main([str(path), '--chunk-size', '2', '--workers', '2']) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line['a'] for line in lines[:-1]] == [float(i) for i in range(1, 8)]
+    assert [line['c'] for line in lines[:-1]] == pytest.approx([2.0 * i for i in range(1, 8)])
+    assert lines[-1]['error'].startswith('Invalid JSON')
+
+def test_ndjson_not_finite_and_bool(tmp_path, capsys):
+    path = tmp_path / 'problems.ndjson'
+    path.write_text('{"a": 1e308, "b": 1e308, "c": 1e308}\n{"a": true, "b": 4, "c": 5}\n')
+    assert cli.main([str(path)]) == 0
+    output = capsys.readouterr().out
+    # valid JSON: no Infinity
+    assert 'Infinity' not in output
+    overflow, boolean = (json.loads(line) for line in output.splitlines())
+    assert overflow['a'] == 1e308 and overflow['p'] is None
+    assert boolean['error'] == 'Invalid value of a'
@@ -0,0 +1,46 @@
+from itertools import combinations
+from math import (
+    radians,
+    sin,
+    sqrt
+)
+
+import pytest
+
+from TriangleProblem.services import closed_form
+
+def reference() -> dict:
+    alpha, beta, delta = 50.0, 60.0, 70.0
+    ratio = 3.0 / sin(radians(alpha))
+    a, b, c = [ratio * sin(radians(angle)) for angle in (alpha, beta, delta)]
+    p = (a + b + c) / 2
+    square = sqrt(p * (p-a) * (p-b) * (p-c))
+    return {'alpha': alpha, 'beta': beta, 'delta': delta, 'a': a, 'b': b, 'c': c,
+            'square': square, 'height_c': 2 * square / c, 'p': p}
+
+def test_classify():
+    assert closed_form.classify(['a', 'b', 'c']) == 'SSS'
+    assert closed_form.classify(['b', 'c', 'alpha']) == 'SAS'
+    assert closed_form.classify(['a', 'b', 'alpha']) == 'SSA'
+    assert closed_form.classify(['alpha', 'beta', 'c']) == 'ASA'
+    assert closed_form.classify(['alpha', 'beta', 'a']) == 'AAS'
+    assert closed_form.classify(['alpha', 'beta', 'delta']) is None
+    assert closed_form.classify(['a', 'b', 'c', 'p']) is None
+    assert closed_form.classify(['a', 'b', 'square']) is None
+
+def test_solve_every_case():
+    values = reference()
+    cases = set()
+    for names in combinations(values, 3):
+        case = closed_form.classify(names)
+        if case is None:
+            continue
+        cases.add(case)
+        result = closed_form.solve(case, {name: values[name] for name in names})
+        assert result == pytest.approx(values, rel=1e-9)
+    assert cases == {'SSS', 'SAS', 'ASA', 'AAS', 'SSA'}
+
+def test_invalid_triangle():
+    assert closed_form.solve('SSS', {'a': 1.0, 'b': 1.0, 'c': 3.0}) is None
+    assert closed_form.solve('ASA', {'alpha': 100.0, 'beta': 90.0, 'c': 1.0}) is None
+    assert closed_form.solve('SSA', {'a': 1.0, 'b': 3.0, 'alpha': 60.0}) is None
@@ -0,0 +1,65 @@
+import pytest
+
+from TriangleProblem.models import TriangleSemantic
+from TriangleProblem.models.engine import (
+    FormulaRegistry,
+    generate_network
+)
+from TriangleProblem.models.triangle_formulas import (
+    ELEMENTS,
+    TRIANGLE_NETWORK
+)
+
+# alpha, beta, delta, a, b, c, square, height_c, p of a 3-4-5 triangle
+REFERENCE = (36.86989764584402, 53.13010235415598, 90.0, 3.0, 4.0, 5.0, 6.0, 2.4, 6.0)
+
+def test_registry():
+    registry = FormulaRegistry(['x', 'y', 'z'])
+    X, Y, Z = range(3)
+    registry.formula('sum', {
+        X: lambda v: v[Z] - v[Y],
+        Y: lambda v: v[Z] - v[X],
+        Z: lambda v: v[X] + v[Y],
+    })
+    registry.formula('double', {registry.variable('w'): lambda v: 2 * v[Z]}, variables=[Z, 3])
+    network = registry.compile()
+    assert network.variable_formulas == ((0,), (0,), (0, 1), (1,))
+    assert network.edges == 5
+    assert network.solve({'x': 1.0, 'z': 3.0}) == {'x': 1.0, 'y': 2.0, 'z': 3.0, 'w': 6.0}
+    # 'double' has no solver of z
+    assert network.solve({'w': 6.0}) == {'x': None, 'y': None, 'z': None, 'w': 6.0}
+    with pytest.raises(ValueError):
+        registry.formula('invalid', {X: lambda v: 0.0}, variables=[Y])
+    # a vectorized solver of a variable without a scalar one
+    with pytest.raises(ValueError):
+        registry.formula('invalid', {X: lambda v: 0.0}, vectorized={Y: lambda v, np: 0.0})
+
+def test_vectorized_solvers():
+    np = pytest.importorskip('numpy')
+    # every scalar solver of the triangle has a vectorized version which agrees with it
+    for formula in TRIANGLE_NETWORK.formulas:
+        assert set(formula.vectorized) == set(formula.solvers)
+        for variable, solver in formula.solvers.items():
+            columns = [np.array([value]) for value in REFERENCE]
+            assert formula.vectorized[variable](columns, np)[0] == pytest.approx(solver(REFERENCE))
+
+def test_generated_network():
+    registry, solution = generate_network(500, 600, seed=1)
+    network = registry.compile()
+    propagation = network.propagation()
+    propagation.set(0, solution[0])
+    propagation.set(1, solution[1])
+    assert propagation.run() == 498
+    assert propagation.values == pytest.approx(solution)
+
+def test_triangle_network_matches_triangle_semantic():
+    for known in range(1 << len(ELEMENTS)):
+        values = {name: REFERENCE[i] for i, name in enumerate(ELEMENTS) if known >> i & 1}
+        try:
+            expected = TriangleSemantic.from_known(**values)
+        except (ValueError, ZeroDivisionError):
+            continue
+        result = TRIANGLE_NETWORK.solve(values)
+        for name in ELEMENTS:
+            value = getattr(expected, name)
+            assert result[name] == (None if value == -1.0 and name not in values else value)
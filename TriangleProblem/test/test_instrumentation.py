@@ -0,0 +1,68 @@
+import json
+
+from TriangleProblem.models import (
+    AggregatingCollector,
+    Instrumentation,
+    Network,
+    TriangleSemantic,
+    set_instrumentation
+)
+
+class Recorder(Instrumentation):
+    def __init__(self) -> None:
+        self.events = []
+
+    def on_propagation_start(self, triangle_semantic, expression: int):
+        self.events.append(('start', expression))
+
+    def on_formula(self, expression: int, element: int, seconds: float, error: Exception = None):
+        self.events.append(('formula', expression, element, type(error)))
+
+    def on_activation(self, element: int):
+        self.events.append(('activation', element))
+
+    def on_propagation_end(self, triangle_semantic, iterations: int):
+        self.events.append(('end', iterations))
+
+def test_callbacks_follow_the_propagation():
+    recorder = Recorder()
+    triangle_semantic = TriangleSemantic.from_known(instrumentation=recorder, a=3.0, b=4.0, c=5.0)
+    formulas = [event[1:3] for event in recorder.events if event[0] == 'formula']
+    assert recorder.events[:3] == [('activation', 4), ('activation', 5), ('activation', 6)]
+    # from_known runs the precompiled plan of the known-set
+    assert recorder.events[3] == ('start', 0)
+    assert recorder.events[-1] == ('end', len(formulas))
+    assert len(formulas) == triangle_semantic.evaluations
+    assert formulas[0] == (6, 9)
+
+def test_formula_error_is_reported():
+    recorder = Recorder()
+    triangle_semantic = TriangleSemantic(instrumentation=recorder)
+    triangle_semantic.set_beta(0.0)
+    try:
+        triangle_semantic.calculate_expression_controller(1, 4)
+    except ZeroDivisionError:
+        pass
+    assert recorder.events == [('formula', 1, 4, ZeroDivisionError)]
+
+def test_disabled_by_default():
+    assert TriangleSemantic.instrumentation is None
+    assert Network.instrumentation is None
+    assert TriangleSemantic().instrumentation is None
+
+def test_aggregating_collector_report():
+    collector = AggregatingCollector()
+    set_instrumentation(collector)
+    try:
+        for _ in range(3):
+            TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0)
+        TriangleSemantic.from_known(solve=False, a=3.0, b=4.0, c=5.0).solve()
+    finally:
+        set_instrumentation(None)
+    report = collector.report()
+    assert report['propagations']['count'] == 4
+    assert report['formulas']['(6) -> p']['count'] == 4
+    assert report['activations']['a'] == 4
+    assert json.loads(collector.dump()) == report
+    collector.reset()
+    assert collector.report()['propagations']['count'] == 0
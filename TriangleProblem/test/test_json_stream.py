@@ -0,0 +1,34 @@
+import io
+
+from TriangleProblem.utils.json_stream import iter_items
+
+def items(text: str, chunk_size: int = 4) -> list:
+    return list(iter_items(io.BytesIO(text.encode('utf-8')), chunk_size))
+
+def test_json_array_in_small_chunks():
+    assert items(' [{"a": 1}, {"b": "é"}, 12345, [1, 2]] ') == [
+        ({'a': 1}, None), ({'b': 'é'}, None), (12345, None), ([1, 2], None)]
+    assert items('[]') == []
+    assert items('') == []
+
+def test_json_array_syntax_error():
+    result = items('[{"a": 1} {"b": 2}]')
+    assert result[0] == ({'a': 1}, None)
+    assert result[1][0] is None and result[1][1].startswith('Invalid JSON')
+    assert items('[{"a": ')[-1][0] is None
+
+def test_ndjson():
+    result = items('{"a": 1}\n\n{bad}\n{"c": 3}')
+    assert result[0] == ({'a': 1}, None)
+    assert result[1][0] is None
+    assert result[2] == ({'c': 3}, None)
+
+def test_json_array_stops_reading_after_syntax_error():
+    stream = io.BytesIO(b'[{"a": 1}, {"a": x}, ' + b'{"b": 2}, ' * 100000 + b']')
+    result = list(iter_items(stream, 16))
+    assert result[0] == ({'a': 1}, None)
+    assert len(result) == 2 and result[1][0] is None
+    assert stream.tell() <= 64
+    # items cut by the chunks are still read whole
+    assert items('["a long string", true, {"k": null}]', 3) == [
+        ('a long string', None), (True, None), ({'k': None}, None)]
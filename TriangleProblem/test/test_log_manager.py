@@ -0,0 +1,41 @@
+import json
+
+from TriangleProblem.utils.log_manager import LogManager
+
+def read_lines(path) -> list:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_events_are_json_lines(tmp_path):
+    path = tmp_path / 'requests.log'
+    log_manager = LogManager(name='test.log_manager.lines', path=str(path))
+    assert log_manager.log({'route': '/a', 'known': ['a', 'b']})
+    try:
+        1 / 0
+    except ZeroDivisionError as ex:
+        assert log_manager.log({'route': '/b'}, ex)
+    log_manager.stop()
+    first, second = read_lines(path)
+    assert first['route'] == '/a' and first['known'] == ['a', 'b'] and first['level'] == 'INFO'
+    assert second['level'] == 'ERROR'
+    assert second['exception']['type'] == 'ZeroDivisionError'
+    assert 'Traceback' in second['exception']['traceback']
+
+def test_sampling_keeps_exceptions(tmp_path):
+    path = tmp_path / 'requests.log'
+    log_manager = LogManager(name='test.log_manager.sampling', path=str(path), sample_rate=0.0)
+    assert not log_manager.log({'route': '/a'})
+    assert log_manager.log({'route': '/b'}, ValueError('bad'))
+    assert log_manager.log({'route': '/c'}, always=True)
+    log_manager.stop()
+    assert [line['route'] for line in read_lines(path)] == ['/b', '/c']
+
+def test_managers_keep_their_handler(tmp_path):
+    first = LogManager(path=str(tmp_path / 'first.log'))
+    second = LogManager(path=str(tmp_path / 'second.log'))
+    assert first.log({'route': '/a'})
+    assert second.log({'route': '/b'})
+    first.stop()
+    second.stop()
+    assert [line['route'] for line in read_lines(tmp_path / 'first.log')] == ['/a']
+    assert [line['route'] for line in read_lines(tmp_path / 'second.log')] == ['/b']
+    assert read_lines(tmp_path / 'first.log')[0]['logger'] == 'TriangleProblem.requests'
@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+
+from TriangleProblem.services import metrics as metrics_module
+from TriangleProblem.services.metrics import (
+    Metrics,
+    mark_process_dead,
+    merge,
+    render
+)
+
+def test_render_histogram():
+    metrics = Metrics(buckets=(0.001, 0.01))
+    metrics.observe('triangle_http_request_duration_seconds', 0.0005, route='/a')
+    metrics.observe('triangle_http_request_duration_seconds', 0.005, route='/a')
+    metrics.observe('triangle_http_request_duration_seconds', 1.0, route='/a')
+    metrics.inc('triangle_http_requests_total', route='/a', method='GET', status=200)
+    text = render(metrics.snapshot())
+    assert '# TYPE triangle_http_request_duration_seconds histogram' in text
+    assert 'triangle_http_request_duration_seconds_bucket{route="/a",le="0.001"} 1' in text
+    assert 'triangle_http_request_duration_seconds_bucket{route="/a",le="0.01"} 2' in text
+    assert 'triangle_http_request_duration_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'triangle_http_request_duration_seconds_count{route="/a"} 3' in text
+    assert 'triangle_http_requests_total{method="GET",route="/a",status="200"} 1' in text
+
+def test_workers_are_aggregated(tmp_path):
+    first = Metrics(directory=str(tmp_path))
+    first.inc('triangle_solve_path_total', path='SSS')
+    first.observe('triangle_http_request_duration_seconds', 0.002, route='/a')
+    second = Metrics()
+    second.inc('triangle_solve_path_total', 2, path='SSS')
+    second.observe('triangle_http_request_duration_seconds', 0.002, route='/a')
+    (tmp_path / 'metrics_0.json').write_text(json.dumps(second.snapshot()))
+    text = first.render()
+    assert 'triangle_solve_path_total{path="SSS"} 3' in text
+    assert 'triangle_http_request_duration_seconds_count{route="/a"} 2' in text
+    assert merge([])['counters'] == []
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_dead_workers(tmp_path):
+    live = Metrics(directory=str(tmp_path))
+    live.set('triangle_admission_active', 1)
+    dead = Metrics()
+    dead.inc('triangle_solve_path_total', 2, path='SSS')
+    dead.set('triangle_admission_active', 5)
+    pid = dead_pid()
+    (tmp_path / 'metrics_{}.json'.format(pid)).write_text(json.dumps(dead.snapshot()))
+    # not archived yet: the gauges of a dead pid are skipped
+    text = live.render()
+    assert 'triangle_admission_active 1' in text
+    assert 'triangle_solve_path_total{path="SSS"} 2' in text
+    mark_process_dead(str(tmp_path), pid)
+    mark_process_dead(str(tmp_path), pid)
+    assert not (tmp_path / 'metrics_{}.json'.format(pid)).exists()
+    text = live.render()
+    assert 'triangle_admission_active 1' in text
+    assert 'triangle_solve_path_total{path="SSS"} 2' in text
+
+def test_gauge_rules(monkeypatch):
+    monkeypatch.setitem(metrics_module.GAUGE_MERGE, 'max_gauge', 'max')
+    monkeypatch.setitem(metrics_module.GAUGE_MERGE, 'latest_gauge', 'latest')
+    snapshots = [
+        {'time': 2, 'buckets': [], 'counters': [], 'histograms': [],
+         'gauges': [['max_gauge', [], 3], ['latest_gauge', [], 7], ['sum_gauge', [], 1]]},
+        {'time': 1, 'buckets': [], 'counters': [], 'histograms': [],
+         'gauges': [['max_gauge', [], 5], ['latest_gauge', [], 9], ['sum_gauge', [], 1]]},
+    ]
+    gauges = {name: value for name, _, value in merge(snapshots)['gauges']}
+    assert gauges == {'max_gauge': 5, 'latest_gauge': 7, 'sum_gauge': 2}
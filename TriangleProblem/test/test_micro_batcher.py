@@ -0,0 +1,64 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from TriangleProblem.models import TriangleSemantic
+from TriangleProblem.services import micro_batcher
+from TriangleProblem.services.micro_batcher import MicroBatcher
+
+def test_concurrent_requests_share_a_batch():
+    batcher = MicroBatcher(window=0.05, max_batch_size=100)
+    requests = [{'a': 3.0 + i, 'b': 4.0 + i, 'c': 5.0 + i} for i in range(10)] + [{'c': 5.0}]
+
+    async def main():
+        return await asyncio.gather(*(batcher.solve(values) for values in requests))
+
+    results = asyncio.run(main())
+    assert batcher.stats() == {'batches': 1, 'items': 11, 'largest_batch': 11, 'pending': 0}
+    for values, result in zip(requests[:-1], results):
+        triangle_semantic = TriangleSemantic.from_known(**values)
+        for name, value in result.items():
+            expected = getattr(triangle_semantic, name)
+            assert math.isnan(value) if expected == -1.0 else value == pytest.approx(expected)
+    assert math.isnan(results[-1]['a']) and results[-1]['c'] == 5.0
+
+def test_max_batch_size_flushes_early():
+    batcher = MicroBatcher(window=10, max_batch_size=2)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(
+            batcher.solve({'a': 3.0, 'b': 4.0, 'c': 5.0}),
+            batcher.solve({'a': 6.0, 'b': 8.0, 'c': 10.0})), timeout=1)
+
+    first, second = asyncio.run(main())
+    assert second['square'] == pytest.approx(4 * first['square'])
+    assert batcher.stats()['batches'] == 1
+
+def test_batch_solved_off_the_loop(monkeypatch):
+    solve_rows = micro_batcher.solve_rows
+    def slow_solve_rows(rows):
+        time.sleep(0.1)
+        return solve_rows(rows)
+    monkeypatch.setattr(micro_batcher, 'solve_rows', slow_solve_rows)
+    batcher = MicroBatcher(window=0)
+    ticks = []
+
+    async def tick():
+        while len(ticks) < 5:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def solve():
+        result = await batcher.solve({'a': 3.0, 'b': 4.0, 'c': 5.0})
+        return result, time.perf_counter()
+
+    async def main():
+        solved, _ = await asyncio.gather(solve(), tick())
+        return solved
+
+    result, solved_at = asyncio.run(main())
+    assert result['square'] == pytest.approx(6.0)
+    # the loop kept running while the batch was solved
+    assert all(at < solved_at for at in ticks)
@@ -0,0 +1,72 @@
+import pytest
+
+from TriangleProblem.models import (
+    Network,
+    NetWorkException
+)
+
+DEFAULT_NETWORK = [
+    [-1,  0,  0, -1,  0,  0],
+    [-1, -1,  0, -1,  0,  0],
+    [ 0, -1,  0, -1,  0,  0],
+    [-1,  0, -1,  0,  0, -1],
+    [-1, -1, -1,  0,  0, -1],
+    [ 0, -1, -1,  0, -1, -1],
+    [ 0,  0, -1,  0, -1,  0],
+    [ 0,  0,  0,  0, -1,  0],
+    [ 0,  0, -1,  0,  0, -1],
+]
+
+def test_matrix_view():
+    network = Network()
+    assert network.network == DEFAULT_NETWORK
+    network.activate_element(4)
+    assert network.network[3] == [1, 0, 1, 0, 0, 1]
+    assert network.known == 0b1000
+
+def test_get_unknown_element():
+    network = Network()
+    assert network.get_unknown_element(4) == -1
+    network.activate_element(1)
+    network.activate_element(2)
+    assert network.get_unknown_element(4) == 3
+    network.activate_element(3)
+    assert network.get_unknown_element(4) == 0
+
+def test_network_from_matrix():
+    matrix = Network()
+    matrix.activate_element(6)
+    matrix.activate_element(8)
+    network = Network(matrix.network)
+    assert network.known == matrix.known
+    assert network.get_unknown_element(5) == 7
+
+def test_invalid_input():
+    matrix = [line[:] for line in DEFAULT_NETWORK]
+    matrix[7][0] = 1
+    with pytest.raises(NetWorkException):
+        Network(matrix)
+    with pytest.raises(ValueError):
+        Network().activate_element(10)
+
+def test_inverted_index():
+    for element in range(1, 10):
+        expressions = tuple(expression for expression in range(1, 7)
+                            if Network.EXPRESSION_MASKS[expression - 1] >> (element - 1) & 1)
+        assert Network.ELEMENT_EXPRESSIONS[element] == expressions
+
+def test_ready_expressions():
+    network = Network()
+    assert network.next_ready() == 0
+    network.activate_element(6)
+    network.activate_element(7)
+    assert network.unknown_count(5) == 1
+    assert network.next_ready() == 5
+    network.activate_element(1)
+    network.activate_element(2)
+    assert network.next_ready() == 4
+    network.activate_element(3)
+    network.activate_element(8)
+    assert network.unknown_count(4) == 0
+    # only b is left unknown in (2)
+    assert network.next_ready() == 2
@@ -0,0 +1,35 @@
+import pytest
+
+from TriangleProblem.services import result_cache
+from TriangleProblem.services.result_cache import ResultCache
+
+def test_lru_eviction():
+    cache = ResultCache(max_size=2)
+    cache.put(('a',), 1)
+    cache.put(('b',), 2)
+    assert cache.get(('a',)) == 1
+    cache.put(('c',), 3)
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) == 1
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 1,
+                             'evictions': 1, 'expirations': 0}
+
+def test_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache, 'monotonic', lambda: now[0])
+    cache = ResultCache(ttl=10)
+    cache.put(('a',), 1)
+    now[0] = 109.0
+    assert cache.get(('a',)) == 1
+    now[0] = 110.0
+    assert cache.get(('a',)) is None
+    assert cache.stats()['expirations'] == 1
+
+def test_canonical_key():
+    cache = ResultCache(precision=6)
+    assert cache.key([3, 3.0000000001, None]) == (3.0, 3.0, None)
+    assert cache.key([1234567.0], ('s',)) == (1234570.0, 's')
+
+def test_invalid_config():
+    with pytest.raises(ValueError):
+        ResultCache(max_size=-1)
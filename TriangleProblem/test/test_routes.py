@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from TriangleProblem import app
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_triangle_calculator(client):
+    response = client.post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5', 'h_c': ''})
+    body = response.get_json()
+    assert body['status'] == 200
+    assert body['path'] == 'SSS'
+    assert body['data']['s'] == pytest.approx(6.0)
+    assert body['data']['height_c'] == pytest.approx(2.4)
+    assert body['data']['delta'] == pytest.approx(90.0)
+
+def test_triangle_calculator_height(client):
+    response = client.post('/triangle_calculator', data={'c': '5', 'h_c': '2.4'})
+    body = response.get_json()
+    assert body['status'] == 200
+    assert body['path'] == 'network'
+    assert body['data']['s'] == pytest.approx(6.0)
+
+def test_triangle_calculator_invalid(client):
+    response = client.post('/triangle_calculator', data={'a': '-3'})
+    assert response.get_json()['status'] == 400
+    for value in ('nan', 'inf'):
+        response = client.post('/triangle_calculator', data={'a': value, 'b': '4', 'c': '5'})
+        assert response.get_json()['status'] == 400
+
+def test_triangle_calculator_fields(client):
+    response = client.post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5', 'fields': 's,p'})
+    body = response.get_json()
+    assert body['data'] == {'s': pytest.approx(6.0), 'p': 6.0}
+    response = client.post('/triangle_calculator', data={'a': '3', 'fields': 'area'})
+    assert response.get_json()['status'] == 400
+
+def test_triangle_calculator_cache(client):
+    from TriangleProblem.routes.triangle import path_counts
+    data = {'a': '7', 'b': '8', 'c': '9'}
+    first = client.post('/triangle_calculator', data=data)
+    counted = path_counts['SSS']
+    second = client.post('/triangle_calculator', data={'a': '7.0', 'b': '8', 'c': '9.0000000000001'})
+    # a hit is counted under the path of the cached result
+    assert path_counts['SSS'] == counted + 1
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    bypass = client.post('/triangle_calculator', data=data, headers={'Cache-Control': 'no-cache'})
+    assert bypass.headers['X-Cache'] == 'BYPASS'
+
+def test_triangle_calculator_get(client):
+    response = client.get('/triangle_calculator?c=5.0&b=4&a=3&fields=p,s')
+    assert response.status_code == 301
+    assert response.headers['Location'] == '/triangle_calculator?a=3&b=4&c=5&fields=s,p'
+    response = client.get('/triangle_calculator?a=3&b=4&c=5&fields=s,p')
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {'s': pytest.approx(6.0), 'p': 6.0}
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    cached = client.get('/triangle_calculator?a=3&b=4&c=5&fields=s,p', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.headers['ETag'] == etag
+    other = client.get('/triangle_calculator?a=3&b=4&c=5')
+    assert other.headers['ETag'] != etag
+    invalid = client.get('/triangle_calculator?a=3&fields=area')
+    assert invalid.get_json()['status'] == 400 and 'ETag' not in invalid.headers
+    invalid = client.get('/triangle_calculator?a=-3&b=4&c=5')
+    assert invalid.get_json()['status'] == 400
+    assert 'ETag' not in invalid.headers and invalid.headers['Cache-Control'] == 'no-store'
+
+def read_ndjson(response) -> list:
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_triangle_calculator_batch(client):
+    problems = [{'a': 3, 'b': 4, 'c': 5}, {'a': -1}, 'triangle', {'c': '5', 'h_c': '2.4', 'fields': ['s']}]
+    response = client.post('/triangle_calculator/batch', json=problems)
+    assert response.mimetype == 'application/x-ndjson'
+    lines = read_ndjson(response)
+    assert [line['index'] for line in lines] == [0, 1, 2, 3]
+    assert [line['status'] for line in lines] == [200, 400, 400, 200]
+    assert lines[0]['data']['s'] == pytest.approx(6.0)
+    assert lines[3]['data'] == {'s': pytest.approx(6.0)}
+
+def test_triangle_calculator_batch_ndjson(client):
+    body = '{"a": 3, "b": 4, "c": 5}\n{oops}\n{"alpha": 30, "beta": 60, "c": 2}\n'
+    response = client.post('/triangle_calculator/batch', data=body,
+                           content_type='application/x-ndjson')
+    lines = read_ndjson(response)
+    assert [line['status'] for line in lines] == [200, 400, 200]
+    assert lines[2]['path'] == 'ASA'
+    assert lines[2]['data']['a'] == pytest.approx(1.0)
+
+def test_metrics(client):
+    response = client.post('/triangle_calculator', data={'a': '3', 'b': '4', 'c': '5'})
+    timings = dict(item.split(';dur=') for item in response.headers['Server-Timing'].split(', '))
+    assert set(timings) == {'parse', 'solve', 'serialize'}
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert 'triangle_http_requests_total{method="POST",route="/triangle_calculator",status="200"}' in text
+    assert 'triangle_request_phase_duration_seconds_count{phase="solve",route="/triangle_calculator"}' in text
+    assert 'triangle_solve_path_total{path="SSS"}' in text
+    assert 'triangle_result_cache_total{event="misses"}' in text
+
+def test_request_log(client, tmp_path):
+    from TriangleProblem.routes.request_log import get_log_manager
+    from TriangleProblem.utils.log_manager import LogManager
+    path = tmp_path / 'requests.log'
+    with app.app_context():
+        previous = get_log_manager()
+    app.extensions['triangle_log_manager'] = LogManager(path=str(path))
+    try:
+        client.post('/triangle_calculator', data={'c': '5', 'h_c': '2.4', 'no_cache': '1'}).close()
+        response = client.post('/triangle_calculator/batch', data='{"a": 3, "b": 4, "c": 5}\n[',
+                               content_type='application/x-ndjson')
+        assert len(response.get_data().splitlines()) == 2
+        response.close()
+    finally:
+        app.extensions['triangle_log_manager'].stop()
+        app.extensions['triangle_log_manager'] = previous
+    single, batch = [json.loads(line) for line in path.read_text().splitlines()]
+    assert single['route'] == '/triangle_calculator' and single['status'] == 200
+    assert single['inputs'] == {'c': 5.0, 'h_c': 2.4}
+    assert single['known'] == ['c', 'height_c']
+    assert single['path'] == 'network' and single['cache'] == 'BYPASS'
+    assert set(single['timings_ms']) == {'parse', 'solve', 'serialize'}
+    assert batch['route'] == '/triangle_calculator/batch'
+    assert batch['statuses'] == {'200': 1, '400': 1}
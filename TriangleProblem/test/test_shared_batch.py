@@ -0,0 +1,47 @@
+import random
+
+import numpy as np
+
+from TriangleProblem.models import (
+    TriangleBatch,
+    TriangleSemantic,
+    solve_shared
+)
+from TriangleProblem.models.shared_batch import split_rows
+from TriangleProblem.models.triangle_semantic import ELEMENTS
+from TriangleProblem.test.test_triangle_batch import make_triangle
+
+def make_rows(count: int) -> np.ndarray:
+    rng = random.Random(11)
+    rows = []
+    for _ in range(count):
+        row = make_triangle(rng)
+        known = rng.sample(range(9), rng.randint(2, 5))
+        rows.append([value if i in known else np.nan for i, value in enumerate(row)])
+    return np.array(rows)
+
+def test_split_rows():
+    assert split_rows(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert split_rows(2, 8) == [(0, 1), (1, 2)]
+    assert split_rows(0, 4) == []
+
+def test_parallel_matches_serial_and_scalar():
+    rows = make_rows(600)
+    result = solve_shared(rows, workers=2, min_task_rows=100)
+    serial = TriangleBatch.from_array(rows).spreading_activation().values.T
+    assert np.array_equal(result, serial, equal_nan=True)
+    for row, solved in zip(rows, result):
+        try:
+            triangle_semantic = TriangleSemantic.from_known(
+                **{name: value for name, value in zip(ELEMENTS, row) if not np.isnan(value)})
+        except (ValueError, ZeroDivisionError):
+            continue
+        expected = [getattr(triangle_semantic, name) if triangle_semantic.network.is_known(i + 1) else np.nan
+                    for i, name in enumerate(ELEMENTS)]
+        # np.sin / np.arcsin may differ from libm by a few ULP
+        np.testing.assert_allclose(solved, expected, rtol=1e-9, equal_nan=True)
+
+def test_small_input_is_solved_in_process():
+    rows = make_rows(5)
+    assert np.array_equal(solve_shared(rows, workers=4),
+                          TriangleBatch.from_array(rows).spreading_activation().values.T, equal_nan=True)
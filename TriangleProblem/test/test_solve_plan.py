@@ -0,0 +1,47 @@
+from TriangleProblem.models import (
+    Network,
+    TriangleSemantic,
+    get_plan,
+    is_solvable
+)
+
+def replay(known: int) -> tuple:
+    network = Network()
+    for element in range(1, 10):
+        if known >> (element - 1) & 1:
+            network.activate_element(element)
+    steps = []
+    index = 1
+    while index <= 6:
+        unknown_element = network.get_unknown_element(index)
+        if unknown_element == -1 or unknown_element == 0:
+            index += 1
+            continue
+        steps.append((index, unknown_element))
+        network.activate_element(unknown_element)
+        index = 1
+    return tuple(steps), network.known
+
+def test_plans_match_spreading_activation():
+    for known in range(Network.ALL_ELEMENTS + 1):
+        plan = get_plan(known)
+        assert plan.known == known
+        assert (plan.steps, plan.reachable) == replay(known)
+
+def test_is_solvable():
+    # alpha, beta, a
+    assert is_solvable(0b000001011)
+    # a, b, c: the angles cannot be derived
+    assert not is_solvable(0b000111000)
+    assert get_plan(0b000111000).reachable == 0b111111000
+
+def test_execute_plan():
+    triangle_semantic = TriangleSemantic()
+    for element, value in ((1, 30.0), (2, 60.0), (4, 1.0)):
+        triangle_semantic.set_e_value_by_index(element, value)
+        triangle_semantic.network.activate_element(element)
+    plan = triangle_semantic.execute_plan()
+    assert len(plan.steps) == 6
+    assert round(triangle_semantic.delta, 9) == 90.0
+    assert round(triangle_semantic.c, 9) == 2.0
+    assert round(triangle_semantic.square, 9) == round(3 ** 0.5 / 2, 9)
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from TriangleProblem import app
+from TriangleProblem.routes import triangle
+from TriangleProblem.services import sqlite_cache
+from TriangleProblem.services.sqlite_cache import SqliteCache
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sqlite_cache, 'time', lambda: now[0])
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), max_size=2, check_interval=1)
+    cache.put(('a',), 1)
+    now[0] += 2
+    cache.put(('b',), 2)
+    now[0] += 2
+    assert cache.get(('a',)) == 1
+    now[0] += 2
+    cache.put(('c',), 3)
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) == 1
+    assert cache.stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 1,
+                             'evictions': 1, 'expirations': 0}
+
+def test_ttl(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sqlite_cache, 'time', lambda: now[0])
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), ttl=10)
+    cache.put(('a',), 1)
+    now[0] = 109.0
+    assert cache.get(('a',)) == 1
+    now[0] = 110.0
+    assert not cache.contains(('a',))
+    assert cache.get(('a',)) is None
+    assert cache.stats()['expirations'] == 1
+
+def test_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    first, second = SqliteCache(path), SqliteCache(path)
+    key = first.key([3, None, 4.00000000000001])
+    first.put(key, ({'a': 3.0, 'b': -1.0}, 'network'))
+    assert second.get(second.key([3.0, None, 4.0])) == ({'a': 3.0, 'b': -1.0}, 'network')
+    assert len(second) == 1
+
+def test_warm_from_request_log(tmp_path, monkeypatch):
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setitem(app.extensions, 'triangle_result_cache', cache)
+    lines = [
+        {'route': '/triangle_calculator', 'status': 200, 'path': 'closed_form',
+         'inputs': {'a': 3.0, 'b': 4.0, 'c': 5.0}, 'fields': None},
+        {'route': '/triangle_calculator', 'status': 200, 'path': 'closed_form',
+         'inputs': {'a': 3.0, 'b': 4.0, 'c': 5.0}, 'fields': None},
+        {'route': '/triangle_calculator', 'status': 200, 'path': None,
+         'inputs': {'a': -3.0}, 'fields': None},
+        {'route': '/', 'status': 200},
+    ]
+    log = tmp_path / 'requests.jsonl'
+    log.write_text('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n')
+    with app.app_context():
+        assert triangle.warm_result_cache(str(log)) == 1
+        assert triangle.warm_result_cache(str(log)) == 0
+
+    response = app.test_client().post('/triangle_calculator', data={'a': 3, 'b': 4, 'c': 5})
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.get_json()['data']['s'] == pytest.approx(6.0)
+
+def test_shared_size_metric(tmp_path, monkeypatch):
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setitem(app.extensions, 'triangle_result_cache', cache)
+    client = app.test_client()
+    client.post('/triangle_calculator', data={'a': 3, 'b': 4, 'c': 5})
+    text = client.get('/metrics').get_data(as_text=True)
+    # every worker reports the same database: the size is merged as a max
+    assert 'triangle_result_cache_shared_size 1' in text
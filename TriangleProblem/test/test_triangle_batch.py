@@ -0,0 +1,63 @@
+import random
+from math import (
+    radians,
+    sin,
+    sqrt
+)
+
+import numpy as np
+
+from TriangleProblem.models import (
+    TriangleBatch,
+    TriangleSemantic
+)
+from TriangleProblem.models.triangle_batch import ELEMENTS
+
+def make_triangle(rng: random.Random) -> list:
+    '''
+    A random valid triangle as [alpha, beta, delta, a, b, c, square, height_c, p]
+    '''
+    alpha = rng.uniform(20.0, 100.0)
+    beta = rng.uniform(20.0, 160.0 - alpha)
+    delta = 180.0 - alpha - beta
+    ratio = rng.uniform(1.0, 10.0) / sin(radians(delta))
+    a, b, c = [ratio * sin(radians(angle)) for angle in (alpha, beta, delta)]
+    p = (a + b + c) / 2
+    square = sqrt(p * (p-a) * (p-b) * (p-c))
+    return [alpha, beta, delta, a, b, c, square, 2 * square / c, p]
+
+def solve_scalar(row: list) -> list:
+    triangle_semantic = TriangleSemantic()
+    for element, value in enumerate(row, start=1):
+        if not np.isnan(value):
+            triangle_semantic.set_e_value_by_index(element, value)
+            triangle_semantic.network.activate_element(element)
+    for expression in range(1, 7):
+        triangle_semantic.spreading_activation(expression)
+    return [triangle_semantic.get_element_by_index(element)
+            if -1 not in triangle_semantic.network.network[element - 1] else np.nan
+            for element in range(1, 10)]
+
+def test_batch_matches_spreading_activation():
+    rng = random.Random(7)
+    rows = []
+    for _ in range(300):
+        row = make_triangle(rng)
+        known = rng.sample(range(9), rng.randint(2, 4))
+        rows.append([value if i in known else np.nan for i, value in enumerate(row)])
+
+    result = TriangleBatch.from_array(rows).solve()
+    for i, row in enumerate(rows):
+        try:
+            expected = solve_scalar(row)
+        except (ValueError, ZeroDivisionError):
+            continue
+        actual = [result[name][i] for name in ELEMENTS]
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, equal_nan=True)
+
+def test_batch_columns():
+    result = TriangleBatch(a=[3.0, 6.0], b=[4.0, 8.0], c=[5.0, 10.0]).solve()
+    np.testing.assert_allclose(result['p'], [6.0, 12.0])
+    np.testing.assert_allclose(result['square'], [6.0, 24.0])
+    np.testing.assert_allclose(result['height_c'], [2.4, 4.8])
+    assert np.isnan(result['alpha']).all()
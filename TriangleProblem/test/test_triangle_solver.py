@@ -0,0 +1,108 @@
+import pytest
+
+from TriangleProblem.models import (
+    Network,
+    TriangleSemantic
+)
+
+def test_from_known():
+    triangle_semantic = TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0, alpha=None)
+    assert triangle_semantic.p == 6.0
+    assert triangle_semantic.square == 6.0
+    assert triangle_semantic.height_c == pytest.approx(2.4)
+    assert triangle_semantic.alpha == -1.0
+
+def test_from_known_propagates_once():
+    values = {'alpha': 30.0, 'a': 1.0, 'b': 3 ** 0.5, 'p': (3 + 3 ** 0.5) / 2}
+    setters = TriangleSemantic()
+    for name, value in values.items():
+        setattr(setters, name, value)
+    triangle_semantic = TriangleSemantic.from_known(**values)
+    assert triangle_semantic.p == values['p']
+    assert triangle_semantic.c == pytest.approx(setters.c)
+    # the setters calculate p before it is given
+    assert triangle_semantic.evaluations < setters.evaluations
+
+def test_from_known_invalid_name():
+    with pytest.raises(ValueError):
+        TriangleSemantic.from_known(d=1.0)
+
+def test_solve_targets():
+    triangle_semantic = TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0, height_c=2.4, solve=False)
+    plan = triangle_semantic.solve(['p'])
+    assert plan.steps == ((6, 9),)
+    assert triangle_semantic.p == 6.0
+    assert triangle_semantic.square == -1.0
+
+def test_solve_targets_backward():
+    # square from alpha, beta, a needs b, delta, c and p first
+    triangle_semantic = TriangleSemantic.from_known(alpha=30.0, beta=60.0, a=1.0, solve=False)
+    plan = triangle_semantic.solve(['square'])
+    assert [element for _, element in plan.steps] == [5, 3, 6, 9, 7]
+    assert triangle_semantic.square == pytest.approx(3 ** 0.5 / 2)
+    assert triangle_semantic.height_c == -1.0
+
+def test_update_recalculates_dependents_only():
+    triangle_semantic = TriangleSemantic.from_known(alpha=30.0, beta=60.0, c=5.0)
+    evaluations = triangle_semantic.evaluations
+    changed = triangle_semantic.update(c=10.0, alpha=30.0)
+    # delta only depends on the angles
+    assert 'delta' not in changed and triangle_semantic.delta == 90.0
+    assert set(changed) == {'a', 'b', 'c', 'square', 'height_c', 'p'}
+    assert triangle_semantic.evaluations - evaluations == 5
+    expected = TriangleSemantic.from_known(alpha=30.0, beta=60.0, c=10.0)
+    for name in ('a', 'b', 'square', 'height_c', 'p'):
+        assert changed[name] == pytest.approx(getattr(expected, name))
+    assert triangle_semantic.update(c=10.0) == {}
+
+def test_update_forget_and_replace():
+    triangle_semantic = TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0)
+    assert triangle_semantic.update(c=None) == {'c': -1.0, 'square': -1.0, 'height_c': -1.0, 'p': -1.0}
+    assert triangle_semantic.inputs == ['a', 'b']
+    # a calculated element becomes given
+    triangle_semantic.update(p=6.0)
+    assert triangle_semantic.inputs == ['a', 'b', 'p']
+    assert triangle_semantic.c == 5.0 and triangle_semantic.square == 6.0
+    with pytest.raises(ValueError):
+        triangle_semantic.update(d=1.0)
+
+def test_fork():
+    base = TriangleSemantic.from_known(a=3.0, b=4.0)
+    snapshot = base.snapshot()
+    right = base.fork()
+    right.update(c=5.0)
+    other = TriangleSemantic.from_snapshot(snapshot)
+    other.update(alpha=30.0)
+    assert right.square == 6.0 and right.alpha == -1.0
+    assert other.c == pytest.approx(TriangleSemantic.from_known(a=3.0, b=4.0, alpha=30.0).c)
+    assert base.snapshot() == snapshot
+    assert right.evaluations == 3
+
+    base.restore(right.snapshot())
+    assert base.inputs == ['a', 'b', 'c'] and base.p == 6.0
+    # the calculated elements keep their sources
+    assert base.update(c=None)['p'] == -1.0
+
+def test_set_network():
+    triangle_semantic = TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0)
+    triangle_semantic.network = Network()
+    assert triangle_semantic.network.known == 0
+    assert triangle_semantic.inputs == []
+    triangle_semantic.set_network(TriangleSemantic.from_known(a=3.0).network.network)
+    assert triangle_semantic.inputs == ['a']
+
+def test_reset_reuses_the_triangle():
+    triangle_semantic = TriangleSemantic.from_known(alpha=30.0, beta=60.0, c=5.0)
+    assert triangle_semantic.reset(a=3.0, b=4.0, c=5.0) is triangle_semantic
+    expected = TriangleSemantic.from_known(a=3.0, b=4.0, c=5.0)
+    assert triangle_semantic.snapshot() == expected.snapshot()
+    assert triangle_semantic.evaluations == expected.evaluations
+    triangle_semantic.reset()
+    assert triangle_semantic.network.known == 0 and triangle_semantic.alpha == -1.0
+
+def test_no_instance_dict():
+    triangle_semantic = TriangleSemantic()
+    for instance in (triangle_semantic, triangle_semantic.network):
+        assert not hasattr(instance, '__dict__')
+        with pytest.raises(AttributeError):
+            instance.alpha_ = 1.0
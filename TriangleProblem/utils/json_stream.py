@@ -0,0 +1,117 @@
+import codecs
+import json
+from itertools import chain
+'''
+JSON Stream
+=====
+Read the items of a JSON array or of NDJSON (one JSON value per line) from a
+binary stream, chunk by chunk, without loading the whole body.
+
+Every item is yielded as a tuple (value, error): error is None for a valid
+item, otherwise the message of the item which could not be decoded.
+'''
+CHUNK_SIZE = 64 * 1024
+
+def iter_items(stream, chunk_size: int = CHUNK_SIZE):
+    '''
+    Detect the format from the first character ('[' for a JSON array) and
+    iterate over the items.
+    '''
+    first = b''
+    while True:
+        first = stream.read(1)
+        if not first or not first.isspace():
+            break
+    if not first:
+        return
+    if first == b'[':
+        yield from iter_json_array(stream, chunk_size)
+    else:
+        yield from iter_ndjson(stream, first)
+
+def iter_ndjson(stream, prefix: bytes = b''):
+    '''
+    Iterate over the lines of NDJSON. Blank lines are skipped and a line which
+    is not valid JSON only fails its own item.
+    '''
+    lines = chain([prefix + stream.readline()], stream) if prefix else stream
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as ex:
+            yield None, 'Invalid JSON: {}'.format(ex)
+
+'''
+The literals a truncated item may end with.
+'''
+LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+def is_truncated(buffer: str, error: json.JSONDecodeError) -> bool:
+    '''
+    Check if a decode error is due to the end of the buffer (the item may go on
+    in the next chunk) rather than to invalid JSON.
+    '''
+    if error.msg.startswith('Unterminated string'):
+        return True
+    tail = buffer[error.pos:]
+    return not tail.strip() or any(literal.startswith(tail) for literal in LITERALS)
+
+def iter_json_array(stream, chunk_size: int = CHUNK_SIZE):
+    '''
+    Iterate over the items of a JSON array whose '[' has been read already.
+    A syntax error ends the array with one failed item.
+    '''
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    eof = False
+    expect_item = True
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + text.decode(chunk, final=eof)
+        position = 0
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                yield None, 'Invalid JSON: unterminated array'
+                return
+            fill()
+            continue
+        char = buffer[position]
+        if char == ']' and expect_item != 'value':
+            return
+        if not expect_item:
+            if char != ',':
+                yield None, 'Invalid JSON: expected "," at item separator'
+                return
+            position += 1
+            expect_item = 'value'
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as ex:
+            # only an item cut by the end of the buffer may be completed by the
+            # next chunk: stop at once on a syntax error, without reading the rest
+            if eof or not is_truncated(buffer, ex):
+                yield None, 'Invalid JSON: {}'.format(ex)
+                return
+            fill()
+            continue
+        if end == len(buffer) and not eof:
+            # a number may go on in the next chunk
+            fill()
+            continue
+        position = end
+        expect_item = False
+        yield value, None
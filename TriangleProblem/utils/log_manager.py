@@ -0,0 +1,156 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import traceback
+from logging.handlers import (
+    QueueHandler,
+    QueueListener
+)
+from queue import SimpleQueue
+from random import random
+from threading import Lock
+'''
+Log Manager
+=====
+Structured logs written off the request threads: the logger only puts the
+records on a queue (QueueHandler), and a background thread (QueueListener)
+formats them as JSON lines and writes them to a file or stderr.
+
+- sample_rate: the fraction of the events logged, between 0 and 1; an event
+  with an exception (or `always`) is logged whatever the rate
+- path: the file the lines are appended to, None for stderr
+
+The listener is started on the first event of each process, so the manager
+may be created before gunicorn forks its workers.
+
+Every manager owns its logger: it is named `name` in the lines, but it is not
+the shared `logging.getLogger(name)`, so several managers (e.g. of several
+apps) never take over or remove each other's handler.
+'''
+class LogManagerException(Exception):
+    @classmethod
+    def throw(cls, ex):
+        raise ex
+
+class JsonFormatter(logging.Formatter):
+    '''
+    Format a record as one JSON line: the time, level and logger, then the
+    event (the dict message) or the message.
+    '''
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + '.{:03d}'.format(int(record.msecs)),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process
+        }
+        if isinstance(record.msg, dict):
+            line.update(record.msg)
+        else:
+            line['message'] = record.getMessage()
+        if record.exc_info and 'exception' not in line:
+            line['exception'] = format_exception(record.exc_info[1])
+        return json.dumps(line, default=str)
+
+class EventQueueHandler(QueueHandler):
+    '''
+    Queue the records as they are: the listener formats them, so the request
+    thread doesn't pay for the JSON encoding.
+    '''
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def format_exception(ex: BaseException) -> dict:
+    return {
+        'type': type(ex).__name__,
+        'message': str(ex),
+        'traceback': ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__))
+    }
+
+class LogManager:
+    def __init__(self, name: str = 'TriangleProblem.requests', path: str = None,
+                 sample_rate: float = 1.0, level: int = logging.INFO) -> None:
+        if not 0 <= sample_rate <= 1:
+            LogManagerException.throw(ValueError('Invalid argument'))
+        self.__sample_rate = sample_rate
+        self.__path = path
+        self.__queue = SimpleQueue()
+        self.__listener = None
+        self.__pid = None
+        self.__lock = Lock()
+        self.__logger = logging.Logger(name, level)
+        self.__logger.propagate = False
+        self.__logger.addHandler(EventQueueHandler(self.__queue))
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def sample_rate(self) -> float:
+        return self.__sample_rate
+
+    def is_sampled(self) -> bool:
+        '''
+        Draw whether an event without exception is logged.
+        '''
+        return self.__sample_rate >= 1 or random() < self.__sample_rate
+
+    def start(self):
+        '''
+        Start the listener of this process, if not started yet.
+        '''
+        if self.__pid == os.getpid():
+            return
+        with self.__lock:
+            if self.__pid == os.getpid():
+                return
+            if self.__path:
+                handler = logging.FileHandler(self.__path, encoding='utf-8')
+            else:
+                handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(JsonFormatter())
+            self.__listener = QueueListener(self.__queue, handler, respect_handler_level=True)
+            self.__listener.start()
+            if self.__pid is None:
+                atexit.register(self.stop)
+            self.__pid = os.getpid()
+
+    def stop(self):
+        '''
+        Write the queued events and stop the listener.
+        '''
+        with self.__lock:
+            if self.__listener is not None and self.__pid == os.getpid():
+                self.__listener.stop()
+                for handler in self.__listener.handlers:
+                    handler.close()
+            self.__listener = None
+            self.__pid = None
+
+    def log(self, event: dict, exception: BaseException = None, always: bool = False) -> bool:
+        '''
+        Log an event as one JSON line, if it is sampled.
+        Parameters
+        ----------
+        event: dict
+            The fields of the line; must be JSON serializable (others are written as str).
+        exception: BaseException
+            The exception of the event, if any. It is logged at ERROR level.
+        always: bool
+            True to skip the sampling.
+        Returns
+        -------
+        bool:
+            True if the event has been logged.
+        '''
+        if exception is None and not always and not self.is_sampled():
+            return False
+        self.start()
+        if exception is not None:
+            self.__logger.error(event, exc_info=exception)
+        else:
+            self.__logger.info(event)
+        return True
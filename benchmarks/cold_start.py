@@ -0,0 +1,127 @@
+'''
+Cold start benchmark
+=====
+Measure how fast a new worker is ready, each run in a fresh interpreter:
+
+- import: `import TriangleProblem`
+- create_app: `create_app()`, which imports the routes and the models
+- first_response: the first POST /triangle_calculator (network case) and
+  GET / through the test client, after create_app
+- models: `import TriangleProblem.models` alone, as the command line does
+- process: the wall time of the whole interpreter, from start to exit
+
+Each phase reports the median and the best time (milliseconds) over the runs.
+`--save` writes the medians as a baseline; `--compare` fails (exit code 1) when
+a phase is slower than the baseline by more than `--threshold`.
+
+Usage:
+    python -m benchmarks.cold_start [--runs N]
+    python -m benchmarks.cold_start --save benchmarks/cold_start.json
+    python -m benchmarks.cold_start --compare benchmarks/cold_start.json --threshold 0.25
+'''
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+'''
+The script of a run: it prints the duration (seconds) of each phase as JSON.
+'''
+APP_SCRIPT = '''
+import json
+from time import perf_counter
+start = perf_counter()
+import TriangleProblem
+imported = perf_counter()
+app = TriangleProblem.create_app({'TRIANGLE_LOG_SAMPLE_RATE': 0.0})
+created = perf_counter()
+client = app.test_client()
+response = client.post('/triangle_calculator', data={'c': '5', 'h_c': '2.4', 'a': '3'})
+assert response.status_code == 200, response.status
+assert client.get('/').status_code == 200
+responded = perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'first_response': responded - created}))
+'''
+MODELS_SCRIPT = '''
+import json
+from time import perf_counter
+start = perf_counter()
+import TriangleProblem.models
+print(json.dumps({'models': perf_counter() - start}))
+'''
+PHASES = ('import', 'create_app', 'first_response', 'models', 'process')
+
+def run_script(script: str) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], check=True,
+                            capture_output=True, text=True).stdout
+    phases = json.loads(output.splitlines()[-1])
+    phases['process'] = time.perf_counter() - start
+    return phases
+
+def run_benchmark(runs: int) -> dict:
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(runs):
+        for phase, seconds in run_script(APP_SCRIPT).items():
+            samples[phase].append(seconds * 1000)
+        samples['models'].append(run_script(MODELS_SCRIPT)['models'] * 1000)
+    return {phase: {'median_ms': statistics.median(values), 'best_ms': min(values)}
+            for phase, values in samples.items()}
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    '''
+    Get the phases slower than the baseline by more than the threshold, as
+    (phase, baseline ms, current ms, change) tuples.
+    '''
+    regressions = []
+    for phase, result in results.items():
+        if phase not in baseline:
+            continue
+        before = baseline[phase]['median_ms']
+        change = result['median_ms'] / before - 1
+        if change > threshold:
+            regressions.append((phase, before, result['median_ms'], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cold start benchmark')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='baseline to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown, 0.25 for 25%% (default)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.runs)
+    print('{:<16}{:>12}{:>12}'.format('phase', 'median ms', 'best ms'))
+    for phase, result in results.items():
+        print('{:<16}{:>12.1f}{:>12.1f}'.format(phase, result['median_ms'], result['best_ms']))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'results': results
+            }, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n{} phase(s) slower than the baseline by more than {:.0%}:'.format(
+                len(regressions), args.threshold))
+            for phase, before, after, change in regressions:
+                print('  {}: {:.1f} -> {:.1f} ms ({:+.1%})'.format(phase, before, after, change))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
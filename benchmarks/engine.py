@@ -0,0 +1,82 @@
+'''
+Engine benchmark
+=====
+Propagation on synthetic networks (see models.engine.generate_network) of
+increasing size, with as many formulas as variables, 3 variables each. The
+first two variables are given and every other one is calculated.
+
+- sparse: the heap worklist of models.engine.Propagation, which only visits
+  the formulas of each new variable
+- dense: the former approach of Network, a variables x formulas matrix
+  rescanned from the first formula after each new variable; only run up to
+  --dense-max variables
+
+The two engines must reach the same values.
+
+Usage:
+    python -m benchmarks.engine [--sizes 100 1000 10000] [--dense-max N]
+'''
+import argparse
+import time
+
+from TriangleProblem.models.engine import generate_network
+
+def dense_propagation(network, values: list) -> int:
+    matrix = [[0] * len(network.formulas) for _ in network.variables]
+    for formula, variables in enumerate(network.formula_variables):
+        for variable in variables:
+            matrix[variable][formula] = -1 if values[variable] is None else 1
+    fired = 0
+    formula = 0
+    while formula < len(network.formulas):
+        unknown = [variable for variable in range(len(network.variables)) if matrix[variable][formula] == -1]
+        if len(unknown) != 1 or unknown[0] not in network.formulas[formula].solvers:
+            formula += 1
+            continue
+        variable = unknown[0]
+        values[variable] = network.formulas[formula].solvers[variable](values)
+        for other in network.variable_formulas[variable]:
+            matrix[variable][other] = 1
+        fired += 1
+        formula = 0
+    return fired
+
+def sparse_propagation(network, values: list) -> int:
+    propagation = network.propagation()
+    for variable, value in enumerate(values):
+        if value is not None:
+            propagation.set(variable, value)
+    fired = propagation.run()
+    values[:] = propagation.values
+    return fired
+
+def measure(propagate, network, solution: list) -> tuple:
+    values = [None] * len(solution)
+    values[0], values[1] = solution[0], solution[1]
+    start = time.perf_counter()
+    fired = propagate(network, values)
+    return fired, time.perf_counter() - start, values
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000, 3000, 10000])
+    parser.add_argument('--dense-max', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    print('{:>10}{:>10}{:>10}{:>10}{:>14}{:>14}'.format(
+        'variables', 'formulas', 'edges', 'fired', 'sparse ms', 'dense ms'))
+    for size in args.sizes:
+        registry, solution = generate_network(size, size, seed=size)
+        network = registry.compile()
+        fired, sparse, values = measure(sparse_propagation, network, solution)
+        dense = '-'
+        if size <= args.dense_max:
+            dense_fired, seconds, dense_values = measure(dense_propagation, network, solution)
+            if dense_fired != fired or dense_values != values:
+                raise SystemExit('The engines differ on {} variables'.format(size))
+            dense = '{:.2f}'.format(seconds * 1e3)
+        print('{:>10}{:>10}{:>10}{:>10}{:>14.2f}{:>14}'.format(
+            size, len(network.formulas), network.edges, fired, sparse * 1e3, dense))
+
+if __name__ == '__main__':
+    main()
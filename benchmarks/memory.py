@@ -0,0 +1,99 @@
+'''
+Memory benchmark
+=====
+Measure the memory of the solver objects with tracemalloc:
+
+- retained: the bytes and blocks (live allocations) of one solved
+  TriangleSemantic, averaged over many triangles kept alive together
+- peak: the most bytes allocated at once while solving one request
+- time: the time of a request, with tracemalloc off
+
+A request either builds a new triangle with `TriangleSemantic.from_known`, or
+reuses one triangle per thread with `reset`.
+
+The requests are every known-set of 2 to 6 elements of a reference triangle.
+
+Usage:
+    python -m benchmarks.memory [--count N]
+'''
+import argparse
+import time
+import tracemalloc
+from itertools import combinations
+
+from TriangleProblem.models import TriangleSemantic
+from TriangleProblem.models.triangle_semantic import ELEMENTS
+
+# alpha, beta, delta, a, b, c, square, height_c, p of a 3-4-5 triangle
+REFERENCE = (36.86989764584402, 53.13010235415598, 90.0, 3.0, 4.0, 5.0, 6.0, 2.4, 6.0)
+
+def requests() -> list:
+    return [{ELEMENTS[i]: REFERENCE[i] for i in known}
+            for size in range(2, 7) for known in combinations(range(9), size)]
+
+def build(values: dict) -> TriangleSemantic:
+    try:
+        return TriangleSemantic.from_known(**values)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def measure_retained(samples: list, count: int) -> tuple:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(samples[i % len(samples)]) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    # the list of the kept triangles itself
+    size -= kept.__sizeof__()
+    blocks -= 1
+    return size / count, blocks / count
+
+def measure_peak(solve, samples: list) -> float:
+    tracemalloc.start()
+    total = 0
+    for values in samples:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        solve(values)
+        total += tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    return total / len(samples)
+
+def measure_time(solve, samples: list, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for values in samples:
+            solve(values)
+    return (time.perf_counter() - start) / (repeat * len(samples))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    samples = requests()
+    size, blocks = measure_retained(samples, args.count)
+    print('{} requests'.format(len(samples)))
+    print('retained per triangle: {:.0f} bytes, {:.1f} blocks'.format(size, blocks))
+
+    solvers = [('from_known', build)]
+    if hasattr(TriangleSemantic, 'reset'):
+        triangle_semantic = TriangleSemantic()
+
+        def reuse(values: dict):
+            try:
+                return triangle_semantic.reset(**values)
+            except (ValueError, ZeroDivisionError):
+                return None
+        solvers.append(('reset', reuse))
+    print('{:<12}{:>24}{:>16}'.format('request', 'peak bytes / request', 'us / request'))
+    for name, solve in solvers:
+        peak = measure_peak(solve, samples)
+        seconds = measure_time(solve, samples)
+        print('{:<12}{:>24.0f}{:>16.2f}'.format(name, peak, seconds * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''
+Micro-batching benchmark
+=====
+Throughput and latency of the async /triangle_calculator (TriangleProblem.asgi)
+with concurrent clients, with micro-batching (the configured window and max
+batch size) and without it (a batch of one, i.e. one solve per request).
+
+The requests are network cases (a side, the altitude from C and the side c)
+with distinct inputs and the result cache bypassed, so every request is solved.
+The ASGI app is called in process, without a server.
+
+Usage:
+    python -m benchmarks.micro_batching [--clients N] [--requests N] [--window S]
+'''
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlencode
+
+from TriangleProblem import create_app
+from TriangleProblem.asgi import TriangleAsgi
+from TriangleProblem.services.micro_batcher import MicroBatcher
+
+async def post(application, data: dict):
+    messages = [{'type': 'http.request', 'body': urlencode(data).encode(), 'more_body': False}]
+    scope = {'type': 'http', 'path': '/triangle_calculator', 'method': 'POST', 'query_string': b'',
+             'headers': [(b'content-type', b'application/x-www-form-urlencoded')]}
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+    async def send(message):
+        pass
+    await application(scope, receive, send)
+
+async def client(application, index: int, requests: int, latencies: list):
+    for i in range(requests):
+        data = {'a': 3 + (index * requests + i) * 1e-6, 'c': 5, 'h_c': 2.4, 'no_cache': 1}
+        start = time.perf_counter()
+        await post(application, data)
+        latencies.append(time.perf_counter() - start)
+
+async def run(application, clients: int, requests: int) -> tuple:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(application, i, requests, latencies) for i in range(clients)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return (clients * requests / seconds, statistics.median(latencies),
+            latencies[int(len(latencies) * 0.99) - 1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--clients', type=int, default=256)
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    parser.add_argument('--window', type=float, default=0.002)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    args = parser.parse_args(argv)
+
+    # the request log is not what is measured
+    app = create_app({'TRIANGLE_LOG_SAMPLE_RATE': 0.0})
+    print('{} clients x {} requests'.format(args.clients, args.requests))
+    print('{:<16}{:>12}{:>12}{:>12}{:>16}'.format('mode', 'req/s', 'p50 ms', 'p99 ms', 'mean batch'))
+    for name, batcher in (('one by one', MicroBatcher(window=0, max_batch_size=1)),
+                          ('micro-batched', MicroBatcher(args.window, args.max_batch_size))):
+        application = TriangleAsgi(app, batcher=batcher)
+        throughput, p50, p99 = asyncio.run(run(application, args.clients, args.requests))
+        stats = batcher.stats()
+        print('{:<16}{:>12,.0f}{:>12.2f}{:>12.2f}{:>16.1f}'.format(
+            name, throughput, p50 * 1000, p99 * 1000, stats['items'] / max(stats['batches'], 1)))
+
+if __name__ == '__main__':
+    main()
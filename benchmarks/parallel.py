@@ -0,0 +1,61 @@
+'''
+Parallel batch benchmark
+=====
+Complete a large random array of triangles (2 to 5 known elements each) with
+a serial TriangleBatch, and with `solve_shared` on a process pool sharing the
+array through shared memory, for several numbers of workers.
+
+Usage:
+    python -m benchmarks.parallel [--rows N] [--workers 1,2,4]
+'''
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from TriangleProblem.models import (
+    TriangleBatch,
+    solve_shared
+)
+
+def make_rows(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    alpha = rng.uniform(20.0, 80.0, count)
+    beta = rng.uniform(20.0, 80.0, count)
+    delta = 180.0 - alpha - beta
+    ratio = rng.uniform(1.0, 10.0, count)
+    a, b, c = (ratio * np.sin(np.radians(angle)) for angle in (alpha, beta, delta))
+    p = (a + b + c) / 2
+    square = np.sqrt(p * (p-a) * (p-b) * (p-c))
+    rows = np.stack([alpha, beta, delta, a, b, c, square, 2 * square / c, p], axis=1)
+    known = rng.random((count, 9)).argsort(axis=1) < rng.integers(2, 6, count)[:, None]
+    return np.where(known, rows, np.nan)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--workers', default=','.join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    start = time.perf_counter()
+    serial = TriangleBatch.from_array(rows).spreading_activation().values.T
+    seconds = time.perf_counter() - start
+    print('{:,} rows, {} CPUs'.format(args.rows, os.cpu_count()))
+    print('{:<16}{:>12}{:>16}{:>12}'.format('solver', 'seconds', 'rows / s', 'identical'))
+    print('{:<16}{:>12.3f}{:>16,.0f}{:>12}'.format('serial', seconds, args.rows / seconds, 'yes'))
+    for workers in (int(n) for n in args.workers.split(',')):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # start the workers before timing
+            list(executor.map(abs, range(workers)))
+            start = time.perf_counter()
+            result = solve_shared(rows, workers=workers, executor=executor)
+            seconds = time.perf_counter() - start
+        print('{:<16}{:>12.3f}{:>16,.0f}{:>12}'.format(
+            'shared x{}'.format(workers), seconds, args.rows / seconds,
+            'yes' if np.array_equal(result, serial, equal_nan=True) else 'NO'))
+
+if __name__ == '__main__':
+    main()
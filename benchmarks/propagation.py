@@ -0,0 +1,125 @@
+'''
+Propagation benchmark
+=====
+Compare the worklist-driven `TriangleSemantic.spreading_activation` with the
+previous loop that rescanned every expression from (1) after each new element.
+
+For every one of the 512 known-sets of a reference triangle both engines run
+to their fixed point; the values must be identical. The work is counted as the
+number of expression checks: calls of `get_unknown_element`, `unknown_count`
+and `next_ready`. Both engines share the same Network, whose activation
+only updates the counters of the expressions related to the new element.
+
+Usage:
+    python -m benchmarks.propagation [--repeat N]
+'''
+import argparse
+import time
+from contextlib import contextmanager
+
+from TriangleProblem.models import (
+    Network,
+    TriangleSemantic
+)
+
+# alpha, beta, delta, a, b, c, square, height_c, p of a 3-4-5 triangle
+REFERENCE = (36.86989764584402, 53.13010235415598, 90.0, 3.0, 4.0, 5.0, 6.0, 2.4, 6.0)
+
+def rescan_activation(triangle_semantic: TriangleSemantic, expression: int):
+    '''
+    The restart-from-(1) loop that the worklist replaces.
+    '''
+    network = triangle_semantic.network
+    unknown_element = network.get_unknown_element(expression)
+    if unknown_element == -1 or unknown_element == 0:
+        return
+    value = triangle_semantic.calculate_expression_controller(expression, unknown_element)
+    triangle_semantic.set_e_value_by_index(unknown_element, value)
+    network.activate_element(unknown_element)
+    index = 1
+    while index <= 6:
+        unknown_element = network.get_unknown_element(index)
+        if unknown_element == -1 or unknown_element == 0:
+            index += 1
+            continue
+        value = triangle_semantic.calculate_expression_controller(index, unknown_element)
+        triangle_semantic.set_e_value_by_index(unknown_element, value)
+        network.activate_element(unknown_element)
+        index = 1
+
+def worklist_activation(triangle_semantic: TriangleSemantic, expression: int):
+    triangle_semantic.spreading_activation(expression)
+
+@contextmanager
+def count_checks(counter: dict):
+    '''
+    Count the calls of the Network methods used to check an expression.
+    '''
+    names = ('get_unknown_element', 'unknown_count', 'next_ready')
+    originals = {name: getattr(Network, name) for name in names}
+
+    def counting(original):
+        def method(self, *args):
+            counter['checks'] += 1
+            return original(self, *args)
+        return method
+
+    for name, original in originals.items():
+        setattr(Network, name, counting(original))
+    try:
+        yield counter
+    finally:
+        for name, original in originals.items():
+            setattr(Network, name, original)
+
+def solve(known: int, activation) -> list:
+    triangle_semantic = TriangleSemantic()
+    for element in range(1, 10):
+        if known >> (element - 1) & 1:
+            triangle_semantic.set_e_value_by_index(element, REFERENCE[element - 1])
+            triangle_semantic.network.activate_element(element)
+    for expression in range(1, 7):
+        activation(triangle_semantic, expression)
+    return [triangle_semantic.get_element_by_index(element) for element in range(1, 10)]
+
+def run(activation) -> tuple:
+    results = []
+    with count_checks({'checks': 0}) as counter:
+        for known in range(Network.ALL_ELEMENTS + 1):
+            try:
+                results.append(solve(known, activation))
+            except (ValueError, ZeroDivisionError) as ex:
+                results.append(type(ex))
+    return results, counter['checks']
+
+def timing(activation, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for known in range(Network.ALL_ELEMENTS + 1):
+            try:
+                solve(known, activation)
+            except (ValueError, ZeroDivisionError):
+                pass
+    return (time.perf_counter() - start) / repeat
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rescan_results, rescan_checks = run(rescan_activation)
+    worklist_results, worklist_checks = run(worklist_activation)
+    if rescan_results != worklist_results:
+        raise SystemExit('The fixed points differ!')
+
+    rows = [
+        ('rescan', rescan_checks, timing(rescan_activation, args.repeat)),
+        ('worklist', worklist_checks, timing(worklist_activation, args.repeat)),
+    ]
+    print('Same fixed point for all {} known-sets'.format(Network.ALL_ELEMENTS + 1))
+    print('{:<10}{:>18}{:>18}'.format('engine', 'expression checks', 'ms / 512 sets'))
+    for name, checks, seconds in rows:
+        print('{:<10}{:>18}{:>18.2f}'.format(name, checks, seconds * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+'''
+Benchmark suite
+=====
+Throughput of the hot path, with a JSON baseline to catch regressions:
+
+- Network: get_unknown_element, activate_element, is_valid_network
+- TriangleSemantic: construction, and solving each common known-set
+- /triangle_calculator end to end through the Flask test client
+
+Each benchmark reports its best throughput (operations per second) over a few
+repeats. `--save` writes the results as the baseline; `--compare` fails (exit
+code 1) when a benchmark is slower than the baseline by more than `--threshold`.
+
+Usage:
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.15
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+from TriangleProblem.models import (
+    Network,
+    TriangleSemantic
+)
+
+'''
+name -> function returning the callable to measure
+'''
+BENCHMARKS = {}
+
+'''
+The common known-sets, with the values of a 3-4-5 triangle.
+'''
+KNOWN_SETS = {
+    'sss': {'a': 3.0, 'b': 4.0, 'c': 5.0},
+    'sas': {'b': 4.0, 'c': 5.0, 'alpha': 36.86989764584402},
+    'asa': {'alpha': 36.86989764584402, 'beta': 53.13010235415598, 'c': 5.0},
+    'aas': {'alpha': 36.86989764584402, 'beta': 53.13010235415598, 'a': 3.0},
+    'ssa': {'a': 3.0, 'b': 4.0, 'alpha': 36.86989764584402},
+    'side_height': {'c': 5.0, 'height_c': 2.4, 'a': 3.0, 'b': 4.0},
+    'perimeter_area': {'p': 6.0, 'square': 6.0, 'a': 3.0, 'b': 4.0},
+}
+
+'''
+Form names of the elements for /triangle_calculator.
+'''
+PARAMS = {'square': 's', 'height_c': 'h_c'}
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+@benchmark('network.get_unknown_element')
+def network_get_unknown_element():
+    network = Network()
+    network.activate_element(1)
+    network.activate_element(2)
+    def run():
+        for expression in range(1, 7):
+            network.get_unknown_element(expression)
+    return run
+
+@benchmark('network.activate_element')
+def network_activate_element():
+    def run():
+        network = Network()
+        for element in range(1, 10):
+            network.activate_element(element)
+    return run
+
+@benchmark('network.is_valid_network')
+def network_is_valid_network():
+    matrix = Network().network
+    return lambda: Network.is_valid_network(matrix)
+
+@benchmark('triangle_semantic.construct')
+def triangle_semantic_construct():
+    return TriangleSemantic
+
+def solve_known_set(values: dict):
+    return lambda: TriangleSemantic.from_known(**values)
+
+for _name, _values in KNOWN_SETS.items():
+    benchmark('triangle_semantic.solve.' + _name)(lambda values=_values: solve_known_set(values))
+
+def http_calculator(values: dict, cached: bool):
+    from TriangleProblem import app
+    client = app.test_client()
+    data = {PARAMS.get(name, name): str(value) for name, value in values.items()}
+    headers = {} if cached else {'Cache-Control': 'no-cache'}
+    def run():
+        response = client.post('/triangle_calculator', data=data, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(response.status)
+    return run
+
+for _name in ('sss', 'side_height'):
+    benchmark('http.triangle_calculator.' + _name)(
+        lambda values=KNOWN_SETS[_name]: http_calculator(values, cached=False))
+benchmark('http.triangle_calculator.cached')(lambda: http_calculator(KNOWN_SETS['sss'], cached=True))
+
+def measure(run, repeat: int = 5, min_time: float = 0.1) -> float:
+    '''
+    Get the best throughput of a callable, in operations per second.
+    '''
+    timer = timeit.Timer(run)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+def run_suite(names: list, repeat: int) -> dict:
+    results = {}
+    for name in names:
+        results[name] = {'ops_per_sec': measure(BENCHMARKS[name](), repeat=repeat)}
+        print('{:<48}{:>16,.0f} ops/s'.format(name, results[name]['ops_per_sec']), file=sys.stderr)
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    '''
+    Get the benchmarks slower than the baseline by more than the threshold,
+    as (name, baseline ops/s, current ops/s, change) tuples.
+    '''
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['ops_per_sec']
+        change = result['ops_per_sec'] / before - 1
+        if change < -threshold:
+            regressions.append((name, before, result['ops_per_sec'], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite')
+    parser.add_argument('--filter', default='', help='only the benchmarks whose name contains it')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='PATH', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='baseline to compare with')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed throughput drop, 0.15 for 15%% (default)')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run_suite(names, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'results': results
+            }, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        print('{:<48}{:>14}{:>14}{:>9}'.format('benchmark', 'baseline', 'current', 'change'))
+        for name, result in results.items():
+            if name in baseline:
+                before = baseline[name]['ops_per_sec']
+                print('{:<48}{:>14,.0f}{:>14,.0f}{:>+8.1%}'.format(
+                    name, before, result['ops_per_sec'], result['ops_per_sec'] / before - 1))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n{} benchmark(s) slower than the baseline by more than {:.0%}:'.format(
+                len(regressions), args.threshold))
+            for name, before, after, change in regressions:
+                print('  {}: {:,.0f} -> {:,.0f} ops/s ({:+.1%})'.format(name, before, after, change))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
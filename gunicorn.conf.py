@@ -0,0 +1,65 @@
+import gc
+import os
+
+from TriangleProblem.services.metrics import mark_process_dead
+'''
+Gunicorn settings (gunicorn reads ./gunicorn.conf.py by default):
+
+    gunicorn run:app
+
+The app is loaded once in the master (`preload_app`), before the workers are
+forked: the imports, the result cache warmed from TRIANGLE_CACHE_WARM_LOG and
+the solve plans compiled while warming it are shared by the workers
+copy-on-write, and a new worker starts serving at once.
+
+What holds a thread or a connection is created per worker, on first use: the
+metrics flusher, the request log listener and the connections of the sqlite
+cache check the pid of their process.
+
+The workers are threaded (gthread): a sync worker serves one request at a
+time, so its admission control (TRIANGLE_MAX_CONCURRENT, TRIANGLE_MAX_QUEUE)
+would never see a second request, and the overload would wait in the socket
+backlog instead of being answered 503. A worker accepts up to $GUNICORN_THREADS
+requests at once; keep TRIANGLE_MAX_CONCURRENT + TRIANGLE_MAX_QUEUE below it.
+
+When a worker exits (killed, recycled by max_requests, scaled down), its
+metrics file in TRIANGLE_METRICS_DIR is archived: its counters are kept, its
+gauges dropped.
+
+The bind address and the number of workers come from $PORT and
+$WEB_CONCURRENCY (or the command line).
+'''
+preload_app = True
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+def when_ready(server):
+    # After the app is loaded, before the first fork: move the loaded objects
+    # out of the collected generations, so that a collection in a worker does
+    # not write to (and copy) their shared pages.
+    gc.freeze()
+    check_admission(server)
+
+def check_admission(server):
+    # the admission control only sheds the requests a worker accepts at once
+    config = getattr(server.app.wsgi(), 'config', {})
+    max_concurrent = config.get('TRIANGLE_MAX_CONCURRENT')
+    if max_concurrent is None:
+        return
+    worker_class = server.cfg.worker_class_str
+    if worker_class not in ('sync', 'gthread'):
+        # async workers accept the requests without a limit
+        return
+    threads = server.cfg.threads if worker_class == 'gthread' else 1
+    admitted = max_concurrent + config.get('TRIANGLE_MAX_QUEUE', 0)
+    if admitted >= threads:
+        server.log.warning('TRIANGLE_MAX_CONCURRENT + TRIANGLE_MAX_QUEUE (%d) >= the %d request(s) '
+                           'a %s worker accepts at once: no request will be shed',
+                           admitted, threads, worker_class)
+
+def child_exit(server, worker):
+    # in the master, once the worker has been reaped
+    app = server.app.wsgi()
+    directory = getattr(app, 'config', {}).get('TRIANGLE_METRICS_DIR')
+    if directory:
+        mark_process_dead(directory, worker.pid)
@@ -1,4 +1,6 @@
-from TriangleProblem import app
+from TriangleProblem import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()